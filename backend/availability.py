@@ -0,0 +1,62 @@
+# Cached live bed availability
+# Shelters report bed counts many times a night and the map and directory poll them.
+# Each instance keeps the whole availability collection in an AvailabilityTable;
+# reads never go to Mongo. Entries carry the per-resource version written by the
+# atomic update, so a change seen twice (locally and again from the sync loop) is
+# applied once.
+
+import hashlib
+import json
+
+STATUSES = ("available", "full", "closed")
+
+
+def availability_status(entry: dict) -> str:
+    """Closed is set by staff; otherwise full/available follows the bed count"""
+    if entry.get("closed"):
+        return "closed"
+    beds = entry.get("beds_available")
+    if beds is None:
+        return entry.get("live_status") or "available"
+    return "full" if beds <= 0 else "available"
+
+
+def public_entry(doc: dict) -> dict:
+    entry = {
+        "resource_id": doc["resource_id"],
+        "beds_available": doc.get("beds_available"),
+        "beds_total": doc.get("beds_total"),
+        "closed": bool(doc.get("closed")),
+        "version": doc.get("version", 0),
+        "updated_at": doc.get("updated_at"),
+    }
+    entry["live_status"] = availability_status(entry)
+    return entry
+
+
+class AvailabilityTable:
+    """Latest availability per resource id, with an ETag over the whole table"""
+
+    def __init__(self):
+        self.entries = {}
+        self.loaded = False
+        self.cursor = None  # Newest updated_at seen from Mongo
+        self._etag = None
+
+    def apply(self, doc: dict):
+        """Store a newer entry; returns it, or None when it is not newer than what we hold"""
+        current = self.entries.get(doc["resource_id"])
+        if current is not None and current["version"] >= doc.get("version", 0):
+            return None
+        entry = public_entry(doc)
+        self.entries[entry["resource_id"]] = entry
+        self._etag = None
+        if entry["updated_at"] and (self.cursor is None or entry["updated_at"] > self.cursor):
+            self.cursor = entry["updated_at"]
+        return entry
+
+    def etag(self) -> str:
+        if self._etag is None:
+            versions = sorted((rid, e["version"]) for rid, e in self.entries.items())
+            self._etag = hashlib.sha256(json.dumps(versions).encode()).hexdigest()[:32]
+        return self._etag
@@ -0,0 +1,77 @@
+# Precomputed catalog responses
+# Catalog data (workbook topics, legal forms, the resource directory) changes a few
+# times a month but is read on every page load. Each variant is encoded once into
+# JSON and gzip bytes with a strong ETag, and reused until its source version changes.
+
+import gzip
+import hashlib
+import json
+
+from starlette.responses import Response
+
+CACHE_CONTROL = "public, no-cache"  # Always revalidate; the ETag makes that a 304
+
+
+class CatalogEntry:
+    __slots__ = ("version", "body", "gzip_body", "etag")
+
+    def __init__(self, version, payload):
+        self.version = version
+        self.body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes and encoding suffixes are ignored"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate.endswith("-gzip"):
+            candidate = candidate[:-5]
+        if candidate == etag:
+            return True
+    return False
+
+
+class CatalogCache:
+    """Encoded catalog responses keyed by (catalog, variant), each tagged with its source version"""
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+        return None
+
+    def put(self, key, version, payload) -> CatalogEntry:
+        entry = CatalogEntry(version, payload)
+        self._entries[key] = entry
+        return entry
+
+    def invalidate(self, catalog: str):
+        for key in [k for k in self._entries if k[0] == catalog]:
+            del self._entries[key]
+
+    @staticmethod
+    def respond(entry: CatalogEntry, request) -> Response:
+        """Serve an entry with 304 handling and gzip when the client accepts it"""
+        use_gzip = "gzip" in request.headers.get("accept-encoding", "") and len(entry.gzip_body) < len(entry.body)
+        # Strong ETags must differ per representation
+        etag = f'"{entry.etag}-gzip"' if use_gzip else f'"{entry.etag}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, entry.etag):
+            return Response(status_code=304, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=entry.gzip_body, media_type="application/json", headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,162 @@
+# In-process full-text search over the resource directory
+# The directory is a few hundred documents, so an inverted index built in memory
+# beats a round trip to a Mongo text index and lets us do prefix and typo matching,
+# which $text can't. The server rebuilds the index whenever the resources catalog
+# version changes.
+
+import bisect
+import math
+import re
+from collections import Counter, defaultdict
+
+# Field weights: a hit in the name matters more than one in the notes
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "services": 3.0,
+    "target_population": 2.0,
+    "subcategory": 2.0,
+    "description": 1.0,
+    "notes": 1.0,
+    "category": 0.5,  # "medical" finds every medical resource, ranked below specific hits
+}
+PREFIX_FACTOR = 0.6  # "shelt" -> "shelter"
+TYPO_FACTOR = 0.4    # "shleter" -> "shelter"
+MIN_PREFIX_LENGTH = 2
+
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "the", "to", "with", "you", "your",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> list:
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(t) for t in text)
+    tokens = []
+    for token in _TOKEN.findall(str(text).lower().replace("'", "")):
+        if token in STOPWORDS:
+            continue
+        # Light plural folding so "meals" finds "meal"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def within_edit_distance(a: str, b: str, limit: int) -> bool:
+    """Damerau-Levenshtein (adjacent transpositions) distance <= limit, with early exit"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return False
+        previous_previous, previous = previous, current
+    return previous[-1] <= limit
+
+
+def typo_budget(token: str) -> int:
+    if len(token) >= 8:
+        return 2
+    if len(token) >= 4:
+        return 1
+    return 0
+
+
+class DirectorySearchIndex:
+    """Weighted inverted index over directory resources"""
+
+    def __init__(self, resources):
+        self.resources = {}
+        self.postings = defaultdict(dict)  # term -> {resource_id: weighted term frequency}
+        self.vocabulary = []
+        self._by_length = defaultdict(list)
+
+        for resource in resources:
+            resource_id = resource.get("id")
+            if not resource_id:
+                continue
+            self.resources[resource_id] = resource
+            weights = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(resource.get(field)):
+                    weights[token] += weight
+            for token, weight in weights.items():
+                self.postings[token][resource_id] = weight
+
+        self.vocabulary = sorted(self.postings)
+        for term in self.vocabulary:
+            self._by_length[len(term)].append(term)
+        total = max(len(self.resources), 1)
+        self.idf = {term: math.log(1 + total / len(ids)) for term, ids in self.postings.items()}
+
+    def _expand(self, token: str, is_last: bool):
+        """Index terms a query token may stand for, with a match-quality factor"""
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        # Prefix matching on the token being typed, and on long tokens generally
+        if len(token) >= MIN_PREFIX_LENGTH and (is_last or len(token) >= 4):
+            start = bisect.bisect_left(self.vocabulary, token)
+            for term in self.vocabulary[start:]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_FACTOR)
+        if not matches:
+            budget = typo_budget(token)
+            for length in range(len(token) - budget, len(token) + budget + 1):
+                for term in self._by_length.get(length, ()):
+                    if within_edit_distance(token, term, budget):
+                        matches.setdefault(term, TYPO_FACTOR)
+        return matches
+
+    def search(self, query: str, category: str = None, limit: int = 20, offset: int = 0):
+        """Rank resources for a query.
+
+        Every query token has to match something (exactly, by prefix or within a typo
+        budget). Facets count matches per category before the category filter.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return {"total": 0, "results": [], "facets": {"category": {}}}
+
+        scores = None
+        for position, token in enumerate(tokens):
+            token_scores = defaultdict(float)
+            for term, factor in self._expand(token, position == len(tokens) - 1).items():
+                idf = self.idf[term]
+                for resource_id, weight in self.postings[term].items():
+                    token_scores[resource_id] = max(token_scores[resource_id], factor * weight * idf)
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {rid: score + token_scores[rid] for rid, score in scores.items() if rid in token_scores}
+            if not scores:
+                break
+        scores = scores or {}
+
+        facets = Counter(self.resources[rid].get("category") or "other" for rid in scores)
+        if category and category != "all":
+            scores = {rid: s for rid, s in scores.items() if self.resources[rid].get("category") == category}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.resources[item[0]].get("name", "")))
+        page = ranked[offset:offset + limit]
+        return {
+            "total": len(ranked),
+            "results": [{**self.resources[rid], "score": round(score, 3)} for rid, score in page],
+            "facets": {"category": dict(facets.most_common())},
+        }
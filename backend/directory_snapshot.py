@@ -0,0 +1,106 @@
+# Immutable in-process copy of the resource directory
+# The directory is a few hundred documents that change a few times a month, so the
+# server keeps the whole thing in memory and answers directory reads from it. A
+# snapshot is never modified after it is built; refreshing builds a new one and swaps
+# the reference, so a request always sees one consistent version.
+
+import math
+from collections import defaultdict
+
+from directory_search import DirectorySearchIndex
+from geo import haversine_meters, parse_lng_lat
+from hours import HoursIndex
+
+GRID_CELL_DEGREES = 0.01  # ~1.1 km north-south
+METERS_PER_DEGREE = 111_320
+
+
+def resource_lng_lat(resource: dict):
+    """[lng, lat] from a resource's coordinates, or None for confidential and mobile services"""
+    coordinates = resource.get("coordinates") or {}
+    try:
+        return parse_lng_lat(coordinates.get("lng"), coordinates.get("lat"))
+    except ValueError:
+        return None
+
+
+def grid_cell(lng: float, lat: float) -> tuple:
+    return (math.floor(lng / GRID_CELL_DEGREES), math.floor(lat / GRID_CELL_DEGREES))
+
+
+class DirectorySnapshot:
+    """Resources by id, by category and by grid cell, plus the search and hours indexes.
+
+    Callers must copy a resource before changing it; the dicts are shared by every
+    request served from this snapshot.
+    """
+
+    def __init__(self, version: int, resources):
+        self.version = version
+        self.resources = tuple(sorted((r for r in resources if r.get("id")), key=lambda r: r.get("name", "")))
+        self.by_id = {r["id"]: r for r in self.resources}
+
+        by_category = defaultdict(list)
+        for resource in self.resources:
+            by_category[resource.get("category")].append(resource)
+        self.by_category = {category: tuple(items) for category, items in by_category.items()}
+
+        grid = defaultdict(list)
+        self.positions = {}
+        for resource in self.resources:
+            lng_lat = resource_lng_lat(resource)
+            if lng_lat is None:
+                continue
+            self.positions[resource["id"]] = lng_lat
+            grid[grid_cell(*lng_lat)].append(resource["id"])
+        self.grid = {cell: tuple(ids) for cell, ids in grid.items()}
+
+        self.search_index = DirectorySearchIndex(self.resources)
+        self.hours = HoursIndex(self.resources)  # Hours are parsed once per snapshot
+
+    def in_category(self, category: str = None) -> tuple:
+        if not category or category == "all":
+            return self.resources
+        return self.by_category.get(category, ())
+
+    def _ring(self, center: tuple, radius: int):
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+        for dx in range(-radius, radius + 1):
+            yield (cx + dx, cy - radius)
+            yield (cx + dx, cy + radius)
+        for dy in range(-radius + 1, radius):
+            yield (cx - radius, cy + dy)
+            yield (cx + radius, cy + dy)
+
+    def nearest(self, lng: float, lat: float, limit: int, max_distance: float = None, accept=None):
+        """Resources closest to a point as (distance_meters, resource), nearest first.
+
+        Walks grid rings outward from the origin's cell and stops once `limit` matches
+        are known to be closer than anything in the rings not yet visited.
+        """
+        if not self.grid:
+            return []
+        center = grid_cell(lng, lat)
+        # Narrowest a cell gets around the origin, so ring r is at least (r - 1) cells away
+        cell_meters = GRID_CELL_DEGREES * METERS_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + 1, 89))), 0.01)
+        last_ring = max(max(abs(x - center[0]), abs(y - center[1])) for x, y in self.grid)
+
+        found = []
+        for radius in range(last_ring + 1):
+            reach = radius * cell_meters  # Everything outside rings 0..radius is at least this far
+            for cell in self._ring(center, radius):
+                for resource_id in self.grid.get(cell, ()):
+                    resource = self.by_id[resource_id]
+                    if accept is not None and not accept(resource):
+                        continue
+                    distance = haversine_meters(lng, lat, *self.positions[resource_id])
+                    if max_distance is None or distance <= max_distance:
+                        found.append((distance, resource))
+            settled = sum(1 for distance, _ in found if distance <= reach)
+            if settled >= limit or (max_distance is not None and reach >= max_distance):
+                break
+        found.sort(key=lambda item: item[0])
+        return found[:limit]
@@ -0,0 +1,75 @@
+# In-memory interval index over pop-up events
+# Events are short time windows; the questions asked of them ("happening now", "in the
+# next few hours", "this week") are all "which windows overlap [a, b)". A centred
+# interval tree answers that in O(log n + k) instead of scanning every event.
+
+from datetime import datetime
+
+
+def _epoch(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals):
+        # The median start always lands in this node (start <= centre < end), so each level shrinks
+        starts = sorted(start for start, _, _ in intervals)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] <= self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+
+class EventIntervalIndex:
+    """Events keyed by [start, end) with overlap queries, built once per event-set version"""
+
+    def __init__(self, events, version=None):
+        """`events` are (start, end, event) with datetimes or epoch seconds"""
+        self.version = version
+        intervals = [(_epoch(start), _epoch(end), event) for start, end, event in events if _epoch(end) > _epoch(start)]
+        self.size = len(intervals)
+        self._root = _Node(intervals) if intervals else None
+
+    def overlapping(self, start, end) -> list:
+        """Events whose window overlaps [start, end), ordered by start time"""
+        start, end = _epoch(start), _epoch(end)
+        found = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            if end <= node.center:
+                # Query lies left of centre: an interval here overlaps iff it starts before `end`
+                for interval in node.by_start:
+                    if interval[0] >= end:
+                        break
+                    found.append(interval)
+                if node.left:
+                    stack.append(node.left)
+            elif start > node.center:
+                # Query lies right of centre: overlaps iff it ends after `start`
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    found.append(interval)
+                if node.right:
+                    stack.append(node.right)
+            else:
+                # Query contains the centre, so everything stored here overlaps it
+                found.extend(node.by_start)
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+        found.sort(key=lambda interval: interval[0])
+        return [interval[2] for interval in found]
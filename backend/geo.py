@@ -0,0 +1,108 @@
+# Geospatial helpers
+# Locations are stored as GeoJSON with [longitude, latitude] order so MongoDB
+# 2dsphere indexes can query them. Parsers raise ValueError on bad input; routes
+# turn that into a 400.
+
+import math
+
+EARTH_RADIUS_METERS = 6378100  # Radius MongoDB uses for $centerSphere radians
+MAX_TARGET_RADIUS_METERS = 50000
+
+
+def point(longitude: float, latitude: float) -> dict:
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def parse_lng_lat(longitude, latitude) -> list:
+    """Validate a coordinate pair and return it as [longitude, latitude]"""
+    try:
+        longitude = float(longitude)
+        latitude = float(latitude)
+    except (TypeError, ValueError):
+        raise ValueError("Coordinates must be numbers")
+    if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+        raise ValueError("Coordinates out of range")
+    return [longitude, latitude]
+
+
+def parse_polygon(raw) -> dict:
+    """Accept a GeoJSON Polygon or a bare ring of [lng, lat] pairs; returns a closed GeoJSON Polygon"""
+    ring = (raw.get("coordinates") or [None])[0] if isinstance(raw, dict) else raw
+    if not isinstance(ring, list) or len(ring) < 3:
+        raise ValueError("Polygon needs at least 3 points")
+    points = []
+    for pair in ring:
+        if not isinstance(pair, (list, tuple)) or len(pair) < 2:
+            raise ValueError("Polygon points must be [longitude, latitude] pairs")
+        points.append(parse_lng_lat(pair[0], pair[1]))
+    ring = points
+    if ring[0] != ring[-1]:
+        ring.append(list(ring[0]))
+    if len(ring) < 4:
+        raise ValueError("Polygon needs at least 3 distinct points")
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def parse_target_area(data: dict):
+    """Read an optional targeting area from request data.
+
+    Either `polygon`, or `latitude` + `longitude` + `radius_meters`. Returns None when
+    no area is given, else {"type": "circle", "center": [lng, lat], "radius_meters": r}
+    or a GeoJSON Polygon.
+    """
+    if data.get("polygon"):
+        return parse_polygon(data["polygon"])
+    if data.get("radius_meters") is None:
+        return None
+    center = parse_lng_lat(data.get("longitude"), data.get("latitude"))
+    try:
+        radius = float(data["radius_meters"])
+    except (TypeError, ValueError):
+        raise ValueError("radius_meters must be a number")
+    if not 0 < radius <= MAX_TARGET_RADIUS_METERS:
+        raise ValueError(f"radius_meters must be between 0 and {MAX_TARGET_RADIUS_METERS}")
+    return {"type": "circle", "center": center, "radius_meters": radius}
+
+
+def parse_bbox(raw: str, wrap: bool = False) -> list:
+    """"west,south,east,north" as [west, south, east, north].
+
+    With `wrap`, longitudes past +-180 (a web map panned around the globe) are brought
+    back into range, and a box 360 degrees or wider becomes the whole world.
+    """
+    try:
+        west, south, east, north = (float(v) for v in raw.split(","))
+    except ValueError:
+        raise ValueError("bbox must be west,south,east,north")
+    if wrap and math.isfinite(west) and math.isfinite(east):
+        if east - west >= 360:
+            west, east = -180.0, 180.0
+        else:
+            west = (west + 180) % 360 - 180
+            east = (east + 180) % 360 - 180
+    parse_lng_lat(west, south)
+    parse_lng_lat(east, north)
+    if south > north:
+        raise ValueError("bbox south must not exceed north")
+    return [west, south, east, north]
+
+
+def bbox_polygon(west: float, south: float, east: float, north: float) -> dict:
+    """GeoJSON Polygon for a box that does not cross the antimeridian"""
+    return {"type": "Polygon", "coordinates": [[[west, south], [east, south], [east, north], [west, north], [west, south]]]}
+
+
+def within_area_query(area: dict) -> dict:
+    """MongoDB $geoWithin operator selecting points inside a parsed target area"""
+    if area["type"] == "circle":
+        return {"$geoWithin": {"$centerSphere": [area["center"], area["radius_meters"] / EARTH_RADIUS_METERS]}}
+    return {"$geoWithin": {"$geometry": area}}
+
+
+def haversine_meters(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
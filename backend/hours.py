@@ -0,0 +1,251 @@
+# Opening-hours parsing
+# Directory `hours` are free text ("24/7", "Mon-Fri: 8am-4:30pm", "Shelter: 24/7 |
+# Office: Mon-Fri 8am-5pm"). parse_hours turns them into sorted, merged intervals
+# measured in minutes from Monday 00:00, so "is it open at t" is a binary search.
+# Segments that can't be read ("Check website for schedule") are returned
+# separately so staff can fix them.
+
+import bisect
+import re
+from datetime import datetime
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+ALL_DAYS = list(range(7))
+
+_DAY = r"(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?"
+_DAY_RANGE = re.compile(rf"({_DAY})\s*(?:-|–|to|thru|through)\s*({_DAY})", re.IGNORECASE)
+_DAY_SINGLE = re.compile(_DAY, re.IGNORECASE)
+_TIME = r"(?:(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)?|noon|midnight)"
+_TIME_RANGE = re.compile(rf"({_TIME})\s*(?:-|–|to)\s*({_TIME})", re.IGNORECASE)
+_ALWAYS = re.compile(r"24\s*/\s*7|24\s*hours|24\s*hrs|open\s+24", re.IGNORECASE)
+# "24/7 Crisis Line" is when someone answers the phone, not when the site is open
+_PHONE_LINE = re.compile(r"\b(?:hot)?line\b|\bphone\b|\bcall\b|\btext\b", re.IGNORECASE)
+
+
+def _day_index(token: str) -> int:
+    return DAY_NAMES.index(token[:3].lower())
+
+
+def _parse_days(text: str):
+    """Days mentioned in a segment, or None when it names none"""
+    lowered = text.lower()
+    if "daily" in lowered or "every day" in lowered or "7 days" in lowered:
+        return ALL_DAYS
+    days = set()
+    if "weekday" in lowered:
+        days.update(range(5))
+    if "weekend" in lowered:
+        days.update((5, 6))
+    for start, end in _DAY_RANGE.findall(text):
+        first, last = _day_index(start), _day_index(end)
+        span = (last - first) % 7
+        days.update((first + i) % 7 for i in range(span + 1))
+    remainder = _DAY_RANGE.sub(" ", text)
+    for token in _DAY_SINGLE.findall(remainder):
+        days.add(_day_index(token))
+    return sorted(days) if days else None
+
+
+def _parse_time(text: str, default_meridiem: str = None):
+    """Minutes after midnight for "8am", "4:30pm", "noon"; the meridiem is returned for range inference"""
+    text = text.strip().lower()
+    if text == "noon":
+        return 12 * 60, "pm"
+    if text == "midnight":
+        return 0, "am"
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)?", text)
+    if not match:
+        return None, None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").replace(".", "") or default_meridiem
+    if hour > 23 or minute > 59:
+        return None, None
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return hour * 60 + minute, meridiem
+
+
+def _parse_time_range(text: str):
+    match = _TIME_RANGE.search(text)
+    if not match:
+        return None
+    start_text, end_text = match.group(1), match.group(5)
+    end, end_meridiem = _parse_time(end_text)
+    start, start_meridiem = _parse_time(start_text)
+    if start is None or end is None:
+        return None
+    if start_meridiem is None and end_meridiem == "pm":
+        # "9-5pm" means 9am; "1-5pm" means 1pm
+        afternoon = _parse_time(start_text, default_meridiem="pm")[0]
+        if afternoon < end:
+            start = afternoon
+    elif end_meridiem is None and end <= start and end + 12 * 60 > start:
+        # "9-5" and "8-4:30" close in the afternoon; "22-6" and "9pm-5" still run overnight
+        end += 12 * 60
+    return start, end
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def parse_hours(text):
+    """Parse free-text hours.
+
+    Returns {"intervals": [[start, end], ...], "unparsed": [segment, ...]} where
+    intervals are minutes from Monday 00:00, sorted and non-overlapping. Overnight
+    hours wrap past Sunday midnight back to Monday. Round-the-clock phone lines
+    ("24/7 Crisis Line") are skipped when another segment gives the site's hours,
+    and reported as unparsed when none does.
+    """
+    if not text or not text.strip():
+        return {"intervals": [], "unparsed": []}
+
+    segments = [segment for segment in re.split(r"\s*[|;]\s*|\n", text) if segment]
+    phone_lines = [segment for segment in segments if _ALWAYS.search(segment) and _PHONE_LINE.search(segment)]
+    intervals = []
+    unparsed = []
+    for segment in segments:
+        if segment in phone_lines:
+            if len(phone_lines) == len(segments):
+                unparsed.append(segment)
+            continue
+        days = _parse_days(segment)
+        if _ALWAYS.search(segment):
+            for day in days or ALL_DAYS:
+                intervals.append((day * MINUTES_PER_DAY, (day + 1) * MINUTES_PER_DAY))
+            continue
+        time_range = _parse_time_range(segment)
+        if time_range is None:
+            unparsed.append(segment)
+            continue
+        start, end = time_range
+        if end <= start:
+            end += MINUTES_PER_DAY  # Closes after midnight
+        for day in days or ALL_DAYS:
+            begin = day * MINUTES_PER_DAY + start
+            finish = day * MINUTES_PER_DAY + end
+            if finish > MINUTES_PER_WEEK:
+                intervals.append((begin, MINUTES_PER_WEEK))
+                intervals.append((0, finish - MINUTES_PER_WEEK))
+            else:
+                intervals.append((begin, finish))
+
+    return {"intervals": _merge(intervals), "unparsed": unparsed}
+
+
+def minute_of_week(moment: datetime) -> int:
+    """Minutes since Monday 00:00 in the moment's own timezone"""
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def is_open_at(intervals, minute: int) -> bool:
+    """Binary search the sorted intervals from parse_hours"""
+    index = bisect.bisect_right(intervals, [minute, MINUTES_PER_WEEK + 1]) - 1
+    return index >= 0 and intervals[index][0] <= minute < intervals[index][1]
+
+
+class HoursIndex:
+    """Which resources are open at any minute of the week.
+
+    The week is cut at every opening and closing time across all resources. Each
+    segment between two cuts stores the set of open resources as a bitmask, so an
+    open-at query is one binary search plus reading the set bits.
+    """
+
+    def __init__(self, resources):
+        self.ids = []
+        self.intervals = {}
+        self.unparsed = {}
+        self.category_masks = {}
+        edges = {0, MINUTES_PER_WEEK}
+        opens = []
+        for resource in resources:
+            parsed = parse_hours(resource.get("hours"))
+            if parsed["unparsed"] or (resource.get("hours") and not parsed["intervals"]):
+                self.unparsed[resource["id"]] = parsed["unparsed"] or [resource["hours"]]
+            if not parsed["intervals"]:
+                continue
+            bit = 1 << len(self.ids)
+            self.ids.append(resource["id"])
+            self.intervals[resource["id"]] = parsed["intervals"]
+            category = resource.get("category")
+            self.category_masks[category] = self.category_masks.get(category, 0) | bit
+            for start, end in parsed["intervals"]:
+                edges.update((start, end))
+                opens.append((start, end, bit))
+
+        self.starts = sorted(edges)[:-1]
+        # Sweep the cuts: add a resource's bit where it opens, clear it where it closes
+        deltas = {}
+        for start, end, bit in opens:
+            deltas.setdefault(start, []).append(bit)
+            deltas.setdefault(end, []).append(-bit)
+        mask = 0
+        self.masks = []
+        for start in self.starts:
+            for change in deltas.get(start, ()):
+                mask = mask | change if change > 0 else mask & ~(-change)
+            self.masks.append(mask)
+
+    def open_at(self, minute: int, category: str = None) -> list:
+        """Ids of resources open at a minute of the week"""
+        mask = self.masks[bisect.bisect_right(self.starts, minute % MINUTES_PER_WEEK) - 1]
+        if category and category != "all":
+            mask &= self.category_masks.get(category, 0)
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def is_open(self, resource_id: str, minute: int):
+        """Whether a resource is open at a minute of the week; None when its hours are unknown"""
+        intervals = self.intervals.get(resource_id)
+        if not intervals:
+            return None
+        return is_open_at(intervals, minute % MINUTES_PER_WEEK)
+
+    def open_during(self, resource_id: str, start: int, end: int):
+        """Whether a resource is open at any minute of [start, end); None when its hours are unknown"""
+        intervals = self.intervals.get(resource_id)
+        if not intervals:
+            return None
+        length = end - start
+        if length >= MINUTES_PER_WEEK:
+            return True
+        start %= MINUTES_PER_WEEK
+        end = start + length
+        # A window running past Sunday midnight continues from the start of the week
+        windows = [(start, min(end, MINUTES_PER_WEEK))]
+        if end > MINUTES_PER_WEEK:
+            windows.append((0, end - MINUTES_PER_WEEK))
+        return any(open_start < window_end and open_end > window_start
+                   for window_start, window_end in windows
+                   for open_start, open_end in intervals)
+
+    def closes_in(self, resource_id: str, minute: int):
+        """Minutes until a resource that is open at `minute` closes; None if it is closed or never closes"""
+        intervals = self.intervals.get(resource_id) or []
+        if intervals == [[0, MINUTES_PER_WEEK]]:
+            return None
+        minute %= MINUTES_PER_WEEK
+        index = bisect.bisect_right(intervals, [minute, MINUTES_PER_WEEK + 1]) - 1
+        if index < 0 or not intervals[index][0] <= minute < intervals[index][1]:
+            return None
+        end = intervals[index][1]
+        if end == MINUTES_PER_WEEK and intervals[0][0] == 0:
+            end += intervals[0][1]  # Sunday night runs into Monday
+        return end - minute
@@ -0,0 +1,255 @@
+# Tolerant JSON extraction for LLM output
+# Models wrap JSON in markdown fences, add prose around it, leave trailing
+# commas, use smart quotes or stop mid-object. These helpers recover the
+# payload instead of discarding the whole generation.
+
+import json
+import re
+
+# Curly double quotes some models use in place of '"'. They are only treated as
+# delimiters where a string starts or ends outside a regular string; inside a value
+# they are content ("Try the “50/30/20” rule"). Curly single quotes are never touched
+# since they show up as apostrophes.
+SMART_QUOTES = "“”„‟"
+
+CLOSERS = {"{": "}", "[": "]"}
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_PARTIAL_LITERAL = re.compile(r"(?<=[\s:\[,])(t|tr|tru|f|fa|fal|fals|n|nu|nul)$")
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+
+
+def repair_json(text: str) -> str:
+    """Fix common LLM JSON defects: trailing commas, // comments, smart-quote delimiters,
+    and truncation (unclosed strings and brackets, a dangling key, a cut-off literal)
+    """
+    out = []
+    stack = []
+    in_string = False
+    smart_string = False  # Current string was opened with a curly quote
+    escape = False
+    expect_key = False  # Innermost object is waiting for a key
+    awaiting_value = False  # Saw a key's colon but not its value yet
+    key_start = -1  # Position in `out` of a key whose value has not started
+    i = 0
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"' and not smart_string:
+                in_string = False
+            elif ch in SMART_QUOTES and smart_string:
+                in_string = False
+                ch = '"'
+            elif ch == '"':
+                ch = '\\"'  # A plain quote inside a curly-quoted string is content
+            elif ch == "\n":
+                out.append("\\n")
+                i += 1
+                continue
+            out.append(ch)
+            i += 1
+            continue
+
+        if awaiting_value and not ch.isspace():
+            awaiting_value = False
+            key_start = -1
+        if ch == '"' or ch in SMART_QUOTES:
+            if expect_key and stack and stack[-1] == "}":
+                key_start = len(out)
+                expect_key = False
+            in_string = True
+            smart_string = ch != '"'
+            out.append('"')
+        elif ch == "/" and i + 1 < n and text[i + 1] == "/":
+            # Line comment outside a string
+            while i < n and text[i] != "\n":
+                i += 1
+            continue
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+            expect_key = ch == "{"
+            out.append(ch)
+        elif ch in "}]":
+            if stack and stack[-1] == ch:
+                stack.pop()
+                expect_key = False
+                key_start = -1
+                out.append(ch)
+            # Unbalanced closers are dropped
+        else:
+            if ch == ":" and key_start != -1:
+                awaiting_value = True
+            elif ch == "," and stack and stack[-1] == "}":
+                expect_key = True
+            out.append(ch)
+        i += 1
+
+    # Truncated output: close the open string, drop a dangling key or comma, finish a
+    # cut-off literal, close brackets
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    if key_start != -1:
+        del out[key_start:]
+    repaired = "".join(out).rstrip().rstrip(",").rstrip()
+    repaired = _PARTIAL_LITERAL.sub(lambda m: _LITERALS[m.group(1)[0]], repaired)
+    repaired += "".join(reversed(stack))
+
+    return _TRAILING_COMMA.sub(r"\1", repaired)
+
+
+def _payload_start(text: str) -> int:
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    return min(starts) if starts else -1
+
+
+def _payload_end(text: str, start: int) -> int:
+    """Index just past the bracket that closes the value opened at start, or -1 if it never closes"""
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def extract_json(text: str):
+    """Find the first JSON object or array in an LLM response and parse it, repairing if needed.
+
+    Raises ValueError when no payload can be recovered.
+    """
+    if not text:
+        raise ValueError("Empty response")
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    start = _payload_start(text)
+    if start == -1:
+        raise ValueError("No JSON payload found in response")
+
+    end = _payload_end(text, start)
+    candidate = text[start:end] if end != -1 else text[start:]
+
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        return json.loads(repair_json(candidate))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Unrecoverable JSON payload: {e}") from e
+
+
+class IncrementalJSONParser:
+    """Feed an LLM response chunk by chunk and receive array elements as soon as they close.
+
+    Only elements of the top-level object's arrays named in `sections` are emitted,
+    e.g. IncrementalJSONParser(("lessons", "exercises")) yields ("lessons", {...})
+    once each lesson object is complete. Call result() at the end for the full payload.
+    """
+
+    def __init__(self, sections):
+        self.sections = set(sections)
+        self.buffer = ""
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._smart_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_string = None
+        self._key = None
+        self._section = None
+        self._item_start = -1
+
+    def feed(self, chunk: str):
+        """Consume a chunk and return a list of (section, element) pairs completed by it"""
+        self.buffer += chunk
+        completed = []
+
+        if self._start == -1:
+            self._start = self.buffer.find("{")
+            if self._start == -1:
+                return completed
+            self._pos = self._start
+
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif (ch in SMART_QUOTES) if self._smart_string else (ch == '"'):
+                    self._in_string = False
+                    self._last_string = buf[self._string_start + 1:i]
+                    if self._depth == 2 and self._section:
+                        # String element, e.g. an action item
+                        raw = buf[self._string_start:i + 1]
+                        try:
+                            completed.append((self._section, json.loads(repair_json(raw) if self._smart_string else raw)))
+                        except json.JSONDecodeError:
+                            pass
+                continue
+
+            if ch == '"' or ch in SMART_QUOTES:
+                self._in_string = True
+                self._smart_string = ch != '"'
+                self._string_start = i
+            elif ch == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and ch == "[" and self._key in self.sections:
+                    self._section = self._key
+                elif self._depth == 3 and self._section and ch == "{":
+                    self._item_start = i
+            elif ch in "}]":
+                if self._depth == 3 and self._section and ch == "}" and self._item_start != -1:
+                    raw = buf[self._item_start:i + 1]
+                    try:
+                        completed.append((self._section, json.loads(raw)))
+                    except json.JSONDecodeError:
+                        try:
+                            completed.append((self._section, json.loads(repair_json(raw))))
+                        except json.JSONDecodeError:
+                            pass  # Left for the final result() pass
+                    self._item_start = -1
+                elif self._depth == 2:
+                    self._section = None
+                self._depth -= 1
+
+        self._pos = len(buf)
+        return completed
+
+    def result(self):
+        """Parse everything fed so far, repairing truncated or malformed output"""
+        return extract_json(self.buffer)
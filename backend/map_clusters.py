@@ -0,0 +1,121 @@
+# Precomputed map clusters
+# The map shows resources, active pop-up events and upcoming sweeps. Instead of sending
+# every point, points are bucketed once per zoom level into a grid of roughly
+# CLUSTER_RADIUS_PX screen pixels (in Web Mercator, the projection map tiles use).
+# A viewport query then only reads the cells it covers at that zoom, so the payload is
+# bounded by screen size rather than by how much data exists.
+
+import math
+from collections import Counter, defaultdict
+
+MIN_ZOOM = 0
+MAX_CLUSTER_ZOOM = 16  # Above this every point is shown on its own
+MAX_ZOOM = 22  # Deepest zoom web maps request
+CLUSTER_RADIUS_PX = 60
+TILE_SIZE = 256
+MAX_VIEWPORT_ITEMS = 500
+
+
+def mercator_x(lng: float) -> float:
+    return lng / 360 + 0.5
+
+
+def mercator_y(lat: float) -> float:
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    sin = math.sin(math.radians(lat))
+    return 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+
+
+def unproject_y(y: float) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+def cell_size(zoom: int) -> float:
+    """Cell width in normalised Mercator units (the world is 0..1) at a zoom level"""
+    return CLUSTER_RADIUS_PX / (TILE_SIZE * 2 ** zoom)
+
+
+class ClusterIndex:
+    """Grid clusters for each zoom level over a fixed list of points.
+
+    Points are dicts with at least `kind`, `id`, `lat` and `lng`; they are returned as-is
+    when they stand alone in their cell.
+    """
+
+    def __init__(self, points):
+        self.points = [p for p in points if p.get("lat") is not None and p.get("lng") is not None]
+        self._xy = [(mercator_x(p["lng"]), mercator_y(p["lat"])) for p in self.points]
+        self.levels = {}
+        for zoom in range(MIN_ZOOM, MAX_CLUSTER_ZOOM + 1):
+            size = cell_size(zoom)
+            cells = defaultdict(list)
+            for index, (x, y) in enumerate(self._xy):
+                cells[(int(x / size), int(y / size))].append(index)
+            self.levels[zoom] = dict(cells)
+        self._expansion = self._expansion_zooms()
+        self._clusters = {}
+        for zoom, level in self.levels.items():
+            for cell, members in level.items():
+                if len(members) > 1:
+                    self._clusters[(zoom, cell)] = self._summarise(zoom, cell, members)
+
+    def _summarise(self, zoom: int, cell: tuple, members: list) -> dict:
+        x = sum(self._xy[i][0] for i in members) / len(members)
+        y = sum(self._xy[i][1] for i in members) / len(members)
+        return {
+            "type": "cluster",
+            "id": f"{zoom}:{cell[0]}:{cell[1]}",
+            "lat": round(unproject_y(y), 6),
+            "lng": round((x - 0.5) * 360, 6),
+            "count": len(members),
+            "kinds": dict(Counter(self.points[i]["kind"] for i in members)),
+            "expansion_zoom": self._expansion[(zoom, cell)],
+        }
+
+    def _expansion_zooms(self) -> dict:
+        """Zoom at which each multi-point cell first splits, so a click can jump straight there"""
+        expansion = {}
+        for zoom in range(MAX_CLUSTER_ZOOM, MIN_ZOOM - 1, -1):
+            finer_size = cell_size(zoom + 1)
+            for cell, members in self.levels[zoom].items():
+                if len(members) < 2:
+                    continue
+                if zoom == MAX_CLUSTER_ZOOM:
+                    expansion[(zoom, cell)] = MAX_CLUSTER_ZOOM + 1
+                    continue
+                children = {(int(self._xy[i][0] / finer_size), int(self._xy[i][1] / finer_size)) for i in members}
+                if len(children) > 1:
+                    expansion[(zoom, cell)] = zoom + 1
+                else:
+                    expansion[(zoom, cell)] = expansion[(zoom + 1, children.pop())]
+        return expansion
+
+    def _cells_in(self, zoom: int, west: float, south: float, east: float, north: float):
+        level = self.levels[zoom]
+        size = cell_size(zoom)
+        x0, x1 = int(mercator_x(west) / size), int(mercator_x(east) / size)
+        y0, y1 = int(mercator_y(north) / size), int(mercator_y(south) / size)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(level):
+            # Wide box: cheaper to scan the occupied cells than the whole range
+            return [(cell, members) for cell, members in level.items()
+                    if x0 <= cell[0] <= x1 and y0 <= cell[1] <= y1]
+        return [((x, y), level[(x, y)]) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in level]
+
+    def query(self, west: float, south: float, east: float, north: float, zoom: float) -> dict:
+        """Clusters and single points inside a bounding box at a zoom level"""
+        zoom = max(MIN_ZOOM, int(math.floor(zoom)))
+        items = []
+        if zoom > MAX_CLUSTER_ZOOM:
+            west_x, east_x = mercator_x(west), mercator_x(east)
+            north_y, south_y = mercator_y(north), mercator_y(south)
+            for index, (x, y) in enumerate(self._xy):
+                if west_x <= x <= east_x and north_y <= y <= south_y:
+                    items.append({"type": "point", **self.points[index]})
+        else:
+            for cell, members in self._cells_in(zoom, west, south, east, north):
+                if len(members) == 1:
+                    items.append({"type": "point", **self.points[members[0]]})
+                else:
+                    items.append(self._clusters[(zoom, cell)])
+        truncated = len(items) > MAX_VIEWPORT_ITEMS
+        return {"zoom": zoom, "items": items[:MAX_VIEWPORT_ITEMS], "truncated": truncated}
@@ -0,0 +1,67 @@
+# In-process fan-out for live notification streams
+# Each open /notifications/stream connection holds a bounded queue registered under
+# its user id and its broadcast audiences. Publishers push events without waiting on
+# slow clients; a client that falls behind gets a single "resync" event and reloads.
+
+import asyncio
+import json
+from collections import defaultdict
+
+QUEUE_SIZE = 100
+
+
+def format_sse(event: dict, event_id: str = None) -> str:
+    """Encode an event as a Server-Sent Events frame"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event['type']}")
+    lines.append("data: " + json.dumps(event, separators=(",", ":"), default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+class NotificationHub:
+    """Live subscribers keyed by user id and by broadcast audience"""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._by_user = defaultdict(set)
+        self._by_audience = defaultdict(set)
+
+    def subscribe(self, user_id: str, audiences) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._by_user[user_id].add(queue)
+        for audience in audiences:
+            self._by_audience[audience].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, audiences, queue: asyncio.Queue):
+        keys = [(self._by_user, user_id)] + [(self._by_audience, audience) for audience in audiences]
+        for index, key in keys:
+            queues = index.get(key)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del index[key]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._by_user.values())
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Dropping events would leave the badge wrong; tell the client to reload instead
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    def publish_user(self, user_id: str, event: dict):
+        for queue in list(self._by_user.get(user_id, ())):
+            self._offer(queue, event)
+
+    def publish_audience(self, audience: str, event: dict):
+        for queue in list(self._by_audience.get(audience, ())):
+            self._offer(queue, event)
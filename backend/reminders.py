@@ -0,0 +1,28 @@
+# Reminder stages
+# Sweeps and pop-up events get staged reminders: "advance_notice" when a sweep asks
+# for more than a day's notice, "day_before", and "morning_of". The morning reminder
+# goes out at 07:00 local time; for something starting too early for that (06:00,
+# 07:30) it goes out a fixed lead time before the start instead.
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+MORNING_HOUR = 7
+MORNING_MIN_LEAD = timedelta(hours=1)  # 07:00 is used only if at least this long before the start
+SAME_DAY_LEAD = timedelta(hours=2)
+
+
+def reminder_stages(starts_at: datetime, zone: str, advance_notice_days: int = None) -> list:
+    """(stage, due_at) pairs, due times in UTC, for something starting at `starts_at`"""
+    starts_at = starts_at.astimezone(timezone.utc)
+    stages = []
+    if advance_notice_days and advance_notice_days > 1:
+        stages.append(("advance_notice", starts_at - timedelta(days=advance_notice_days)))
+    stages.append(("day_before", starts_at - timedelta(days=1)))
+    local = starts_at.astimezone(ZoneInfo(zone))
+    morning = local.replace(hour=MORNING_HOUR, minute=0, second=0, microsecond=0)
+    if morning <= local - MORNING_MIN_LEAD:
+        stages.append(("morning_of", morning.astimezone(timezone.utc)))
+    else:
+        stages.append(("morning_of", starts_at - SAME_DAY_LEAD))
+    return stages
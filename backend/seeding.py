@@ -0,0 +1,115 @@
+# Idempotent seeding
+# Seed records carry stable ids. Each record's content hash is stored with it as
+# `seed_hash`, so re-running a seed compares hashes and writes only the records that
+# are new or were edited in the seed file, in one unordered bulk_write of upserts.
+# Documents that are not in the seed (created by staff) are never touched, except rows
+# from the old seeding, which used random ids: adopt_legacy_records maps them onto the
+# seed ids by name once, at startup.
+
+import copy
+import hashlib
+import json
+from datetime import datetime, timezone
+
+VOLATILE_FIELDS = {"created_at", "seed_hash", "seeded_at"}
+
+
+def seed_hash(record: dict) -> str:
+    content = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def upsert_seed_records(collection, records, prepare=None) -> dict:
+    """Insert or update seed records by id.
+
+    `prepare` derives stored fields from a copy of each record (e.g. the GeoJSON
+    location). Returns counts of inserted, updated and unchanged records.
+    """
+    from pymongo import UpdateOne
+
+    hashes = {record["id"]: seed_hash(record) for record in records}
+    stored = await collection.find(
+        {"id": {"$in": list(hashes)}}, {"_id": 0, "id": 1, "seed_hash": 1}
+    ).to_list(None)
+    stored_hashes = {doc["id"]: doc.get("seed_hash") for doc in stored}
+
+    now = datetime.now(timezone.utc).isoformat()
+    ops = []
+    inserted = updated = 0
+    for record in records:
+        digest = hashes[record["id"]]
+        if stored_hashes.get(record["id"]) == digest:
+            continue
+        if record["id"] in stored_hashes:
+            updated += 1
+        else:
+            inserted += 1
+        doc = copy.deepcopy({k: v for k, v in record.items() if k not in VOLATILE_FIELDS})
+        if prepare:
+            doc = prepare(doc)
+        ops.append(UpdateOne(
+            {"id": record["id"]},
+            {"$set": {**doc, "seed_hash": digest, "seeded_at": now}, "$setOnInsert": {"created_at": now}},
+            upsert=True
+        ))
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+    return {"inserted": inserted, "updated": updated, "unchanged": len(records) - inserted - updated}
+
+
+async def adopt_legacy_records(collection, records, match_field: str) -> int:
+    """Give rows written by the old random-id seeding their seed record's id.
+
+    Legacy rows have no `seed_hash` and are matched to seed records by `match_field`
+    (e.g. the resource name). The first one is adopted, so the next upsert updates it
+    in place; any further copies, or all of them if the seed id is already stored,
+    are deleted. Returns how many rows were adopted or deleted.
+    """
+    from pymongo import DeleteOne, UpdateOne
+
+    seed_ids = {record[match_field]: record["id"] for record in records if record.get(match_field)}
+    legacy = await collection.find(
+        {match_field: {"$in": list(seed_ids)}, "seed_hash": {"$exists": False}},
+        {"_id": 1, "id": 1, match_field: 1}
+    ).sort("_id", 1).to_list(None)
+    legacy = [doc for doc in legacy if doc.get("id") != seed_ids[doc[match_field]]]
+    if not legacy:
+        return 0
+    stored = await collection.find(
+        {"id": {"$in": [seed_ids[doc[match_field]] for doc in legacy]}}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    taken = {doc["id"] for doc in stored}
+
+    ops = []
+    for doc in legacy:
+        seed_id = seed_ids[doc[match_field]]
+        if seed_id in taken:
+            ops.append(DeleteOne({"_id": doc["_id"]}))
+        else:
+            taken.add(seed_id)
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"id": seed_id}}))
+    await collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def ensure_unique_ids(collection) -> int:
+    """Unique index on `id`, which upserting by id relies on.
+
+    Before the index can be built, a plain `id_1` index is replaced and duplicate
+    documents left by older non-idempotent seeding are removed, keeping the first
+    inserted. Returns how many duplicates were removed.
+    """
+    indexes = await collection.index_information()
+    if indexes.get("id_1", {}).get("unique"):
+        return 0
+    if "id_1" in indexes:
+        await collection.drop_index("id_1")
+    groups = await collection.aggregate([
+        {"$group": {"_id": "$id", "doc_ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]).to_list(None)
+    duplicates = [doc_id for group in groups for doc_id in sorted(group["doc_ids"])[1:]]
+    if duplicates:
+        await collection.delete_many({"_id": {"$in": duplicates}})
+    await collection.create_index([("id", 1)], unique=True)
+    return len(duplicates)
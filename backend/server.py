@@ -1,12 +1,13 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, File, UploadFile
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, status, File, UploadFile
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
@@ -15,7 +16,24 @@ from jose import JWTError, jwt
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 import base64
 import asyncio
+import json
+import math
+import time
+import hashlib
+import gzip
 from seed_resources import ALL_RESOURCES
+from llm_json import IncrementalJSONParser, extract_json
+from catalog import CatalogCache, etag_matches
+from notification_hub import NotificationHub, format_sse
+from geo import bbox_polygon, haversine_meters, parse_bbox, parse_lng_lat, parse_target_area, point, within_area_query
+from hours import minute_of_week
+from directory_snapshot import DirectorySnapshot
+from availability import AvailabilityTable
+from map_clusters import MAX_ZOOM, MIN_ZOOM, ClusterIndex
+from seeding import adopt_legacy_records, ensure_unique_ids, upsert_seed_records
+from transit import TransitRouter, load_index as load_transit_index
+from event_index import EventIntervalIndex
+from reminders import reminder_stages
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -60,6 +78,7 @@ class User(BaseModel):
     is_veteran: bool = False
     role: str = "user"  # user, caseworker, agency_staff, cleanup_crew
     organization: Optional[str] = None
+    location_updated_at: Optional[str] = None  # Set while a last-known location is shared
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class TokenResponse(BaseModel):
@@ -129,6 +148,30 @@ class Workbook(BaseModel):
     
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class WorkbookLesson(BaseModel):
+    """Schema for one AI-generated workbook lesson"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    title: str
+    content: str
+    key_points: List[str] = []
+
+class WorkbookExercise(BaseModel):
+    """Schema for one AI-generated workbook exercise"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    question: str
+    type: str = "multiple_choice"  # multiple_choice, true_false
+    options: List[str] = []
+    correct_answer: Optional[str] = None
+    explanation: Optional[str] = None
+
+class WorkbookResource(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    title: str
+    url: str = ""
+    description: str = ""
+
 # Comprehensive life skills topic library
 WORKBOOK_TOPICS = {
     "life_skills": [
@@ -213,6 +256,13 @@ class Resource(BaseModel):
     live_status: Optional[str] = None  # available, full, closed
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class AvailabilityUpdate(BaseModel):
+    beds_available: Optional[int] = Field(default=None, ge=0)  # Absolute count
+    delta: Optional[int] = None  # Atomic change, e.g. -1 when a bed is assigned
+    beds_total: Optional[int] = Field(default=None, ge=0)
+    closed: Optional[bool] = None
+    expected_version: Optional[int] = None  # Reject the update if someone else changed it first
+
 class DocumentVault(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -268,6 +318,7 @@ class CleanupSweep(BaseModel):
     contact_info: str
     notes: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    conflicts: List[Dict[str, Any]] = []  # Warnings from scheduling; not stored
 
 class CleanupSweepCreate(BaseModel):
     location: str
@@ -489,6 +540,40 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# ==================== CATALOG CACHE ====================
+
+# Catalog responses are encoded once per variant and served with strong ETags. Each
+# source collection carries a version in catalog_versions that API writes bump; other
+# instances notice the bump within CATALOG_VERSION_CHECK_SECONDS.
+catalog_cache = CatalogCache()
+CATALOG_VERSION_CHECK_SECONDS = 5
+_catalog_versions: Dict[str, tuple] = {}  # collection -> (version, checked_at)
+
+async def catalog_version(collection: str) -> int:
+    cached = _catalog_versions.get(collection)
+    if cached and time.monotonic() - cached[1] < CATALOG_VERSION_CHECK_SECONDS:
+        return cached[0]
+    doc = await db.catalog_versions.find_one({"collection": collection}, {"_id": 0, "version": 1})
+    version = doc["version"] if doc else 0
+    _catalog_versions[collection] = (version, time.monotonic())
+    return version
+
+async def bump_catalog_version(collection: str):
+    """Mark a catalog source collection as changed so its cached responses are rebuilt"""
+    await db.catalog_versions.update_one({"collection": collection}, {"$inc": {"version": 1}}, upsert=True)
+    _catalog_versions.pop(collection, None)
+    catalog_cache.invalidate(collection)
+
+async def serve_catalog(request: Request, collection: str, variant: str, build, version: Optional[int] = None):
+    """Respond from the precomputed catalog, calling `build()` only when the source version changed"""
+    if version is None:
+        version = await catalog_version(collection) if collection != "static" else 0
+    key = (collection, variant)
+    entry = catalog_cache.get(key, version)
+    if entry is None:
+        entry = catalog_cache.put(key, version, await build())
+    return CatalogCache.respond(entry, request)
+
 # ==================== AUTH ROUTES ====================
 
 @api_router.get("/")
@@ -700,6 +785,37 @@ async def login(credentials: UserLogin):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+@api_router.put("/auth/me/location")
+async def update_my_location(data: dict, current_user: User = Depends(get_current_user)):
+    """Share a last-known location so area alerts (sweeps) can be targeted"""
+    try:
+        coordinates = parse_lng_lat(data.get("longitude"), data.get("latitude"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    now = datetime.now(timezone.utc).isoformat()
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$set": {"last_location": point(*coordinates), "location_updated_at": now}}
+    )
+    if not current_user.location_updated_at:
+        # Leaving the "unlocated" broadcast audience changes which alerts count as unread
+        current_user.location_updated_at = now
+        await reconcile_unread_counter(current_user)
+    return {"message": "Location updated", "location_updated_at": now}
+
+@api_router.delete("/auth/me/location")
+async def clear_my_location(current_user: User = Depends(get_current_user)):
+    """Stop sharing location; area alerts then reach the user as general broadcasts"""
+    await db.users.update_one(
+        {"id": current_user.id},
+        {"$unset": {"last_location": "", "location_updated_at": ""}}
+    )
+    if current_user.location_updated_at:
+        current_user.location_updated_at = None
+        await reconcile_unread_counter(current_user)
+    return {"message": "Location cleared"}
+
 # ==================== PASSWORD RESET ====================
 
 @api_router.post("/auth/forgot-password")
@@ -1003,29 +1119,154 @@ async def analyze_flashcard_answer(user_id: str, question: str, answer: str, cat
 
 # ==================== POP-UP EVENTS ====================
 
+# Events store `start_time`/`end_time` as ISO strings for clients, plus BSON dates
+# `start_at`/`end_at` for range queries. Naive times are read as directory-local.
+# Reads go through an in-memory EventIntervalIndex of events that have not ended,
+# rebuilt when the popup_events catalog version changes (create/delete) and at least
+# every POPUP_INDEX_MAX_AGE_SECONDS so finished events drop out.
+POPUP_INDEX_MAX_AGE_SECONDS = 600
+POPUP_UPCOMING_MAX_HOURS = 168
+POPUP_PAGE_MAX = 200
+_popup_index: Optional[EventIntervalIndex] = None
+_popup_index_built_at = 0.0
+_popup_index_lock = asyncio.Lock()
+
+def event_datetime(value: str) -> datetime:
+    """Aware UTC datetime for an event time; naive times are directory-local"""
+    from zoneinfo import ZoneInfo
+    moment = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=ZoneInfo(DIRECTORY_TIMEZONE))
+    return moment.astimezone(timezone.utc)
+
+def stored_utc(value: datetime) -> datetime:
+    """Mongo hands back naive UTC datetimes"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+async def popup_event_index() -> EventIntervalIndex:
+    global _popup_index, _popup_index_built_at
+    version = await catalog_version("popup_events")
+    index = _popup_index
+    if index is not None and index.version == version and time.monotonic() - _popup_index_built_at < POPUP_INDEX_MAX_AGE_SECONDS:
+        return index
+    async with _popup_index_lock:
+        index = _popup_index
+        if index is not None and index.version == version and time.monotonic() - _popup_index_built_at < POPUP_INDEX_MAX_AGE_SECONDS:
+            return index
+        events = await db.popup_events.find(
+            {"end_at": {"$gte": datetime.now(timezone.utc)}}, {"_id": 0}
+        ).to_list(None)
+        _popup_index = EventIntervalIndex(
+            [(stored_utc(event.pop("start_at")), stored_utc(event.pop("end_at")), event) for event in events],
+            version=version
+        )
+        _popup_index_built_at = time.monotonic()
+    return _popup_index
+
+async def migrate_popup_event_times() -> int:
+    """Add start_at/end_at to events stored before they existed"""
+    from pymongo import UpdateOne
+    
+    docs = await db.popup_events.find(
+        {"end_at": {"$exists": False}}, {"_id": 0, "id": 1, "start_time": 1, "end_time": 1}
+    ).to_list(None)
+    ops = []
+    for doc in docs:
+        try:
+            times = {"start_at": event_datetime(doc["start_time"]), "end_at": event_datetime(doc["end_time"])}
+        except (KeyError, TypeError, ValueError):
+            continue
+        ops.append(UpdateOne({"id": doc["id"]}, {"$set": times}))
+    if ops:
+        await db.popup_events.bulk_write(ops, ordered=False)
+    return len(ops)
+
+async def popup_events_between(
+    start: datetime,
+    end: datetime,
+    lat: Optional[float],
+    lng: Optional[float],
+    radius_meters: Optional[float],
+    limit: int,
+    offset: int
+) -> Dict[str, Any]:
+    """Events overlapping [start, end), optionally within `radius_meters` of a point, one page at a time"""
+    if (lat is None) != (lng is None):
+        raise HTTPException(status_code=400, detail="lat and lng must be given together")
+    if radius_meters is not None and lat is None:
+        raise HTTPException(status_code=400, detail="radius_meters needs lat and lng")
+    limit = max(1, min(limit, POPUP_PAGE_MAX))
+    offset = max(0, offset)
+    events = (await popup_event_index()).overlapping(start, end)
+    if lat is not None:
+        try:
+            origin = parse_lng_lat(lng, lat)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        nearby = []
+        for event in events:
+            coordinates = event.get("coordinates") or {}
+            try:
+                position = parse_lng_lat(coordinates.get("lng"), coordinates.get("lat"))
+            except ValueError:
+                continue
+            distance = haversine_meters(*origin, *position)
+            if radius_meters is None or distance <= radius_meters:
+                nearby.append({**event, "distance_meters": round(distance, 1)})
+        events = nearby
+    page = events[offset:offset + limit]
+    return {
+        "total": len(events),
+        "events": page,
+        "next_offset": offset + limit if offset + limit < len(events) else None
+    }
+
 @api_router.get("/events/popup")
-async def get_popup_events():
+async def get_popup_events(limit: int = 1000, offset: int = 0):
+    """Events that are running or still to come, soonest first"""
+    events = (await popup_event_index()).overlapping(datetime.now(timezone.utc), datetime.max.replace(tzinfo=timezone.utc))
+    return events[max(0, offset):max(0, offset) + max(0, limit)]
+
+@api_router.get("/events/popup/now")
+async def get_popup_events_now(
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_meters: Optional[float] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """Events happening right now, optionally near a point"""
     now = datetime.now(timezone.utc)
-    events = await db.popup_events.find(
-        {"end_time": {"$gte": now.isoformat()}},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    for event in events:
-        if isinstance(event.get('created_at'), str):
-            event['created_at'] = datetime.fromisoformat(event['created_at'])
-        if isinstance(event.get('start_time'), str):
-            event['start_time'] = datetime.fromisoformat(event['start_time'])
-        if isinstance(event.get('end_time'), str):
-            event['end_time'] = datetime.fromisoformat(event['end_time'])
-    
-    return events
+    return await popup_events_between(now, now + timedelta(seconds=1), lat, lng, radius_meters, limit, offset)
+
+@api_router.get("/events/popup/upcoming")
+async def get_popup_events_upcoming(
+    hours: float = 24,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_meters: Optional[float] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """Events running at any point in the next `hours` (up to a week), soonest first"""
+    if not 0 < hours <= POPUP_UPCOMING_MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours must be between 0 and {POPUP_UPCOMING_MAX_HOURS}")
+    now = datetime.now(timezone.utc)
+    return await popup_events_between(now, now + timedelta(hours=hours), lat, lng, radius_meters, limit, offset)
 
 @api_router.post("/events/popup", response_model=PopUpEvent)
 async def create_popup_event(event_data: PopUpEventCreate, current_user: User = Depends(get_current_user)):
     if current_user.role not in ["caseworker", "agency_staff"]:
         raise HTTPException(status_code=403, detail="Only agency staff can create events")
     
+    try:
+        start_at = event_datetime(event_data.start_time)
+        end_at = event_datetime(event_data.end_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_time and end_time must be ISO timestamps")
+    if end_at <= start_at:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    
     event = PopUpEvent(
         title=event_data.title,
         description=event_data.description,
@@ -1044,8 +1285,12 @@ async def create_popup_event(event_data: PopUpEventCreate, current_user: User =
     doc['created_at'] = doc['created_at'].isoformat()
     doc['start_time'] = doc['start_time'].isoformat()
     doc['end_time'] = doc['end_time'].isoformat()
+    doc['start_at'] = start_at
+    doc['end_at'] = end_at
     
     await db.popup_events.insert_one(doc)
+    await bump_catalog_version("popup_events")
+    await schedule_reminders("popup_event", event.id, start_at)
     return event
 
 @api_router.delete("/events/popup/{event_id}")
@@ -1056,53 +1301,1218 @@ async def delete_popup_event(event_id: str, current_user: User = Depends(get_cur
     result = await db.popup_events.delete_one({"id": event_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await bump_catalog_version("popup_events")
+    await cancel_reminders("popup_event", event_id)
     return {"message": "Event deleted"}
 
 # ==================== NOTIFICATIONS ====================
 
-@api_router.get("/notifications")
-async def get_notifications(current_user: User = Depends(get_current_user)):
-    """Get all notifications for current user"""
-    notifications = await db.notifications.find(
-        {"user_id": current_user.id},
+# Alerts meant for everyone in a role (sweep alerts) are stored once in
+# broadcast_notifications and merged into each user's feed at read time. Per-user
+# state lives in notification_receipts (read/deleted, written only when the user acts)
+# and notification_cursors (read-all watermark), so posting is O(1) writes.
+# Users only see broadcasts created after they signed up, as with per-user fan-out.
+# A broadcast can be limited to users who have not shared a location (the fallback
+# for geo-targeted alerts); each user's audiences are their role, plus
+# "<role>:unlocated" while they have no last_location.
+#
+# The badge count is materialized in notification_counters, one document per user:
+#   unread            personal notifications not yet read
+#   broadcasts_seen   broadcasts already behind the user's read-all watermark
+#   broadcasts_read   broadcasts read or deleted individually since that watermark
+# Unread broadcasts are then the broadcast_counters totals for the user's audiences
+# minus the other two.
+# Each counter also keeps the read_until it was computed against, so retention can
+# tell whether a removed broadcast was counted as seen or read without a recount.
+# Every write below adjusts these with $inc; repair_notification_counters recomputes
+# them from the source collections to fix any drift. Each adjustment also bumps the
+# counter's version, which together with the role total forms the feed's ETag.
+#
+# Clients sync incrementally with GET /notifications?since=<cursor>: personal
+# notifications carry updated_at, broadcast changes live in receipts, and deleted
+# personal notifications leave a tombstone for NOTIFICATION_TOMBSTONE_DAYS.
+
+# Open /notifications/stream connections; every write below publishes to it
+notification_hub = NotificationHub()
+NOTIFICATION_HEARTBEAT_SECONDS = int(os.environ.get('NOTIFICATION_HEARTBEAT_SECONDS', '15'))
+NOTIFICATION_REPLAY_LIMIT = 100
+NOTIFICATION_COUNTER_REPAIR_HOURS = float(os.environ.get('NOTIFICATION_COUNTER_REPAIR_HOURS', '24'))
+NOTIFICATION_TOMBSTONE_DAYS = 30
+NOTIFICATION_SYNC_LIMIT = 100
+NOTIFICATION_SYNC_OVERLAP_SECONDS = 2  # Re-send writes that may still have been in flight
+BROADCAST_TOTAL_CHECK_SECONDS = 5
+UNLOCATED_AUDIENCE_SUFFIX = ":unlocated"
+_broadcast_totals: Dict[str, tuple] = {}  # audience -> (total, checked_at)
+
+def broadcast_audiences(user: User) -> List[str]:
+    audiences = [user.role]
+    if not user.location_updated_at:
+        audiences.append(user.role + UNLOCATED_AUDIENCE_SUFFIX)
+    return audiences
+
+def broadcast_filter(user: User) -> Dict[str, Any]:
+    """Query selecting the broadcasts addressed to a user"""
+    query = {"audience_roles": user.role}
+    if user.location_updated_at:
+        query["unlocated_only"] = {"$ne": True}
+    return query
+
+async def broadcast_total(audience: str, fresh: bool = False) -> int:
+    """Number of broadcasts ever sent to an audience, cached briefly like catalog versions"""
+    cached = _broadcast_totals.get(audience)
+    if not fresh and cached and time.monotonic() - cached[1] < BROADCAST_TOTAL_CHECK_SECONDS:
+        return cached[0]
+    doc = await db.broadcast_counters.find_one({"audience": audience}, {"_id": 0, "total": 1})
+    total = doc["total"] if doc else 0
+    _broadcast_totals[audience] = (total, time.monotonic())
+    return total
+
+async def migrate_broadcast_counters() -> int:
+    """Re-key counters stored per `role` before audiences existed, merging into any audience counter since created"""
+    legacy = await db.broadcast_counters.find(
+        {"audience": {"$exists": False}, "role": {"$exists": True}}, {"_id": 1, "role": 1, "total": 1}
+    ).to_list(None)
+    for doc in legacy:
+        await db.broadcast_counters.update_one(
+            {"audience": doc["role"]}, {"$inc": {"total": doc.get("total", 0)}}, upsert=True
+        )
+        await db.broadcast_counters.delete_one({"_id": doc["_id"]})
+    _broadcast_totals.clear()
+    return len(legacy)
+
+async def user_broadcast_total(user: User, fresh: bool = False) -> int:
+    return sum([await broadcast_total(audience, fresh) for audience in broadcast_audiences(user)])
+
+async def adjust_unread_counter(user_id: str, **deltas: int):
+    """Apply $inc deltas to a user's counter and bump its version; a missing counter is rebuilt on its next read"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    await db.notification_counters.update_one({"user_id": user_id}, {"$inc": {**deltas, "version": 1}})
+
+async def insert_notification(notification: Dict[str, Any]):
+    """Store a personal notification and push it to the recipient's open streams"""
+    await insert_notifications([notification])
+
+async def insert_notifications(notifications: List[Dict[str, Any]]):
+    """Bulk version of insert_notification: one insert and one counter update per batch"""
+    if not notifications:
+        return
+    for notification in notifications:
+        notification.setdefault("updated_at", notification["created_at"])
+        notification.setdefault("expires_at", notification_expiry(notification))
+    await db.notifications.insert_many(notifications)
+    
+    unread_user_ids = [n["user_id"] for n in notifications if not n.get("read")]
+    if len(notifications) == 1:
+        await adjust_unread_counter(notifications[0]["user_id"], unread=len(unread_user_ids))
+    elif unread_user_ids:
+        # Fan-outs address distinct users, so one $inc per user suffices
+        await db.notification_counters.update_many(
+            {"user_id": {"$in": unread_user_ids}},
+            {"$inc": {"unread": 1, "version": 1}}
+        )
+    
+    for notification in notifications:
+        notification.pop("_id", None)
+        notification_hub.publish_user(notification["user_id"], {
+            "type": "notification",
+            "notification": notification,
+            "unread_delta": 0 if notification.get("read") else 1
+        })
+
+async def create_broadcast_notification(roles: List[str], notification_type: str, title: str, message: str,
+                                        priority: str = "normal", action_url: Optional[str] = None,
+                                        metadata: Optional[Dict[str, Any]] = None,
+                                        unlocated_only: bool = False,
+                                        broadcast_id: Optional[str] = None) -> Dict[str, Any]:
+    """Post one alert to every user in `roles`, or only to those without a known location.
+
+    A caller that may retry passes a stable `broadcast_id`; a repeat post is then a no-op.
+    """
+    from pymongo.errors import DuplicateKeyError
+    
+    if broadcast_id:
+        existing = await db.broadcast_notifications.find_one({"id": broadcast_id}, {"_id": 0})
+        if existing:
+            return existing
+    broadcast = {
+        "id": broadcast_id or str(uuid.uuid4()),
+        "audience_roles": roles,
+        "notification_type": notification_type,
+        "title": title,
+        "message": message,
+        "priority": priority,
+        "action_url": action_url,
+        "metadata": metadata,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    broadcast["expires_at"] = notification_expiry(broadcast)
+    if unlocated_only:
+        broadcast["unlocated_only"] = True
+    try:
+        await db.broadcast_notifications.insert_one(broadcast)
+    except DuplicateKeyError:
+        return await db.broadcast_notifications.find_one({"id": broadcast["id"]}, {"_id": 0})
+    broadcast.pop("_id", None)
+    
+    event = {"type": "notification", "notification": broadcast_as_notification(broadcast, None, False), "unread_delta": 1}
+    for role in roles:
+        audience = role + UNLOCATED_AUDIENCE_SUFFIX if unlocated_only else role
+        await db.broadcast_counters.update_one({"audience": audience}, {"$inc": {"total": 1}}, upsert=True)
+        _broadcast_totals.pop(audience, None)
+        notification_hub.publish_audience(audience, event)
+    return broadcast
+
+async def notify_users_in_area(area: Dict[str, Any], notification_type: str, title: str, message: str,
+                               priority: str = "normal", action_url: Optional[str] = None,
+                               metadata: Optional[Dict[str, Any]] = None, batch_size: int = 1000,
+                               dedupe_key: Optional[str] = None) -> int:
+    """Send a personal notification to every regular user whose last location is inside `area`.
+
+    With a `dedupe_key`, notification ids are derived from it and the user, and users
+    who already have theirs are skipped, so a retried send reaches each user once.
+    """
+    sent = 0
+    cursor = db.users.find(
+        {"role": "user", "last_location": within_area_query(area)},
+        {"_id": 0, "id": 1}
+    )
+    batch = []
+    
+    async def flush():
+        nonlocal batch, sent
+        if dedupe_key and batch:
+            existing = await db.notifications.find(
+                {"id": {"$in": [n["id"] for n in batch]}}, {"_id": 0, "id": 1}
+            ).to_list(None)
+            delivered = {doc["id"] for doc in existing}
+            batch = [n for n in batch if n["id"] not in delivered]
+        await insert_notifications(batch)
+        sent += len(batch)
+        batch = []
+    
+    async for user_doc in cursor:
+        now = datetime.now(timezone.utc).isoformat()
+        batch.append({
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{dedupe_key}:{user_doc['id']}")) if dedupe_key else str(uuid.uuid4()),
+            "user_id": user_doc["id"],
+            "notification_type": notification_type,
+            "title": title,
+            "message": message,
+            "priority": priority,
+            "read": False,
+            "action_url": action_url,
+            "metadata": metadata,
+            "created_at": now
+        })
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    return sent
+
+async def broadcast_read_until(user: User) -> str:
+    """Broadcasts created at or before this timestamp count as read for the user"""
+    cursor = await db.notification_cursors.find_one({"user_id": user.id}, {"_id": 0, "broadcasts_read_until": 1})
+    signed_up = user.created_at.isoformat()
+    read_all = cursor.get("broadcasts_read_until") if cursor else None
+    return max(signed_up, read_all) if read_all else signed_up
+
+def broadcast_as_notification(broadcast: Dict[str, Any], user_id: Optional[str], read: bool) -> Dict[str, Any]:
+    item = {k: v for k, v in broadcast.items() if k not in ("_id", "audience_roles", "unlocated_only")}
+    item["user_id"] = user_id
+    item["read"] = read
+    item["broadcast"] = True
+    return item
+
+async def get_user_broadcasts(user: User, limit: int = 100, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Latest broadcasts addressed to the user's role, shaped like personal notifications"""
+    read_until = await broadcast_read_until(user)
+    created_after = max(user.created_at.isoformat(), since) if since else user.created_at.isoformat()
+    broadcasts = await db.broadcast_notifications.find(
+        {**broadcast_filter(user), "created_at": {"$gt" if since else "$gte": created_after}},
         {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
+    ).sort("created_at", -1).to_list(limit)
+    if not broadcasts:
+        return []
+    
+    receipts = await db.notification_receipts.find(
+        {"user_id": user.id, "notification_id": {"$in": [b["id"] for b in broadcasts]}},
+        {"_id": 0, "notification_id": 1, "read": 1, "deleted": 1}
+    ).to_list(len(broadcasts))
+    by_id = {r["notification_id"]: r for r in receipts}
+    
+    items = []
+    for b in broadcasts:
+        receipt = by_id.get(b["id"], {})
+        if receipt.get("deleted"):
+            continue
+        read = b["created_at"] <= read_until or receipt.get("read", False)
+        items.append(broadcast_as_notification(b, user.id, read))
+    return items
+
+async def reconcile_unread_counter(user: User) -> Dict[str, Any]:
+    """Recompute a user's counter from notifications, broadcasts and receipts"""
+    read_until = await broadcast_read_until(user)
+    unread = await db.notifications.count_documents({"user_id": user.id, "read": False})
+    newer = await db.broadcast_notifications.count_documents(
+        {**broadcast_filter(user), "created_at": {"$gt": read_until}}
+    )
+    # Every receipt marks its broadcast read (deleted implies read)
+    acted_on = await db.notification_receipts.count_documents(
+        {"user_id": user.id, "broadcast_created_at": {"$gt": read_until}}
+    )
+    counter = {
+        "user_id": user.id,
+        "audiences": broadcast_audiences(user),
+        "unread": unread,
+        "broadcasts_seen": await user_broadcast_total(user, fresh=True) - newer,
+        "broadcasts_read": acted_on,
+        "read_until": read_until,
+        "version": 0,
+        "reconciled_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.notification_counters.replace_one({"user_id": user.id}, counter, upsert=True)
+    return counter
+
+async def get_unread_counter(user: User) -> Dict[str, Any]:
+    counter = await db.notification_counters.find_one({"user_id": user.id}, {"_id": 0})
+    if counter is None or counter.get("audiences") != broadcast_audiences(user) or "read_until" not in counter:
+        counter = await reconcile_unread_counter(user)
+    return counter
+
+async def count_unread_broadcasts(user: User, counter: Optional[Dict[str, Any]] = None) -> int:
+    counter = counter or await get_unread_counter(user)
+    total = await user_broadcast_total(user)
+    return max(total - counter["broadcasts_seen"] - counter["broadcasts_read"], 0)
+
+async def count_unread_notifications(user: User) -> int:
+    counter = await get_unread_counter(user)
+    return max(counter["unread"], 0) + await count_unread_broadcasts(user, counter)
+
+async def update_broadcast_receipt(user: User, notification_id: str, fields: Dict[str, Any]) -> Optional[int]:
+    """Record read/deleted state for a broadcast.
+
+    Returns how many unread notifications this cleared (0 or 1), or None when no such
+    broadcast is addressed to the user.
+    """
+    broadcast = await db.broadcast_notifications.find_one(
+        {**broadcast_filter(user), "id": notification_id},
+        {"_id": 0, "created_at": 1}
+    )
+    if not broadcast:
+        return None
+    previous = await db.notification_receipts.find_one_and_update(
+        {"user_id": user.id, "notification_id": notification_id},
+        {
+            "$set": {**fields, "updated_at": datetime.now(timezone.utc).isoformat()},
+            "$setOnInsert": {"broadcast_created_at": broadcast["created_at"]}
+        },
+        upsert=True
+    )
+    if previous and previous.get("read"):
+        return 0
+    return 0 if broadcast["created_at"] <= await broadcast_read_until(user) else 1
+
+def notification_feed_etag(user: User, counter: Dict[str, Any], total: int, since: Optional[str]) -> str:
+    key = f"{user.id}|{counter.get('reconciled_at')}|{counter.get('version', 0)}|{total}|{since or ''}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+async def sync_notifications(user: User, since: str) -> Dict[str, Any]:
+    """Notifications created or changed after `since`, plus ids deleted since then.
+
+    Sets "resync" instead when the client is too far behind to catch up incrementally.
+    """
+    tombstone_cutoff = (datetime.now(timezone.utc) - timedelta(days=NOTIFICATION_TOMBSTONE_DAYS)).isoformat()
+    if since < tombstone_cutoff:
+        return {"resync": True}
     
-    unread_count = await db.notifications.count_documents({"user_id": current_user.id, "read": False})
+    changed = await db.notifications.find(
+        {"user_id": user.id, "updated_at": {"$gt": since}},
+        {"_id": 0}
+    ).sort("updated_at", -1).to_list(NOTIFICATION_SYNC_LIMIT)
+    new_broadcasts = await get_user_broadcasts(user, limit=NOTIFICATION_SYNC_LIMIT, since=since)
+    receipts = await db.notification_receipts.find(
+        {"user_id": user.id, "updated_at": {"$gt": since}},
+        {"_id": 0, "notification_id": 1, "read": 1, "deleted": 1}
+    ).to_list(NOTIFICATION_SYNC_LIMIT)
+    if max(len(changed), len(new_broadcasts), len(receipts)) >= NOTIFICATION_SYNC_LIMIT:
+        return {"resync": True}
+    
+    deleted = [r["notification_id"] for r in receipts if r.get("deleted")]
+    tombstones = await db.notification_tombstones.find(
+        {"user_id": user.id, "deleted_at": {"$gt": since}},
+        {"_id": 0, "notification_id": 1}
+    ).to_list(None)
+    deleted += [t["notification_id"] for t in tombstones]
+    
+    # Older broadcasts read one by one since the cursor
+    new_ids = {b["id"] for b in new_broadcasts}
+    read_ids = [r["notification_id"] for r in receipts if not r.get("deleted") and r["notification_id"] not in new_ids]
+    if read_ids:
+        read_broadcasts = await db.broadcast_notifications.find({"id": {"$in": read_ids}}, {"_id": 0}).to_list(len(read_ids))
+        new_broadcasts += [broadcast_as_notification(b, user.id, True) for b in read_broadcasts]
+    
+    cursor = await db.notification_cursors.find_one({"user_id": user.id}, {"_id": 0, "broadcasts_read_until": 1})
+    read_all_before = cursor.get("broadcasts_read_until") if cursor else None
     
     return {
-        "notifications": notifications,
-        "unread_count": unread_count
+        "notifications": sorted(changed + new_broadcasts, key=lambda n: n.get("created_at", ""), reverse=True),
+        "deleted": deleted,
+        # Everything created at or before this time has been marked read
+        "read_all_before": read_all_before if read_all_before and read_all_before > since else None
     }
 
+@api_router.get("/notifications")
+async def get_notifications(request: Request, since: Optional[str] = None,
+                            current_user: User = Depends(get_current_user)):
+    """Get notifications for current user.
+
+    With `since` (the `cursor` of a previous response) only notifications created or
+    changed after it are returned, with deleted ids in `deleted`. Responses carry an
+    ETag, so an unchanged feed answers If-None-Match with 304.
+    """
+    counter = await get_unread_counter(current_user)
+    total = await user_broadcast_total(current_user)
+    etag = notification_feed_etag(current_user, counter, total, since)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    next_cursor = (datetime.now(timezone.utc) - timedelta(seconds=NOTIFICATION_SYNC_OVERLAP_SECONDS)).isoformat()
+    
+    if since:
+        body = await sync_notifications(current_user, since)
+    else:
+        body = {"resync": True}
+    
+    if body.get("resync"):
+        notifications = await db.notifications.find(
+            {"user_id": current_user.id},
+            {"_id": 0}
+        ).sort("created_at", -1).to_list(100)
+        broadcasts = await get_user_broadcasts(current_user)
+        
+        if broadcasts:
+            notifications = sorted(notifications + broadcasts, key=lambda n: n.get("created_at", ""), reverse=True)[:100]
+        body = {"notifications": notifications, "resync": bool(since)}
+    
+    body["unread_count"] = max(counter["unread"], 0) + max(total - counter["broadcasts_seen"] - counter["broadcasts_read"], 0)
+    body["cursor"] = next_cursor
+    return JSONResponse(content=body, headers=headers)
+
+async def notifications_since(user: User, cursor: str) -> Optional[List[Dict[str, Any]]]:
+    """Notifications created after `cursor`, oldest first; None if too many to replay"""
+    personal = await db.notifications.find(
+        {"user_id": user.id, "created_at": {"$gt": cursor}},
+        {"_id": 0}
+    ).sort("created_at", -1).to_list(NOTIFICATION_REPLAY_LIMIT)
+    broadcasts = await get_user_broadcasts(user, limit=NOTIFICATION_REPLAY_LIMIT, since=cursor)
+    if len(personal) >= NOTIFICATION_REPLAY_LIMIT or len(broadcasts) >= NOTIFICATION_REPLAY_LIMIT:
+        return None
+    return sorted(personal + broadcasts, key=lambda n: n.get("created_at", ""))
+
+@api_router.get("/notifications/stream")
+async def stream_notifications(request: Request, cursor: Optional[str] = None,
+                               current_user: User = Depends(get_current_user)):
+    """Server-Sent Events feed of new notifications and unread-count changes.
+
+    Pass the created_at of the newest notification already shown as `cursor` (or let
+    the browser send Last-Event-ID) to replay anything missed while disconnected.
+    A comment line is sent every NOTIFICATION_HEARTBEAT_SECONDS to keep proxies and
+    mobile connections open.
+    """
+    cursor = cursor or request.headers.get("last-event-id")
+    user = current_user
+    
+    async def events():
+        # Subscribe before replaying so nothing published in between is lost. Such an
+        # event is then both replayed and queued; the queued copy is dropped by id so
+        # its unread_delta isn't applied on top of the snapshot
+        queue = notification_hub.subscribe(user.id, broadcast_audiences(user))
+        replayed = set()
+        try:
+            yield "retry: 5000\n\n"
+            if cursor:
+                missed = await notifications_since(user, cursor)
+                if missed is None:
+                    yield format_sse({"type": "resync"})
+                else:
+                    for notification in missed:
+                        replayed.add(notification["id"])
+                        yield format_sse({"type": "notification", "notification": notification, "unread_delta": 0},
+                                         event_id=notification["created_at"])
+            yield format_sse({"type": "snapshot", "unread_count": await count_unread_notifications(user)})
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=NOTIFICATION_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event["type"] == "notification" and event["notification"]["id"] in replayed:
+                    replayed.discard(event["notification"]["id"])
+                    continue
+                event_id = event["notification"]["created_at"] if event["type"] == "notification" else None
+                yield format_sse(event, event_id=event_id)
+        finally:
+            notification_hub.unsubscribe(user.id, broadcast_audiences(user), queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.patch("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: User = Depends(get_current_user)):
     """Mark a notification as read"""
     result = await db.notifications.update_one(
         {"id": notification_id, "user_id": current_user.id},
-        {"$set": {"read": True}}
+        {"$set": {"read": True, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Notification not found")
+    cleared = result.modified_count
+    if cleared:
+        await adjust_unread_counter(current_user.id, unread=-cleared)
+    else:
+        cleared = await update_broadcast_receipt(current_user, notification_id, {"read": True})
+        if cleared is None:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        await adjust_unread_counter(current_user.id, broadcasts_read=cleared)
+    notification_hub.publish_user(current_user.id, {"type": "read", "id": notification_id, "unread_delta": -cleared})
     return {"message": "Notification marked as read"}
 
 @api_router.patch("/notifications/read-all")
 async def mark_all_notifications_read(current_user: User = Depends(get_current_user)):
     """Mark all notifications as read"""
+    unread_broadcasts = await count_unread_broadcasts(current_user)
+    now = datetime.now(timezone.utc).isoformat()
     result = await db.notifications.update_many(
         {"user_id": current_user.id, "read": False},
-        {"$set": {"read": True}}
+        {"$set": {"read": True, "updated_at": now}}
+    )
+    await db.notification_cursors.update_one(
+        {"user_id": current_user.id},
+        {"$set": {"broadcasts_read_until": now}},
+        upsert=True
+    )
+    await db.notification_counters.update_one(
+        {"user_id": current_user.id},
+        {
+            "$inc": {"unread": -result.modified_count, "version": 1},
+            "$set": {
+                "broadcasts_seen": await user_broadcast_total(current_user, fresh=True),
+                "broadcasts_read": 0,
+                "read_until": now
+            }
+        }
     )
-    return {"message": f"{result.modified_count} notifications marked as read"}
+    cleared = result.modified_count + unread_broadcasts
+    notification_hub.publish_user(current_user.id, {"type": "read_all", "unread_delta": -cleared})
+    return {"message": f"{cleared} notifications marked as read"}
 
 @api_router.delete("/notifications/{notification_id}")
 async def delete_notification(notification_id: str, current_user: User = Depends(get_current_user)):
     """Delete a notification"""
-    result = await db.notifications.delete_one({"id": notification_id, "user_id": current_user.id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Notification not found")
+    deleted = await db.notifications.find_one_and_delete(
+        {"id": notification_id, "user_id": current_user.id},
+        projection={"_id": 0, "read": 1}
+    )
+    if deleted is not None:
+        cleared = 0 if deleted.get("read") else 1
+        now = datetime.now(timezone.utc)
+        await db.notification_tombstones.insert_one({
+            "user_id": current_user.id,
+            "notification_id": notification_id,
+            "deleted_at": now.isoformat(),
+            "expire_at": now + timedelta(days=NOTIFICATION_TOMBSTONE_DAYS)
+        })
+        await adjust_unread_counter(current_user.id, unread=-cleared)
+    else:
+        cleared = await update_broadcast_receipt(current_user, notification_id, {"read": True, "deleted": True})
+        if cleared is None:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        await adjust_unread_counter(current_user.id, broadcasts_read=cleared)
+    notification_hub.publish_user(current_user.id, {"type": "deleted", "id": notification_id, "unread_delta": -cleared})
     return {"message": "Notification deleted"}
 
+async def repair_notification_counters(batch_size: int = 500) -> Dict[str, int]:
+    """Recompute every materialized unread counter and report how many had drifted"""
+    checked = 0
+    repaired = 0
+    last_user_id = ""
+    while True:
+        counters = await db.notification_counters.find(
+            {"user_id": {"$gt": last_user_id}}, {"_id": 0}
+        ).sort("user_id", 1).to_list(batch_size)
+        if not counters:
+            break
+        last_user_id = counters[-1]["user_id"]
+        
+        users = await db.users.find(
+            {"id": {"$in": [c["user_id"] for c in counters]}},
+            {"_id": 0, "password_hash": 0}
+        ).to_list(len(counters))
+        users_by_id = {u["id"]: u for u in users}
+        
+        for counter in counters:
+            checked += 1
+            user_doc = users_by_id.get(counter["user_id"])
+            if user_doc is None:
+                await db.notification_counters.delete_one({"user_id": counter["user_id"]})
+                repaired += 1
+                continue
+            if isinstance(user_doc.get('created_at'), str):
+                user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+            fresh = await reconcile_unread_counter(User(**user_doc))
+            if any(counter.get(k) != fresh[k] for k in ("audiences", "unread", "broadcasts_seen", "broadcasts_read")):
+                repaired += 1
+    
+    if repaired:
+        logging.warning(f"Repaired {repaired} of {checked} notification counters")
+    return {"checked": checked, "repaired": repaired}
+
+async def notification_counter_repair_loop():
+    """Background worker: reconcile unread counters every NOTIFICATION_COUNTER_REPAIR_HOURS"""
+    while True:
+        await asyncio.sleep(NOTIFICATION_COUNTER_REPAIR_HOURS * 3600)
+        try:
+            await repair_notification_counters()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Notification counter repair error: {e}")
+
+@api_router.post("/admin/notifications/repair-counters")
+async def trigger_notification_counter_repair(current_user: User = Depends(get_current_user)):
+    """Reconcile all unread counters now"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can repair notification counters")
+    return await repair_notification_counters()
+
+# ==================== NOTIFICATION RETENTION ====================
+
+# Every notification and broadcast gets an expires_at when written, from the most
+# specific matching "<notification_type>:<priority>" rule ("*" matches anything).
+# Override with NOTIFICATION_RETENTION, e.g. '{"sweep_alert:*": 7, "*:*": 45}'.
+# The archival job moves expired documents in batches into notifications_archive as
+# gzip-compressed JSON (or just deletes them when NOTIFICATION_ARCHIVE_ENABLED=false)
+# and drops sweep alerts superseded by a newer alert for the same sweep_id.
+def notification_retention_overrides() -> Dict[str, float]:
+    """NOTIFICATION_RETENTION rules; a malformed value is logged and ignored rather than failing startup"""
+    raw = os.environ.get('NOTIFICATION_RETENTION', '{}')
+    try:
+        overrides = json.loads(raw)
+        if not isinstance(overrides, dict):
+            raise ValueError("expected a JSON object")
+        return {str(key): float(days) for key, days in overrides.items()}
+    except (TypeError, ValueError) as e:
+        logging.error(f"Ignoring invalid NOTIFICATION_RETENTION {raw!r}: {e}")
+        return {}
+
+NOTIFICATION_RETENTION_DAYS = {
+    "sweep_alert:*": 14,
+    "high_priority_client:*": 90,
+    "*:urgent": 60,
+    "*:*": 30,
+    **notification_retention_overrides()
+}
+NOTIFICATION_ARCHIVE_ENABLED = os.environ.get('NOTIFICATION_ARCHIVE_ENABLED', 'true').lower() == 'true'
+NOTIFICATION_ARCHIVE_HOURS = float(os.environ.get('NOTIFICATION_ARCHIVE_HOURS', '6'))
+
+def notification_retention_days(notification_type: Optional[str], priority: Optional[str]) -> float:
+    for key in (f"{notification_type}:{priority}", f"{notification_type}:*", f"*:{priority}", "*:*"):
+        if key in NOTIFICATION_RETENTION_DAYS:
+            return NOTIFICATION_RETENTION_DAYS[key]
+    return 30
+
+def notification_expiry(notification: Dict[str, Any]) -> str:
+    created_at = datetime.fromisoformat(notification["created_at"])
+    days = notification_retention_days(notification.get("notification_type"), notification.get("priority"))
+    return (created_at + timedelta(days=days)).isoformat()
+
+async def backfill_notification_expiry(collection, batch_size: int) -> int:
+    """Give documents written before retention existed an expires_at"""
+    from pymongo import UpdateOne
+    
+    updated = 0
+    while True:
+        docs = await collection.find(
+            {"expires_at": {"$exists": False}},
+            {"_id": 0, "id": 1, "notification_type": 1, "priority": 1, "created_at": 1}
+        ).to_list(batch_size)
+        if not docs:
+            return updated
+        await collection.bulk_write([
+            UpdateOne({"id": d["id"]}, {"$set": {"expires_at": notification_expiry(d)}}) for d in docs
+        ], ordered=False)
+        updated += len(docs)
+
+async def remove_notifications(collection_name: str, docs: List[Dict[str, Any]], reason: str) -> int:
+    """Archive (or delete) notification documents, keeping unread counters in step"""
+    from pymongo import UpdateOne
+    
+    if not docs:
+        return 0
+    ids = [d["id"] for d in docs]
+    
+    if NOTIFICATION_ARCHIVE_ENABLED:
+        payload = json.dumps(docs, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        created = [d.get("created_at", "") for d in docs]
+        await db.notifications_archive.insert_one({
+            "id": str(uuid.uuid4()),
+            "collection": collection_name,
+            "reason": reason,
+            "count": len(docs),
+            "oldest": min(created),
+            "newest": max(created),
+            "user_ids": sorted({d["user_id"] for d in docs if d.get("user_id")}),
+            "notification_ids": ids,
+            "data": gzip.compress(payload),
+            "archived_at": datetime.now(timezone.utc).isoformat()
+        })
+    
+    await db[collection_name].delete_many({"id": {"$in": ids}})
+    
+    if collection_name == "broadcast_notifications":
+        await forget_broadcasts(docs)
+        await db.notification_receipts.delete_many({"notification_id": {"$in": ids}})
+    else:
+        unread_by_user: Dict[str, int] = {}
+        for d in docs:
+            if not d.get("read"):
+                unread_by_user[d["user_id"]] = unread_by_user.get(d["user_id"], 0) + 1
+        if unread_by_user:
+            await db.notification_counters.bulk_write([
+                UpdateOne({"user_id": user_id}, {"$inc": {"unread": -count, "version": 1}})
+                for user_id, count in unread_by_user.items()
+            ], ordered=False)
+    return len(docs)
+
+async def forget_broadcasts(broadcasts: List[Dict[str, Any]]):
+    """Take removed broadcasts out of their audience totals and out of the counters that
+    counted them as seen or read, so unread badges stay right without a recount"""
+    from pymongo import UpdateMany, UpdateOne
+    
+    receipts = await db.notification_receipts.find(
+        {"notification_id": {"$in": [b["id"] for b in broadcasts]}},
+        {"_id": 0, "user_id": 1, "notification_id": 1}
+    ).to_list(None)
+    readers: Dict[str, List[str]] = {}
+    for receipt in receipts:
+        readers.setdefault(receipt["notification_id"], []).append(receipt["user_id"])
+    
+    removed: Dict[str, int] = {}
+    counter_ops = []
+    for b in broadcasts:
+        for role in b.get("audience_roles") or []:
+            audience = role + UNLOCATED_AUDIENCE_SUFFIX if b.get("unlocated_only") else role
+            removed[audience] = removed.get(audience, 0) + 1
+            # Behind the user's watermark: counted in broadcasts_seen
+            counter_ops.append(UpdateMany(
+                {"audiences": audience, "read_until": {"$gte": b["created_at"]}},
+                {"$inc": {"broadcasts_seen": -1, "version": 1}}
+            ))
+        if b["id"] in readers:
+            # Read individually after the watermark: counted in broadcasts_read
+            counter_ops.append(UpdateMany(
+                {"user_id": {"$in": readers[b["id"]]}, "read_until": {"$lt": b["created_at"]}},
+                {"$inc": {"broadcasts_read": -1, "version": 1}}
+            ))
+    if removed:
+        await db.broadcast_counters.bulk_write([
+            UpdateOne({"audience": audience}, {"$inc": {"total": -count}})
+            for audience, count in removed.items()
+        ], ordered=False)
+        for audience in removed:
+            _broadcast_totals.pop(audience, None)
+    if counter_ops:
+        await db.notification_counters.bulk_write(counter_ops, ordered=False)
+
+async def compact_superseded_sweep_alerts(batch_size: int) -> int:
+    """Keep only the newest alert per sweep_id (per user for personal alerts)"""
+    compacted = 0
+    for collection_name, group_key in (
+        ("notifications", {"user_id": "$user_id", "sweep_id": "$metadata.sweep_id"}),
+        ("broadcast_notifications", {"sweep_id": "$metadata.sweep_id"}),
+    ):
+        groups = await db[collection_name].aggregate([
+            {"$match": {"metadata.sweep_id": {"$ne": None}}},
+            {"$sort": {"created_at": -1}},
+            {"$group": {"_id": group_key, "ids": {"$push": "$id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": batch_size}
+        ]).to_list(batch_size)
+        superseded = [i for g in groups for i in g["ids"][1:]]
+        if not superseded:
+            continue
+        docs = await db[collection_name].find({"id": {"$in": superseded}}, {"_id": 0}).to_list(len(superseded))
+        compacted += await remove_notifications(collection_name, docs, "superseded")
+        if collection_name == "notifications":
+            now = datetime.now(timezone.utc)
+            await db.notification_tombstones.insert_many([{
+                "user_id": d["user_id"],
+                "notification_id": d["id"],
+                "deleted_at": now.isoformat(),
+                "expire_at": now + timedelta(days=NOTIFICATION_TOMBSTONE_DAYS)
+            } for d in docs])
+    return compacted
+
+async def archive_expired_notifications(batch_size: int = 500) -> Dict[str, Any]:
+    """Apply retention: backfill expiry, compact superseded sweep alerts, archive expired documents"""
+    report = {"backfilled": 0, "compacted": 0, "archived": 0, "broadcasts_archived": 0}
+    for collection in (db.notifications, db.broadcast_notifications):
+        report["backfilled"] += await backfill_notification_expiry(collection, batch_size)
+    
+    report["compacted"] = await compact_superseded_sweep_alerts(batch_size)
+    
+    now = datetime.now(timezone.utc).isoformat()
+    for collection_name, key in (("notifications", "archived"), ("broadcast_notifications", "broadcasts_archived")):
+        while True:
+            docs = await db[collection_name].find(
+                {"expires_at": {"$lte": now}}, {"_id": 0}
+            ).sort("expires_at", 1).to_list(batch_size)
+            if not docs:
+                break
+            report[key] += await remove_notifications(collection_name, docs, "expired")
+    
+    report["mode"] = "archive" if NOTIFICATION_ARCHIVE_ENABLED else "delete"
+    return report
+
+async def notification_archive_loop():
+    """Background worker: run retention every NOTIFICATION_ARCHIVE_HOURS"""
+    while True:
+        await asyncio.sleep(NOTIFICATION_ARCHIVE_HOURS * 3600)
+        try:
+            report = await archive_expired_notifications()
+            logging.info(f"Notification retention: {report}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Notification archival error: {e}")
+
+@api_router.post("/admin/notifications/archive")
+async def trigger_notification_archival(current_user: User = Depends(get_current_user)):
+    """Apply notification retention now"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can run notification archival")
+    return await archive_expired_notifications()
+
+@api_router.get("/admin/notifications/archive")
+async def get_notification_archive_status(current_user: User = Depends(get_current_user)):
+    """Hot and archived notification volumes with the active retention rules"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can view notification archival")
+    
+    archived = await db.notifications_archive.aggregate([
+        {"$group": {"_id": "$collection", "documents": {"$sum": "$count"}, "batches": {"$sum": 1}}}
+    ]).to_list(None)
+    return {
+        "retention_days": NOTIFICATION_RETENTION_DAYS,
+        "mode": "archive" if NOTIFICATION_ARCHIVE_ENABLED else "delete",
+        "hot": {
+            "notifications": await db.notifications.count_documents({}),
+            "broadcast_notifications": await db.broadcast_notifications.count_documents({})
+        },
+        "archived": {a["_id"]: {"documents": a["documents"], "batches": a["batches"]} for a in archived}
+    }
+
+# ==================== NOTIFICATION OUTBOX ====================
+
+# Fan-out that may reach many recipients (e.g. high-priority assessment alerts to
+# every caseworker) is not done inside the request. The request records one
+# notification_outbox entry, keyed by a dedupe_key so the same event is only queued
+# once, and a background dispatcher delivers it in bulk batches with retries.
+#
+# The entry is written before the source document (e.g. the assessment) and names
+# it in `source`; the dispatcher drops entries whose source never got written, so an
+# alert goes out exactly when its source exists, without needing a transaction.
+# Notification ids are derived from the entry and recipient, so a retried batch
+# skips recipients it already reached.
+NOTIFICATION_OUTBOX_POLL_SECONDS = float(os.environ.get('NOTIFICATION_OUTBOX_POLL_SECONDS', '5'))
+NOTIFICATION_OUTBOX_BATCH_SIZE = 500
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 8
+NOTIFICATION_OUTBOX_LEASE_SECONDS = 120
+NOTIFICATION_OUTBOX_SOURCE_GRACE_SECONDS = 60  # How long to wait for the source document to appear
+notification_outbox_wakeup = asyncio.Event()
+
+async def enqueue_notification_fanout(dedupe_key: str, roles: List[str], notification: Dict[str, Any],
+                                      source: Optional[Dict[str, str]] = None) -> bool:
+    """Queue a notification for every user in `roles`; False if this dedupe_key was already queued"""
+    from pymongo.errors import DuplicateKeyError
+    
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        await db.notification_outbox.insert_one({
+            "id": str(uuid.uuid4()),
+            "dedupe_key": dedupe_key,
+            "roles": roles,
+            "notification": notification,
+            "source": source,
+            "status": "pending",
+            "attempts": 0,
+            "delivered": 0,
+            "last_user_id": "",
+            "next_attempt_at": now,
+            "created_at": now
+        })
+    except DuplicateKeyError:
+        return False
+    notification_outbox_wakeup.set()
+    return True
+
+async def claim_outbox_entry() -> Optional[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return await db.notification_outbox.find_one_and_update(
+        # A "dispatching" entry whose lease ran out belonged to a worker that died
+        {"status": {"$in": ["pending", "dispatching"]}, "next_attempt_at": {"$lte": now.isoformat()}},
+        {"$set": {
+            "status": "dispatching",
+            "next_attempt_at": (now + timedelta(seconds=NOTIFICATION_OUTBOX_LEASE_SECONDS)).isoformat()
+        }},
+        sort=[("next_attempt_at", 1)],
+        projection={"_id": 0},
+        return_document=True
+    )
+
+async def dispatch_outbox_entry(entry: Dict[str, Any]) -> Optional[int]:
+    """Deliver an entry to its remaining recipients, batch by batch.
+
+    Returns the number of notifications sent, or None if the entry was dropped.
+    """
+    source = entry.get("source")
+    if source and not await db[source["collection"]].find_one({"id": source["id"]}, {"_id": 1}):
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(entry["created_at"])
+        if age.total_seconds() < NOTIFICATION_OUTBOX_SOURCE_GRACE_SECONDS:
+            raise RuntimeError(f"Source {source['collection']}/{source['id']} not written yet")
+        await db.notification_outbox.update_one(
+            {"id": entry["id"]},
+            {"$set": {"status": "dropped", "finished_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        return None
+    
+    sent = 0
+    last_user_id = entry.get("last_user_id", "")
+    while True:
+        # Keyset pagination so a retry resumes after the last completed batch
+        recipients = await db.users.find(
+            {"role": {"$in": entry["roles"]}, "id": {"$gt": last_user_id}},
+            {"_id": 0, "id": 1}
+        ).sort("id", 1).to_list(NOTIFICATION_OUTBOX_BATCH_SIZE)
+        if not recipients:
+            break
+        
+        now = datetime.now(timezone.utc).isoformat()
+        batch = {
+            str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry['dedupe_key']}:{r['id']}")): r["id"]
+            for r in recipients
+        }
+        existing = await db.notifications.find(
+            {"id": {"$in": list(batch)}}, {"_id": 0, "id": 1}
+        ).to_list(len(batch))
+        for doc in existing:
+            batch.pop(doc["id"], None)
+        
+        await insert_notifications([
+            {**entry["notification"], "id": notification_id, "user_id": user_id, "read": False, "created_at": now}
+            for notification_id, user_id in batch.items()
+        ])
+        sent += len(batch)
+        last_user_id = recipients[-1]["id"]
+        await db.notification_outbox.update_one(
+            {"id": entry["id"]},
+            {"$set": {"last_user_id": last_user_id}, "$inc": {"delivered": len(batch)}}
+        )
+    
+    await db.notification_outbox.update_one(
+        {"id": entry["id"]},
+        {"$set": {"status": "delivered", "finished_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return sent
+
+async def run_outbox_dispatch(max_entries: int = 50) -> Dict[str, int]:
+    """Deliver due outbox entries; failures are retried with exponential backoff"""
+    report = {"delivered": 0, "notifications": 0, "dropped": 0, "retrying": 0, "failed": 0}
+    for _ in range(max_entries):
+        entry = await claim_outbox_entry()
+        if not entry:
+            break
+        try:
+            sent = await dispatch_outbox_entry(entry)
+            if sent is None:
+                report["dropped"] += 1
+            else:
+                report["notifications"] += sent
+                report["delivered"] += 1
+        except Exception as e:
+            attempts = entry.get("attempts", 0) + 1
+            failed = attempts >= NOTIFICATION_OUTBOX_MAX_ATTEMPTS
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=min(2 ** attempts, 600))
+            await db.notification_outbox.update_one(
+                {"id": entry["id"]},
+                {"$set": {
+                    "status": "failed" if failed else "pending",
+                    "attempts": attempts,
+                    "next_attempt_at": retry_at.isoformat(),
+                    "last_error": str(e)
+                }}
+            )
+            report["failed" if failed else "retrying"] += 1
+            log = logging.error if failed else logging.warning
+            log(f"Notification outbox entry {entry['dedupe_key']} attempt {attempts} failed: {e}")
+    return report
+
+async def notification_outbox_loop():
+    """Background worker: dispatch as soon as something is queued, and poll for retries"""
+    while True:
+        try:
+            await asyncio.wait_for(notification_outbox_wakeup.wait(), timeout=NOTIFICATION_OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        notification_outbox_wakeup.clear()
+        try:
+            await run_outbox_dispatch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Notification outbox loop error: {e}")
+
+@api_router.get("/admin/notifications/outbox")
+async def get_notification_outbox_status(current_user: User = Depends(get_current_user)):
+    """Outbox entries by status, with the most recent failures"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can view the notification outbox")
+    
+    by_status = await db.notification_outbox.aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    failures = await db.notification_outbox.find(
+        {"status": "failed"},
+        {"_id": 0, "id": 1, "dedupe_key": 1, "attempts": 1, "last_error": 1, "created_at": 1}
+    ).sort("created_at", -1).to_list(20)
+    return {"by_status": {s["_id"]: s["count"] for s in by_status}, "recent_failures": failures}
+
+# ==================== REMINDER SCHEDULER ====================
+
+# Staged reminders for sweeps and pop-up events (stages and their times are in
+# reminders.py) are delayed jobs in scheduled_reminders. Jobs are written when the sweep or event is created, keyed by
+# a dedupe_key, so scheduling twice (or the startup backfill) never doubles them.
+#
+# The queue works like a timing wheel kept in Mongo: time is cut into minute slots
+# and (status, next_at) is indexed, so a tick claims everything due, in order,
+# without touching far-future jobs; between ticks the worker sleeps until the end of
+# the next occupied slot (or a wakeup when a sooner job is scheduled). Workers lease jobs
+# (`next_at` becomes the lease expiry), so jobs held by a worker that died are picked
+# up again; delivery derives notification ids from the job, so a re-run after a
+# crash does not notify anyone twice. Jobs are dropped when their source was deleted,
+# rescheduled or has already started.
+REMINDER_SLOT_SECONDS = 60
+REMINDER_POLL_SECONDS = float(os.environ.get('REMINDER_POLL_SECONDS', '60'))
+REMINDER_LEASE_SECONDS = 300
+REMINDER_MAX_ATTEMPTS = 6
+REMINDER_CLAIM_BATCH = 100
+REMINDER_EVENT_RADIUS_METERS = 5000
+REMINDER_SOURCES = {"sweep": ("cleanup_sweeps", "scheduled_at"), "popup_event": ("popup_events", "start_at")}
+reminder_wakeup = asyncio.Event()
+_reminder_worker_id = str(uuid.uuid4())
+
+def reminder_slot(moment: datetime) -> int:
+    return int(moment.timestamp() // REMINDER_SLOT_SECONDS)
+
+async def schedule_reminders(kind: str, source_id: str, starts_at: datetime,
+                             advance_notice_days: Optional[int] = None) -> int:
+    """Queue the reminders for a sweep or event that are still in the future; returns how many were new"""
+    from pymongo import UpdateOne
+    
+    now = datetime.now(timezone.utc)
+    ops = []
+    for stage, due_at in reminder_stages(starts_at, DIRECTORY_TIMEZONE, advance_notice_days):
+        if due_at <= now:
+            continue
+        dedupe_key = f"{kind}:{source_id}:{stage}"
+        ops.append(UpdateOne({"dedupe_key": dedupe_key}, {"$setOnInsert": {
+            "id": str(uuid.uuid4()),
+            "dedupe_key": dedupe_key,
+            "kind": kind,
+            "source_id": source_id,
+            "source_at": starts_at,
+            "stage": stage,
+            "due_at": due_at,
+            "status": "pending",
+            "next_at": due_at,
+            "attempts": 0,
+            "created_at": now.isoformat()
+        }}, upsert=True))
+    if not ops:
+        return 0
+    result = await db.scheduled_reminders.bulk_write(ops, ordered=False)
+    if result.upserted_count:
+        reminder_wakeup.set()
+    return result.upserted_count
+
+async def cancel_reminders(kind: str, source_id: str) -> int:
+    result = await db.scheduled_reminders.update_many(
+        {"kind": kind, "source_id": source_id, "status": "pending"},
+        {"$set": {"status": "cancelled", "finished_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return result.modified_count
+
+async def backfill_reminders() -> int:
+    """Schedule reminders for upcoming sweeps and events that have none (created
+    before the scheduler, or when the process stopped between the two writes)"""
+    now = datetime.now(timezone.utc)
+    scheduled = 0
+    async for sweep in db.cleanup_sweeps.find(
+        {"scheduled_at": {"$gt": now}}, {"_id": 0, "id": 1, "scheduled_at": 1, "advance_notice_days": 1}
+    ):
+        scheduled += await schedule_reminders("sweep", sweep["id"], stored_utc(sweep["scheduled_at"]),
+                                              sweep.get("advance_notice_days"))
+    async for event in db.popup_events.find({"start_at": {"$gt": now}}, {"_id": 0, "id": 1, "start_at": 1}):
+        scheduled += await schedule_reminders("popup_event", event["id"], stored_utc(event["start_at"]))
+    return scheduled
+
+async def claim_reminder() -> Optional[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return await db.scheduled_reminders.find_one_and_update(
+        # A "leased" job whose lease ran out belonged to a worker that died
+        {"status": {"$in": ["pending", "leased"]}, "next_at": {"$lte": now}},
+        {"$set": {
+            "status": "leased",
+            "lease_owner": _reminder_worker_id,
+            "next_at": now + timedelta(seconds=REMINDER_LEASE_SECONDS)
+        }},
+        sort=[("next_at", 1)],
+        projection={"_id": 0},
+        return_document=True
+    )
+
+def reminder_when(starts_at: datetime) -> str:
+    from zoneinfo import ZoneInfo
+    zone = ZoneInfo(DIRECTORY_TIMEZONE)
+    local = starts_at.astimezone(zone)
+    days = (local.date() - datetime.now(zone).date()).days
+    day = "today" if days == 0 else "tomorrow" if days == 1 else f"on {local.strftime('%A, %B')} {local.day}"
+    return f"{day} at {local.strftime('%H:%M')}"
+
+async def deliver_reminder(job: Dict[str, Any]) -> Optional[int]:
+    """Send one reminder. Returns the notification count, or None if the job was dropped"""
+    collection, time_field = REMINDER_SOURCES[job["kind"]]
+    source = await db[collection].find_one({"id": job["source_id"]}, {"_id": 0})
+    if source is None or source.get(time_field) is None:
+        return None
+    starts_at = stored_utc(source[time_field])
+    if starts_at != stored_utc(job["source_at"]) or starts_at <= datetime.now(timezone.utc):
+        return None  # Rescheduled (its new reminders are separate jobs) or already under way
+    
+    when = reminder_when(starts_at)
+    if job["kind"] == "sweep":
+        message = f"Reminder: a cleanup sweep at {source.get('location')} is scheduled {when}. Please prepare to relocate your belongings."
+        return await send_sweep_alert(source, "⏰ Cleanup Sweep Reminder", message,
+                                      stage=job["stage"], dedupe_key=job["dedupe_key"])
+    
+    coordinates = source.get("coordinates") or {}
+    try:
+        center = parse_lng_lat(coordinates.get("lng"), coordinates.get("lat"))
+    except ValueError:
+        return None
+    return await notify_users_in_area(
+        {"type": "circle", "center": center, "radius_meters": REMINDER_EVENT_RADIUS_METERS},
+        notification_type="event",
+        title=f"📅 {source.get('title')}",
+        message=f"Reminder: {source.get('title')} at {source.get('location')} starts {when}.",
+        action_url="/map",
+        metadata={"event_id": source["id"], "reminder": job["stage"], "start_time": source.get("start_time")},
+        dedupe_key=job["dedupe_key"]
+    )
+
+async def finish_reminder(job: Dict[str, Any], update: Dict[str, Any]):
+    # Only the lease holder records the outcome; a worker whose lease lapsed loses the job
+    await db.scheduled_reminders.update_one(
+        {"id": job["id"], "lease_owner": _reminder_worker_id, "status": "leased"}, {"$set": update}
+    )
+
+async def run_due_reminders(max_jobs: int = REMINDER_CLAIM_BATCH) -> Dict[str, int]:
+    """Deliver reminders whose time has come; failures are retried with backoff"""
+    report = {"sent": 0, "notifications": 0, "dropped": 0, "retrying": 0, "failed": 0}
+    for _ in range(max_jobs):
+        job = await claim_reminder()
+        if not job:
+            break
+        try:
+            sent = await deliver_reminder(job)
+            finished_at = datetime.now(timezone.utc).isoformat()
+            if sent is None:
+                await finish_reminder(job, {"status": "dropped", "finished_at": finished_at})
+                report["dropped"] += 1
+            else:
+                await finish_reminder(job, {"status": "sent", "finished_at": finished_at, "delivered": sent})
+                report["sent"] += 1
+                report["notifications"] += sent
+        except Exception as e:
+            attempts = job.get("attempts", 0) + 1
+            failed = attempts >= REMINDER_MAX_ATTEMPTS
+            await finish_reminder(job, {
+                "status": "failed" if failed else "pending",
+                "attempts": attempts,
+                "next_at": datetime.now(timezone.utc) + timedelta(seconds=min(2 ** attempts * 10, 900)),
+                "last_error": str(e)
+            })
+            report["failed" if failed else "retrying"] += 1
+            log = logging.error if failed else logging.warning
+            log(f"Reminder {job['dedupe_key']} attempt {attempts} failed: {e}")
+    return report
+
+async def seconds_until_next_reminder() -> float:
+    """Sleep until the next occupied slot, capped at the poll interval"""
+    upcoming = await db.scheduled_reminders.find_one(
+        {"status": "pending"}, {"_id": 0, "next_at": 1}, sort=[("next_at", 1)]
+    )
+    if upcoming is None:
+        return REMINDER_POLL_SECONDS
+    next_at = stored_utc(upcoming["next_at"])
+    slot_end = (reminder_slot(next_at) + 1) * REMINDER_SLOT_SECONDS
+    wait = slot_end - datetime.now(timezone.utc).timestamp()
+    return min(max(wait, 0), REMINDER_POLL_SECONDS)
+
+async def reminder_scheduler_loop():
+    """Background worker: deliver reminders slot by slot"""
+    try:
+        await backfill_reminders()
+    except Exception as e:
+        logging.error(f"Reminder backfill error: {e}")
+    while True:
+        try:
+            report = await run_due_reminders()
+            if sum(report[k] for k in ("sent", "dropped", "retrying", "failed")) >= REMINDER_CLAIM_BATCH:
+                continue  # A full batch; more are probably due
+            timeout = await seconds_until_next_reminder()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Reminder scheduler error: {e}")
+            timeout = REMINDER_POLL_SECONDS
+        try:
+            await asyncio.wait_for(reminder_wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        reminder_wakeup.clear()
+
+@api_router.get("/admin/reminders")
+async def get_reminder_status(current_user: User = Depends(get_current_user)):
+    """Scheduled reminders by status, the next few due, and recent failures"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can view reminders")
+    
+    by_status = await db.scheduled_reminders.aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    fields = {"_id": 0, "dedupe_key": 1, "due_at": 1, "attempts": 1, "last_error": 1}
+    upcoming = await db.scheduled_reminders.find({"status": "pending"}, fields).sort("next_at", 1).to_list(10)
+    failures = await db.scheduled_reminders.find({"status": "failed"}, fields).sort("due_at", -1).to_list(20)
+    return {"by_status": {s["_id"]: s["count"] for s in by_status}, "upcoming": upcoming, "recent_failures": failures}
+
 # ==================== DIRECTORY MESSAGING ====================
 
 @api_router.post("/directory/message")
@@ -1140,42 +2550,54 @@ async def get_directory_messages(current_user: User = Depends(get_current_user))
 # ==================== DIRECTORY ORGANIZATIONS ====================
 
 @api_router.get("/directory/organizations")
-async def get_directory_organizations(category: Optional[str] = None):
+async def get_directory_organizations(request: Request, category: Optional[str] = None):
     """Get all organizations from the resource directory"""
-    query = {}
-    if category and category != "all":
-        query["category"] = category
+    snapshot = await directory_snapshot()
     
-    resources = await db.resources.find(query, {"_id": 0}).to_list(1000)
-    return resources
+    async def build():
+        return list(snapshot.in_category(category))
+    
+    return await serve_catalog(request, "resources", f"directory:{category or 'all'}", build, version=snapshot.version)
+
+@api_router.get("/directory/search")
+async def search_directory(q: str, category: Optional[str] = None, limit: int = 20, offset: int = 0):
+    """Ranked full-text search over names, services, descriptions, populations and notes.
+
+    Tolerates prefixes and small typos; `facets.category` counts matches per category.
+    """
+    snapshot = await directory_snapshot()
+    result = snapshot.search_index.search(q, category=category, limit=min(max(limit, 1), 50), offset=max(offset, 0))
+    return {"query": q, **result}
 
 @api_router.get("/directory/organizations/{org_id}")
 async def get_organization_detail(org_id: str):
     """Get a single organization by ID"""
-    org = await db.resources.find_one({"id": org_id}, {"_id": 0})
+    snapshot = await directory_snapshot()
+    org = snapshot.by_id.get(org_id)
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
     return org
 
-@api_router.post("/admin/seed-resources")
-async def seed_resources_endpoint():
-    """One-time endpoint to seed the database with Las Vegas resources"""
-    # Check if already seeded
-    existing_count = await db.resources.count_documents({})
-    if existing_count > 0:
-        return {"message": f"Database already has {existing_count} resources. Skipping seed.", "seeded": False}
-    
-    # Import and insert all resources
+async def seed_directory_resources() -> Dict[str, int]:
+    """Upsert the verified Las Vegas resources; only new or edited records are written"""
     from seed_resources import ALL_RESOURCES
     
-    inserted_count = 0
-    for resource in ALL_RESOURCES:
-        # Add created_at timestamp
-        resource["created_at"] = datetime.now(timezone.utc).isoformat()
-        await db.resources.insert_one(resource)
-        inserted_count += 1
-    
-    return {"message": f"Successfully seeded {inserted_count} resources", "seeded": True, "count": inserted_count}
+    counts = await upsert_seed_records(db.resources, ALL_RESOURCES, prepare=with_resource_location)
+    if counts["inserted"] or counts["updated"]:
+        await bump_catalog_version("resources")
+        await refresh_directory_snapshot()
+    return counts
+
+@api_router.post("/admin/seed-resources")
+async def seed_resources_endpoint():
+    """Seed or re-seed the Las Vegas resources. Safe to run repeatedly."""
+    counts = await seed_directory_resources()
+    return {
+        "message": f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged",
+        "seeded": bool(counts["inserted"] or counts["updated"]),
+        "count": counts["inserted"] + counts["updated"] + counts["unchanged"],
+        **counts
+    }
 
 # ==================== HUD HMIS API ENDPOINTS ====================
 
@@ -1347,24 +2769,23 @@ async def create_assessment(data: dict, current_user: User = Depends(get_current
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.hmis_assessments.insert_one(assessment)
-    
-    # If high priority, notify caseworkers
+    # If high priority, notify caseworkers. Queued before the assessment is written;
+    # the dispatcher only delivers once the assessment exists.
     if score >= 8:
-        caseworkers = await db.users.find({"role": {"$in": ["caseworker", "agency_staff"]}}, {"_id": 0, "id": 1}).to_list(100)
-        for cw in caseworkers:
-            notification = {
-                "id": str(uuid.uuid4()),
-                "user_id": cw["id"],
+        await enqueue_notification_fanout(
+            dedupe_key=f"high_priority_client:{assessment['id']}",
+            roles=["caseworker", "agency_staff"],
+            notification={
                 "notification_type": "high_priority_client",
                 "title": "🚨 High Priority Client",
                 "message": f"A client has scored {score} on the VI-SPDAT assessment and needs immediate housing assistance. Recommendation: {recommendation}",
                 "priority": "urgent",
-                "read": False,
-                "metadata": {"assessment_id": assessment["id"], "score": score},
-                "created_at": datetime.now(timezone.utc).isoformat()
-            }
-            await db.notifications.insert_one(notification)
+                "metadata": {"assessment_id": assessment["id"], "score": score}
+            },
+            source={"collection": "hmis_assessments", "id": assessment["id"]}
+        )
+    
+    await db.hmis_assessments.insert_one(assessment)
     
     return {
         "assessment_id": assessment["id"],
@@ -1505,12 +2926,275 @@ async def export_hud_csv(current_user: User = Depends(get_current_user)):
 
 # ==================== CLEANUP SWEEPS ====================
 
+# Both create paths (/cleanup/sweeps from the dashboard, /sweeps from the typed API)
+# store the same normalized document: `scheduled_at` (BSON date, naive input read as
+# directory-local), `scheduled_date` plus local `date`/`time` strings for clients,
+# `description`/`area_description`, and a GeoJSON `position` for bounding-box queries.
+# Every read goes through query_sweep_calendar, keyset-paginated on (scheduled_at, id).
+SWEEP_CALENDAR_PAGE_MAX = 200
+
+# New sweeps are checked against what is already there: pop-up events running during
+# the sweep window, shelters next to it, and other sweeps whose footprint and time
+# overlap. Events and shelters come from the in-memory interval index and directory
+# grid; other sweeps from an indexed scheduled_at range, so the check never scans
+# history. Conflicts are warnings returned with the created sweep, not errors.
+SWEEP_DURATION_HOURS = 4
+SWEEP_DEFAULT_RADIUS_METERS = 200
+SWEEP_CONFLICT_BUFFER_METERS = 250
+
+def sweep_schedule(data: Dict[str, Any]) -> datetime:
+    """When a sweep starts: `scheduled_date`, or `date` with an optional `time`.
+
+    Undated sweeps (the dashboard never required a date) are placed at their creation time.
+    """
+    if data.get("scheduled_date"):
+        return event_datetime(data["scheduled_date"])
+    if not data.get("date"):
+        return event_datetime(data.get("created_at") or datetime.now(timezone.utc))
+    if data.get("time"):
+        return event_datetime(f"{data['date']}T{data['time']}")
+    return event_datetime(data["date"])
+
+def normalize_sweep(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the fields every sweep carries, whichever API created it. Raises ValueError on a bad date"""
+    from zoneinfo import ZoneInfo
+    scheduled_at = sweep_schedule(doc)
+    local = scheduled_at.astimezone(ZoneInfo(DIRECTORY_TIMEZONE))
+    doc["scheduled_at"] = scheduled_at
+    doc.setdefault("scheduled_date", local.isoformat())
+    doc["date"] = doc.get("date") or local.date().isoformat()
+    doc["time"] = doc.get("time") or local.strftime("%H:%M")
+    doc["description"] = doc.get("description") or doc.get("area_description")
+    doc["area_description"] = doc.get("area_description") or doc.get("description")
+    lng_lat = sweep_lng_lat(doc)
+    if lng_lat is not None:
+        doc["position"] = point(*lng_lat)
+    return doc
+
+def sweep_response(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc.pop("position", None)
+    if isinstance(doc.get("scheduled_at"), datetime):
+        doc["scheduled_at"] = stored_utc(doc["scheduled_at"]).isoformat()
+    return doc
+
+def sweep_footprint(sweep: Dict[str, Any]) -> Optional[tuple]:
+    """(lng, lat, radius_meters) covering a sweep's area, or None if it has no position"""
+    lng_lat = sweep_lng_lat(sweep)
+    if lng_lat is None:
+        return None
+    area = sweep.get("area") or {}
+    if area.get("type") == "circle":
+        radius = area["radius_meters"]
+    elif area.get("type") == "Polygon":
+        radius = max(haversine_meters(*lng_lat, *vertex) for vertex in area["coordinates"][0])
+    else:
+        radius = SWEEP_DEFAULT_RADIUS_METERS
+    return lng_lat[0], lng_lat[1], radius
+
+async def find_sweep_conflicts(sweep: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Events, shelters and other sweeps a normalized sweep would run into, nearest first"""
+    from zoneinfo import ZoneInfo
+    footprint = sweep_footprint(sweep)
+    if footprint is None:
+        return []
+    lng, lat, radius = footprint
+    start = sweep["scheduled_at"]
+    end = start + timedelta(hours=SWEEP_DURATION_HOURS)
+    reach = radius + SWEEP_CONFLICT_BUFFER_METERS
+    conflicts = []
+
+    for event in (await popup_event_index()).overlapping(start, end):
+        coordinates = event.get("coordinates") or {}
+        try:
+            position = parse_lng_lat(coordinates.get("lng"), coordinates.get("lat"))
+        except ValueError:
+            continue
+        distance = haversine_meters(lng, lat, *position)
+        if distance <= reach:
+            conflicts.append({
+                "kind": "popup_event", "id": event["id"], "name": event.get("title"),
+                "distance_meters": round(distance), "start_time": event.get("start_time"), "end_time": event.get("end_time"),
+                "message": f"{event.get('title')} ({event.get('event_type')}) runs nearby during the sweep"
+            })
+
+    snapshot = await directory_snapshot()
+    minute = minute_of_week(start.astimezone(ZoneInfo(DIRECTORY_TIMEZONE)))
+    sweep_minutes = SWEEP_DURATION_HOURS * 60
+    for distance, resource in snapshot.nearest(lng, lat, 20, max_distance=reach, accept=lambda r: r.get("category") == "shelter"):
+        conflicts.append({
+            "kind": "shelter", "id": resource["id"], "name": resource.get("name"),
+            "distance_meters": round(distance), "open_during_sweep": snapshot.hours.open_during(resource["id"], minute, minute + sweep_minutes),
+            "message": f"{resource.get('name')} is {round(distance)} m from the sweep area"
+        })
+
+    others = await db.cleanup_sweeps.find(
+        {"scheduled_at": {"$gt": start - timedelta(hours=SWEEP_DURATION_HOURS), "$lt": end}},
+        {"_id": 0, "id": 1, "location": 1, "coordinates": 1, "area": 1, "scheduled_at": 1, "organization": 1}
+    ).to_list(None)
+    for other in others:
+        other_footprint = sweep_footprint(other)
+        if other["id"] == sweep.get("id") or other_footprint is None:
+            continue
+        distance = haversine_meters(lng, lat, other_footprint[0], other_footprint[1])
+        if distance <= radius + other_footprint[2]:
+            conflicts.append({
+                "kind": "sweep", "id": other["id"], "name": other.get("location"),
+                "distance_meters": round(distance), "scheduled_at": stored_utc(other["scheduled_at"]).isoformat(),
+                "organization": other.get("organization"),
+                "message": f"Another sweep at {other.get('location')} overlaps this area and time"
+            })
+
+    conflicts.sort(key=lambda conflict: conflict["distance_meters"])
+    return conflicts
+
+async def store_sweep(doc: Dict[str, Any]) -> tuple:
+    """Normalize and insert a sweep, then send its alerts. Returns (alert count, conflicts)"""
+    try:
+        normalize_sweep(doc)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    conflicts = await find_sweep_conflicts(doc)
+    await db.cleanup_sweeps.insert_one(doc)
+    await bump_catalog_version("cleanup_sweeps")
+    await schedule_reminders("sweep", doc["id"], doc["scheduled_at"], doc.get("advance_notice_days"))
+    return await announce_sweep(doc), conflicts
+
+async def announce_sweep(sweep: Dict[str, Any]) -> int:
+    """Alert users about a newly stored sweep"""
+    message = f"A cleanup sweep is scheduled at {sweep.get('location')} on {sweep.get('date')} at {sweep.get('time')}. Please prepare to relocate your belongings."
+    return await send_sweep_alert(sweep, "⚠️ Upcoming Area Cleanup Alert", message)
+
+async def send_sweep_alert(sweep: Dict[str, Any], title: str, message: str,
+                           stage: Optional[str] = None, dedupe_key: Optional[str] = None) -> int:
+    """Alert the users a sweep affects: those in its area, or everyone if it has none.
+
+    `dedupe_key` makes the send idempotent (reminders retried after a crash).
+    """
+    metadata = {
+        "sweep_id": sweep["id"],
+        "location": sweep.get("location"),
+        "date": sweep.get("date"),
+        "time": sweep.get("time"),
+        "scheduled_at": stored_utc(sweep["scheduled_at"]).isoformat(),
+        "posted_by": sweep.get("organization")
+    }
+    if stage:
+        metadata["reminder"] = stage
+    broadcast_id = str(uuid.uuid5(uuid.NAMESPACE_URL, dedupe_key)) if dedupe_key else None
+    area = sweep.get("area")
+    if area is None:
+        # One broadcast reaches every regular user, however many there are
+        await create_broadcast_notification(
+            roles=["user"], notification_type="sweep_alert", title=title, message=message,
+            priority="urgent", action_url="/resources", metadata=metadata, broadcast_id=broadcast_id
+        )
+        return await db.users.count_documents({"role": "user"})
+    notifications_count = await notify_users_in_area(
+        area, notification_type="sweep_alert", title=title, message=message,
+        priority="urgent", action_url="/resources", metadata=metadata, dedupe_key=dedupe_key
+    )
+    # Users who never shared a location can't be ruled out, so they still get it
+    await create_broadcast_notification(
+        roles=["user"], notification_type="sweep_alert", title=title, message=message,
+        priority="urgent", action_url="/resources", metadata=metadata, unlocated_only=True,
+        broadcast_id=str(uuid.uuid5(uuid.NAMESPACE_URL, dedupe_key + ":unlocated")) if dedupe_key else None
+    )
+    return notifications_count + await db.users.count_documents({"role": "user", "location_updated_at": None})
+
+def encode_sweep_cursor(sweep: Dict[str, Any]) -> str:
+    key = [stored_utc(sweep["scheduled_at"]).isoformat(), sweep["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_sweep_cursor(cursor: str) -> tuple:
+    try:
+        scheduled_at, sweep_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(scheduled_at), sweep_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def query_sweep_calendar(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bbox: Optional[list] = None,
+    organization: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """One page of sweeps starting in [start, end), in time order"""
+    query: Dict[str, Any] = {}
+    if start or end:
+        query["scheduled_at"] = {}
+        if start:
+            query["scheduled_at"]["$gte"] = start
+        if end:
+            query["scheduled_at"]["$lt"] = end
+    if organization:
+        query["organization"] = organization
+    if bbox:
+        west, south, east, north = bbox
+        if east - west < 360:
+            if west <= east:
+                query["position"] = {"$geoWithin": {"$geometry": bbox_polygon(west, south, east, north)}}
+            else:
+                # Box crosses the antimeridian
+                query["$or"] = [
+                    {"position": {"$geoWithin": {"$geometry": bbox_polygon(west, south, 180, north)}}},
+                    {"position": {"$geoWithin": {"$geometry": bbox_polygon(-180, south, east, north)}}}
+                ]
+    if cursor:
+        after_at, after_id = decode_sweep_cursor(cursor)
+        keyset = {"$or": [{"scheduled_at": {"$gt": after_at}}, {"scheduled_at": after_at, "id": {"$gt": after_id}}]}
+        query = {"$and": [query, keyset]} if query else keyset
+    limit = max(1, min(limit, SWEEP_CALENDAR_PAGE_MAX))
+    sweeps = await db.cleanup_sweeps.find(query, {"_id": 0}).sort(
+        [("scheduled_at", 1), ("id", 1)]
+    ).limit(limit + 1).to_list(None)
+    next_cursor = encode_sweep_cursor(sweeps[limit - 1]) if len(sweeps) > limit else None
+    return {"sweeps": [sweep_response(sweep) for sweep in sweeps[:limit]], "next_cursor": next_cursor}
+
+async def migrate_sweep_schedules() -> int:
+    """Normalize sweeps stored before scheduled_at existed"""
+    from pymongo import UpdateOne
+    
+    docs = await db.cleanup_sweeps.find({"scheduled_at": {"$exists": False}}, {"_id": 0}).to_list(None)
+    ops = []
+    for doc in docs:
+        try:
+            normalize_sweep(doc)
+        except (TypeError, ValueError):
+            continue
+        ops.append(UpdateOne({"id": doc["id"]}, {"$set": doc}))
+    if ops:
+        await db.cleanup_sweeps.bulk_write(ops, ordered=False)
+    return len(ops)
+
+@api_router.get("/sweeps/calendar")
+async def get_sweep_calendar(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    bbox: Optional[str] = None,
+    organization: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """Sweeps starting between `start` and `end` (ISO dates or times, directory-local
+    when naive), optionally inside `bbox` ("west,south,east,north") and for one
+    organization. Pass `next_cursor` back as `cursor` for the next page.
+    """
+    try:
+        start_at = event_datetime(start) if start else None
+        end_at = event_datetime(end) if end else None
+        box = parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await query_sweep_calendar(start_at, end_at, box, organization, limit, cursor)
+
 # Cleanup-prefixed routes for frontend compatibility
 @api_router.get("/cleanup/sweeps")
 async def get_cleanup_sweeps_prefixed(current_user: User = Depends(get_current_user)):
-    """Get sweeps - aliased for frontend"""
-    sweeps = await db.cleanup_sweeps.find({}, {"_id": 0}).sort("scheduled_date", -1).to_list(1000)
-    return sweeps
+    """Get sweeps - aliased for frontend. Paged clients use /sweeps/calendar"""
+    sweeps = await db.cleanup_sweeps.find({}, {"_id": 0}).sort([("scheduled_at", -1), ("id", -1)]).to_list(1000)
+    return [sweep_response(sweep) for sweep in sweeps]
 
 @api_router.post("/cleanup/sweeps")
 async def create_cleanup_sweep_prefixed(sweep_data: dict, current_user: User = Depends(get_current_user)):
@@ -1518,6 +3202,12 @@ async def create_cleanup_sweep_prefixed(sweep_data: dict, current_user: User = D
     if current_user.role not in ["cleanup_crew", "caseworker", "agency_staff"]:
         raise HTTPException(status_code=403, detail="Only cleanup crews can post sweeps")
     
+    # Optional target area: radius_meters around latitude/longitude, or a polygon
+    try:
+        area = parse_target_area(sweep_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     sweep_id = str(uuid.uuid4())
     sweep = {
         "id": sweep_id,
@@ -1525,41 +3215,15 @@ async def create_cleanup_sweep_prefixed(sweep_data: dict, current_user: User = D
         "date": sweep_data.get("date"),
         "time": sweep_data.get("time"),
         "description": sweep_data.get("description"),
+        "area": area,
         "posted_by": current_user.id,
         "organization": current_user.organization,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    
-    await db.cleanup_sweeps.insert_one(sweep)
-    
-    # Create notifications for ALL regular users
-    all_users = await db.users.find({"role": "user"}, {"_id": 0, "id": 1}).to_list(10000)
-    
-    notifications_count = 0
-    for user in all_users:
-        notification = {
-            "id": str(uuid.uuid4()),
-            "user_id": user["id"],
-            "notification_type": "sweep_alert",
-            "title": "⚠️ Upcoming Area Cleanup Alert",
-            "message": f"A cleanup sweep is scheduled at {sweep_data.get('location')} on {sweep_data.get('date')} at {sweep_data.get('time')}. Please prepare to relocate your belongings.",
-            "priority": "urgent",
-            "read": False,
-            "action_url": "/resources",
-            "metadata": {
-                "sweep_id": sweep_id,
-                "location": sweep_data.get("location"),
-                "date": sweep_data.get("date"),
-                "time": sweep_data.get("time"),
-                "posted_by": current_user.organization
-            },
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.notifications.insert_one(notification)
-        notifications_count += 1
+    notifications_count, conflicts = await store_sweep(sweep)
     
     # Return without MongoDB _id
-    return {"sweep_id": sweep_id, "location": sweep["location"], "notifications_sent": notifications_count}
+    return {"sweep_id": sweep_id, "location": sweep["location"], "notifications_sent": notifications_count, "conflicts": conflicts}
 
 # ==================== LEGAL CASES ====================
 
@@ -1591,19 +3255,8 @@ async def create_legal_case(case_data: dict, current_user: User = Depends(get_cu
 
 @api_router.get("/sweeps")
 async def get_cleanup_sweeps():
-    now = datetime.now(timezone.utc)
-    sweeps = await db.cleanup_sweeps.find(
-        {"scheduled_date": {"$gte": now.isoformat()}},
-        {"_id": 0}
-    ).sort("scheduled_date", 1).to_list(1000)
-    
-    for sweep in sweeps:
-        if isinstance(sweep.get('created_at'), str):
-            sweep['created_at'] = datetime.fromisoformat(sweep['created_at'])
-        if isinstance(sweep.get('scheduled_date'), str):
-            sweep['scheduled_date'] = datetime.fromisoformat(sweep['scheduled_date'])
-    
-    return sweeps
+    page = await query_sweep_calendar(start=datetime.now(timezone.utc), limit=SWEEP_CALENDAR_PAGE_MAX)
+    return page["sweeps"]
 
 @api_router.post("/sweeps", response_model=CleanupSweep)
 async def create_cleanup_sweep(sweep_data: CleanupSweepCreate, current_user: User = Depends(get_current_user)):
@@ -1624,8 +3277,10 @@ async def create_cleanup_sweep(sweep_data: CleanupSweepCreate, current_user: Use
     doc = sweep.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     doc['scheduled_date'] = doc['scheduled_date'].isoformat()
+    doc['organization'] = current_user.organization
+    doc.pop('conflicts')
     
-    await db.cleanup_sweeps.insert_one(doc)
+    _, sweep.conflicts = await store_sweep(doc)
     return sweep
 
 # ==================== WORKBOOK ====================
@@ -1676,7 +3331,7 @@ async def get_workbook_stats(current_user: User = Depends(get_current_user)):
     total_points = points[0]["total_points"] if points else 0
     
     # Also count workbook progress
-    workbooks = await db.workbooks.find({"user_id": current_user.id}, {"_id": 0}).to_list(100)
+    workbooks = await db.workbooks.find({"user_id": current_user.id}, {"_id": 0, "completed_at": 1}).to_list(100)
     completed_workbooks = len([w for w in workbooks if w.get("completed_at")])
     
     # Calculate level based on total points + workbook completions
@@ -1694,61 +3349,223 @@ async def get_workbook_stats(current_user: User = Depends(get_current_user)):
 
 # ==================== AI-POWERED WORKBOOKS ====================
 
-@api_router.get("/workbooks")
-async def get_workbooks(current_user: User = Depends(get_current_user)):
-    """Get all workbooks for current user"""
-    workbooks = await db.workbooks.find({"user_id": current_user.id}, {"_id": 0}).to_list(100)
+# List view shape: metadata, progress and section sizes, no lesson/exercise bodies
+WORKBOOK_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "category": 1,
+    "description": 1,
+    "why_recommended": 1,
+    "difficulty": 1,
+    "estimated_time": 1,
+    "progress": 1,
+    "started_at": 1,
+    "completed_at": 1,
+    "created_at": 1,
+    "lesson_count": {"$ifNull": ["$lesson_count", {"$size": {"$ifNull": ["$lessons", []]}}]},
+    "exercise_count": {"$ifNull": ["$exercise_count", {"$size": {"$ifNull": ["$exercises", []]}}]},
+    "action_count": {"$ifNull": ["$action_count", {"$size": {"$ifNull": ["$action_items", []]}}]},
+    "resource_count": {"$ifNull": ["$resource_count", {"$size": {"$ifNull": ["$resources", []]}}]},
+    "completed_lesson_count": {"$size": {"$ifNull": ["$completed_lessons", []]}},
+    "completed_exercise_count": {"$size": {"$ifNull": ["$completed_exercises", []]}},
+    "completed_action_count": {"$size": {"$ifNull": ["$completed_actions", []]}},
+}
+
+# Lazily loaded sections: content field and the matching progress field
+WORKBOOK_SECTION_FIELDS = {
+    "lessons": ("lessons", "completed_lessons"),
+    "exercises": ("exercises", "completed_exercises"),
+    "action-items": ("action_items", "completed_actions"),
+    "resources": ("resources", None),
+}
+
+# Workbook bodies are content-addressed: identical lessons/exercises/actions/resources
+# are stored once in workbook_bodies under the SHA-256 of their canonical JSON, and
+# per-user workbook documents keep only body_hash, section counts and progress.
+# Documents written before this still embed their body and are read as-is until
+# migrate_workbook_bodies() collapses them.
+WORKBOOK_BODY_FIELDS = ("lessons", "exercises", "action_items", "resources")
+WORKBOOK_COUNT_FIELDS = {
+    "lessons": "lesson_count",
+    "exercises": "exercise_count",
+    "action_items": "action_count",
+    "resources": "resource_count",
+}
+
+def workbook_body_hash(body: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {field: body.get(field, []) for field in WORKBOOK_BODY_FIELDS},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def workbook_body_reference(body: Dict[str, Any], body_hash: str) -> Dict[str, Any]:
+    """Fields that replace an embedded body on the per-user document"""
+    reference = {"body_hash": body_hash}
+    for field, count_field in WORKBOOK_COUNT_FIELDS.items():
+        reference[count_field] = len(body.get(field, []))
+    return reference
+
+async def store_workbook(workbook: Dict[str, Any]):
+    """Insert a workbook, storing its body once in workbook_bodies. The passed dict is left intact."""
+    body = {field: workbook.get(field, []) for field in WORKBOOK_BODY_FIELDS}
+    body_hash = workbook_body_hash(body)
+    await db.workbook_bodies.update_one(
+        {"hash": body_hash},
+        {
+            "$setOnInsert": {**body, "created_at": datetime.now(timezone.utc).isoformat()},
+            "$inc": {"ref_count": 1}
+        },
+        upsert=True
+    )
+    
+    doc = {k: v for k, v in workbook.items() if k not in WORKBOOK_BODY_FIELDS}
+    doc.update(workbook_body_reference(body, body_hash))
+    await db.workbooks.insert_one(doc)
+
+async def load_workbook_bodies(workbooks: List[Dict[str, Any]], fields=WORKBOOK_BODY_FIELDS) -> List[Dict[str, Any]]:
+    """Fill body sections into workbook documents that reference a shared body"""
+    hashes = list({w["body_hash"] for w in workbooks if w.get("body_hash")})
+    if not hashes:
+        return workbooks
+    
+    projection = {"_id": 0, "hash": 1, **{field: 1 for field in fields}}
+    bodies = await db.workbook_bodies.find({"hash": {"$in": hashes}}, projection).to_list(len(hashes))
+    by_hash = {b["hash"]: b for b in bodies}
+    for workbook in workbooks:
+        body = by_hash.get(workbook.get("body_hash"))
+        if body:
+            for field in fields:
+                workbook[field] = body.get(field, [])
     return workbooks
 
-@api_router.get("/workbooks/{workbook_id}")
-async def get_workbook(workbook_id: str, current_user: User = Depends(get_current_user)):
-    """Get a specific workbook with full content"""
-    workbook = await db.workbooks.find_one({"id": workbook_id, "user_id": current_user.id}, {"_id": 0})
-    if not workbook:
-        raise HTTPException(status_code=404, detail="Workbook not found")
-    return workbook
+async def migrate_workbook_bodies(batch_size: int = 500) -> Dict[str, int]:
+    """Move embedded workbook bodies into workbook_bodies, collapsing duplicates.
 
-@api_router.post("/workbooks/generate")
-async def generate_personalized_workbooks(current_user: User = Depends(get_current_user)):
-    """
-    AI analyzes user's flashcard answers, dossier, and conversation history
-    to generate personalized workbooks tailored to their specific needs
+    Returns counts and the BSON bytes taken by bodies before and after.
     """
-    # Gather user data for AI analysis
-    flashcards = await db.flashcards.find({"user_id": current_user.id, "user_answer": {"$ne": None}}, {"_id": 0}).to_list(100)
-    dossier = await db.dossier.find({"user_id": current_user.id}, {"_id": 0}).to_list(100)
-    recent_chats = await db.chat_messages.find(
-        {"user_id": current_user.id}, 
-        {"_id": 0}
-    ).sort("created_at", -1).limit(20).to_list(20)
+    import bson
+    from pymongo import UpdateOne
+    
+    report = {
+        "workbooks_migrated": 0,
+        "bodies_created": 0,
+        "bodies_reused": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+    }
+    projection = {"_id": 1, **{field: 1 for field in WORKBOOK_BODY_FIELDS}}
     
-    # Get existing workbooks to avoid duplicates
-    existing = await db.workbooks.find({"user_id": current_user.id}, {"_id": 0, "title": 1, "category": 1}).to_list(100)
-    existing_titles = [w.get("title", "").lower() for w in existing]
+    while True:
+        batch = await db.workbooks.find({"body_hash": {"$exists": False}}, projection).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        
+        body_ops = []
+        workbook_ops = []
+        body_sizes = []
+        for workbook in batch:
+            body = {field: workbook.get(field) or [] for field in WORKBOOK_BODY_FIELDS}
+            body_hash = workbook_body_hash(body)
+            reference = workbook_body_reference(body, body_hash)
+            
+            size = len(bson.encode(body))
+            body_sizes.append(size)
+            report["bytes_before"] += size
+            report["bytes_after"] += len(bson.encode(reference))
+            
+            body_ops.append(UpdateOne(
+                {"hash": body_hash},
+                {
+                    "$setOnInsert": {**body, "created_at": datetime.now(timezone.utc).isoformat()},
+                    "$inc": {"ref_count": 1}
+                },
+                upsert=True
+            ))
+            workbook_ops.append(UpdateOne(
+                {"_id": workbook["_id"]},
+                {"$set": reference, "$unset": {field: "" for field in WORKBOOK_BODY_FIELDS}}
+            ))
+        
+        # Ordered so a body repeated within one batch is inserted once, then reused
+        result = await db.workbook_bodies.bulk_write(body_ops, ordered=True)
+        created = result.upserted_ids or {}
+        for index in created:
+            report["bytes_after"] += body_sizes[index]
+        report["bodies_created"] += len(created)
+        report["bodies_reused"] += len(body_ops) - len(created)
+        
+        await db.workbooks.bulk_write(workbook_ops, ordered=False)
+        report["workbooks_migrated"] += len(batch)
     
-    # Build context for AI
-    user_context = f"""
-User Profile:
-- Name: {current_user.full_name}
-- Veteran: {current_user.is_veteran}
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    return report
 
-Flashcard Answers:
-{chr(10).join([f"Q: {fc.get('question', '')} A: {fc.get('user_answer', '')}" for fc in flashcards[:10]])}
+@api_router.post("/admin/workbooks/dedupe-bodies")
+async def dedupe_workbook_bodies(current_user: User = Depends(get_current_user)):
+    """Migrate embedded workbook bodies to content-addressed storage and report bytes saved"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can run workbook migrations")
+    return await migrate_workbook_bodies()
 
-Dossier Notes:
-{chr(10).join([f"- {d.get('category', '')}: {d.get('content', '')[:200]}" for d in dossier[:5]])}
+@api_router.get("/workbooks")
+async def get_workbooks(view: str = "summary", current_user: User = Depends(get_current_user)):
+    """Get workbooks for current user.
 
-Recent Conversation Topics:
-{chr(10).join([msg.get('content', '')[:100] for msg in recent_chats if msg.get('role') == 'user'][:5])}
+    Defaults to the summary shape used by the list view; pass view=full for every
+    lesson, exercise and resource body.
+    """
+    if view == "full":
+        workbooks = await db.workbooks.find({"user_id": current_user.id}, {"_id": 0}).to_list(100)
+        return await load_workbook_bodies(workbooks)
+    
+    workbooks = await db.workbooks.aggregate([
+        {"$match": {"user_id": current_user.id}},
+        {"$limit": 100},
+        {"$project": WORKBOOK_SUMMARY_PROJECTION}
+    ]).to_list(100)
+    return workbooks
 
-Already has workbooks on: {', '.join(existing_titles) if existing_titles else 'None yet'}
-"""
+@api_router.get("/workbooks/topics")
+async def get_available_topics(request: Request):
+    """Get all available workbook topics organized by category"""
+    async def build():
+        return WORKBOOK_TOPICS
+    
+    return await serve_catalog(request, "static", "workbook_topics", build)
 
-    # Use AI to recommend workbooks
-    try:
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY', ''),
-            system_message="""You are BRICK's Workbook Generator. Based on the user's profile, flashcard answers, and conversation history, recommend 3-5 personalized workbooks they should complete.
+@api_router.get("/workbooks/{workbook_id}")
+async def get_workbook(workbook_id: str, current_user: User = Depends(get_current_user)):
+    """Get a specific workbook with full content"""
+    workbook = await db.workbooks.find_one({"id": workbook_id, "user_id": current_user.id}, {"_id": 0})
+    if not workbook:
+        raise HTTPException(status_code=404, detail="Workbook not found")
+    await load_workbook_bodies([workbook])
+    return workbook
+
+@api_router.get("/workbooks/{workbook_id}/{section}")
+async def get_workbook_section(workbook_id: str, section: str, current_user: User = Depends(get_current_user)):
+    """Get one content section (lessons, exercises, action-items, resources) of a workbook"""
+    if section not in WORKBOOK_SECTION_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown workbook section")
+    
+    field, completed_field = WORKBOOK_SECTION_FIELDS[section]
+    projection = {"_id": 0, "id": 1, "body_hash": 1, field: 1}
+    if completed_field:
+        projection[completed_field] = 1
+    
+    workbook = await db.workbooks.find_one({"id": workbook_id, "user_id": current_user.id}, projection)
+    if not workbook:
+        raise HTTPException(status_code=404, detail="Workbook not found")
+    await load_workbook_bodies([workbook], (field,))
+    
+    response = {"workbook_id": workbook_id, "section": field, "items": workbook.get(field, [])}
+    if completed_field:
+        response["completed"] = workbook.get(completed_field, [])
+    return response
+
+WORKBOOK_RECOMMENDER_PROMPT = """You are BRICK's Workbook Generator. Based on the user's profile, flashcard answers, and conversation history, recommend 3-5 personalized workbooks they should complete.
 
 Consider their specific barriers, knowledge gaps, and goals. Prioritize practical life skills they may be missing.
 
@@ -1772,30 +3589,125 @@ Example format:
 [{"topic_id": "budgeting_101", "category": "financial", "priority": 1, "reason": "Based on your answers, you mentioned struggling with money management. This will help you create a plan."}]
 
 Only return the JSON array, no other text."""
+
+FALLBACK_RECOMMENDATIONS = [
+    {"topic_id": "budgeting_101", "category": "financial", "priority": 1, "reason": "Essential money management skills for stability."},
+    {"topic_id": "spotting_scams", "category": "safety_awareness", "priority": 2, "reason": "Protect yourself from common scams targeting vulnerable individuals."},
+    {"topic_id": "cooking_basics", "category": "life_skills", "priority": 3, "reason": "Save money and eat healthier by learning to cook."},
+]
+
+WORKBOOK_SECTIONS = ("lessons", "exercises", "action_items", "resources")
+
+async def build_workbook_user_context(user: User):
+    """Gather flashcard answers, dossier and chat history into the AI prompt context.
+
+    Returns (user_context, existing_titles).
+    """
+    flashcards = await db.flashcards.find({"user_id": user.id, "user_answer": {"$ne": None}}, {"_id": 0}).to_list(100)
+    dossier = await db.dossier.find({"user_id": user.id}, {"_id": 0}).to_list(100)
+    recent_chats = await db.chat_messages.find(
+        {"user_id": user.id}, 
+        {"_id": 0}
+    ).sort("created_at", -1).limit(20).to_list(20)
+    
+    # Get existing workbooks to avoid duplicates
+    existing = await db.workbooks.find({"user_id": user.id}, {"_id": 0, "title": 1, "category": 1}).to_list(100)
+    existing_titles = [w.get("title", "").lower() for w in existing]
+    
+    user_context = f"""
+User Profile:
+- Name: {user.full_name}
+- Veteran: {user.is_veteran}
+
+Flashcard Answers:
+{chr(10).join([f"Q: {fc.get('question', '')} A: {fc.get('user_answer', '')}" for fc in flashcards[:10]])}
+
+Dossier Notes:
+{chr(10).join([f"- {d.get('category', '')}: {d.get('content', '')[:200]}" for d in dossier[:5]])}
+
+Recent Conversation Topics:
+{chr(10).join([msg.get('content', '')[:100] for msg in recent_chats if msg.get('role') == 'user'][:5])}
+
+Already has workbooks on: {', '.join(existing_titles) if existing_titles else 'None yet'}
+"""
+    return user_context, existing_titles
+
+def parse_workbook_recommendations(response: str) -> List[Dict[str, Any]]:
+    """Extract recommendations from the AI response, keeping only known topic IDs"""
+    data = extract_json(response)
+    if isinstance(data, dict):
+        # Tolerate {"recommendations": [...]} wrappers
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+    
+    topic_categories = {t["id"]: category for category, topics in WORKBOOK_TOPICS.items() for t in topics}
+    recommendations = []
+    for rec in data:
+        if not isinstance(rec, dict) or rec.get("topic_id") not in topic_categories:
+            continue
+        # The topic ID is authoritative; repair a mismatched category
+        rec["category"] = topic_categories[rec["topic_id"]]
+        try:
+            rec["priority"] = min(max(int(rec.get("priority", 2)), 1), 5)
+        except (TypeError, ValueError):
+            rec["priority"] = 2
+        recommendations.append(rec)
+    
+    if not recommendations:
+        raise ValueError("No valid workbook recommendations in AI response")
+    return recommendations
+
+async def recommend_workbooks(user_context: str) -> List[Dict[str, Any]]:
+    """Ask the AI which workbooks fit this user, falling back to core topics"""
+    try:
+        chat = LlmChat(
+            api_key=os.environ.get('EMERGENT_LLM_KEY', ''),
+            system_message=WORKBOOK_RECOMMENDER_PROMPT
         ).with_model("openai", "gpt-5.2")
         
         response = await chat.send_message(UserMessage(text=f"Analyze this user and recommend workbooks:\n\n{user_context}"))
-        
-        # Parse AI recommendations
-        import json
-        # Clean the response - remove markdown code blocks if present
-        clean_response = response.strip()
-        if clean_response.startswith("```"):
-            clean_response = clean_response.split("```")[1]
-            if clean_response.startswith("json"):
-                clean_response = clean_response[4:]
-        clean_response = clean_response.strip()
-        
-        recommendations = json.loads(clean_response)
+        return parse_workbook_recommendations(response)
         
     except Exception as e:
         logging.error(f"AI workbook recommendation error: {e}")
-        # Fallback: recommend based on flashcard categories
-        recommendations = [
-            {"topic_id": "budgeting_101", "category": "financial", "priority": 1, "reason": "Essential money management skills for stability."},
-            {"topic_id": "spotting_scams", "category": "safety_awareness", "priority": 2, "reason": "Protect yourself from common scams targeting vulnerable individuals."},
-            {"topic_id": "cooking_basics", "category": "life_skills", "priority": 3, "reason": "Save money and eat healthier by learning to cook."},
-        ]
+        return [dict(rec) for rec in FALLBACK_RECOMMENDATIONS]
+
+def find_workbook_topic(topic_id: str, category: str) -> Optional[Dict[str, str]]:
+    for t in WORKBOOK_TOPICS.get(category, []):
+        if t["id"] == topic_id:
+            return t
+    return None
+
+def new_workbook_doc(user_id: str, topic_info: Dict[str, str], category: str, rec: Dict[str, Any], workbook_content: Dict) -> Dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "title": topic_info["title"],
+        "category": category,
+        "description": topic_info["desc"],
+        "why_recommended": rec.get("reason", "Recommended based on your profile"),
+        "difficulty": rec.get("priority", 2),
+        "estimated_time": workbook_content.get("estimated_time", "20-30 minutes"),
+        "lessons": workbook_content.get("lessons", []),
+        "exercises": workbook_content.get("exercises", []),
+        "action_items": workbook_content.get("action_items", []),
+        "resources": workbook_content.get("resources", []),
+        "progress": 0,
+        "completed_lessons": [],
+        "completed_exercises": [],
+        "completed_actions": [],
+        "started_at": None,
+        "completed_at": None,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+async def generate_workbooks_for_user(user: User, source: str = "interactive") -> List[Dict[str, Any]]:
+    """Recommend and generate new workbooks for a user, recording the run.
+
+    Returns a short summary of each workbook created.
+    """
+    run_started_at = datetime.now(timezone.utc).isoformat()
+    user_context, existing_titles = await build_workbook_user_context(user)
+    recommendations = await recommend_workbooks(user_context)
     
     # Generate actual workbook content for each recommendation
     generated_workbooks = []
@@ -1804,14 +3716,7 @@ Only return the JSON array, no other text."""
         topic_id = rec.get("topic_id")
         category = rec.get("category")
         
-        # Find topic details
-        topic_info = None
-        if category in WORKBOOK_TOPICS:
-            for t in WORKBOOK_TOPICS[category]:
-                if t["id"] == topic_id:
-                    topic_info = t
-                    break
-        
+        topic_info = find_workbook_topic(topic_id, category)
         if not topic_info:
             continue
             
@@ -1830,29 +3735,9 @@ Only return the JSON array, no other text."""
         )
         
         if workbook_content:
-            workbook = {
-                "id": str(uuid.uuid4()),
-                "user_id": current_user.id,
-                "title": topic_info["title"],
-                "category": category,
-                "description": topic_info["desc"],
-                "why_recommended": rec.get("reason", "Recommended based on your profile"),
-                "difficulty": rec.get("priority", 2),
-                "estimated_time": workbook_content.get("estimated_time", "20-30 minutes"),
-                "lessons": workbook_content.get("lessons", []),
-                "exercises": workbook_content.get("exercises", []),
-                "action_items": workbook_content.get("action_items", []),
-                "resources": workbook_content.get("resources", []),
-                "progress": 0,
-                "completed_lessons": [],
-                "completed_exercises": [],
-                "completed_actions": [],
-                "started_at": None,
-                "completed_at": None,
-                "created_at": datetime.now(timezone.utc).isoformat()
-            }
-            
-            await db.workbooks.insert_one(workbook)
+            workbook = new_workbook_doc(user.id, topic_info, category, rec, workbook_content)
+            await store_workbook(workbook)
+            existing_titles.append(topic_info["title"].lower())
             generated_workbooks.append({
                 "id": workbook["id"],
                 "title": workbook["title"],
@@ -1860,13 +3745,194 @@ Only return the JSON array, no other text."""
                 "why_recommended": workbook["why_recommended"]
             })
     
+    await record_recommendation_run(user.id, run_started_at, [w["id"] for w in generated_workbooks], source)
+    return generated_workbooks
+
+@api_router.post("/workbooks/generate")
+async def generate_personalized_workbooks(current_user: User = Depends(get_current_user)):
+    """
+    AI analyzes user's flashcard answers, dossier, and conversation history
+    to generate personalized workbooks tailored to their specific needs
+    """
+    # Workbooks pre-generated off-peak from unchanged answers are handed over without an AI call
+    ready = await take_pregenerated_workbooks(current_user.id)
+    if ready:
+        return {
+            "message": f"{len(ready)} personalized workbooks are ready for you",
+            "workbooks": ready,
+            "pregenerated": True
+        }
+    
+    generated_workbooks = await generate_workbooks_for_user(current_user)
+    
     return {
         "message": f"Generated {len(generated_workbooks)} personalized workbooks",
         "workbooks": generated_workbooks
     }
 
-async def generate_workbook_content(topic_id: str, title: str, description: str, category: str, user_context: str, reason: str) -> Dict:
-    """Generate detailed workbook content using AI"""
+@api_router.post("/workbooks/generate/stream")
+async def stream_personalized_workbooks(current_user: User = Depends(get_current_user)):
+    """
+    Same as /workbooks/generate, but streams newline-delimited JSON events so the UI
+    can render each lesson and workbook as soon as it is parsed
+    """
+    ready = await take_pregenerated_workbooks(current_user.id)
+    if ready:
+        ready_ids = [w["id"] for w in ready]
+        ready_docs = await db.workbooks.find({"id": {"$in": ready_ids}, "user_id": current_user.id}, {"_id": 0}).to_list(len(ready_ids))
+        await load_workbook_bodies(ready_docs)
+        
+        async def ready_events():
+            for workbook in ready_docs:
+                yield json.dumps({"event": "workbook", "workbook": workbook}) + "\n"
+            yield json.dumps({"event": "done", "message": f"{len(ready_docs)} personalized workbooks are ready for you"}) + "\n"
+        
+        return StreamingResponse(ready_events(), media_type="application/x-ndjson")
+    
+    run_started_at = datetime.now(timezone.utc).isoformat()
+    user_context, existing_titles = await build_workbook_user_context(current_user)
+    
+    async def events():
+        recommendations = await recommend_workbooks(user_context)
+        yield json.dumps({"event": "recommendations", "count": min(len(recommendations), 5)}) + "\n"
+        
+        generated_ids = []
+        for rec in recommendations[:5]:
+            topic_info = find_workbook_topic(rec.get("topic_id"), rec.get("category"))
+            if not topic_info or topic_info["title"].lower() in existing_titles:
+                continue
+            
+            workbook_id = str(uuid.uuid4())
+            yield json.dumps({
+                "event": "workbook_started",
+                "workbook_id": workbook_id,
+                "title": topic_info["title"],
+                "category": rec["category"],
+                "why_recommended": rec.get("reason", "Recommended based on your profile")
+            }) + "\n"
+            
+            async for section, payload in stream_workbook_content(
+                title=topic_info["title"],
+                description=topic_info["desc"],
+                category=rec["category"],
+                reason=rec.get("reason", "")
+            ):
+                if section != "content":
+                    yield json.dumps({"event": "section", "workbook_id": workbook_id, "section": section, "item": payload}) + "\n"
+                    continue
+                
+                workbook = new_workbook_doc(current_user.id, topic_info, rec["category"], rec, payload)
+                workbook["id"] = workbook_id
+                await store_workbook(workbook)
+                existing_titles.append(topic_info["title"].lower())
+                generated_ids.append(workbook_id)
+                yield json.dumps({"event": "workbook", "workbook": workbook}) + "\n"
+        
+        await record_recommendation_run(current_user.id, run_started_at, generated_ids, "interactive")
+        yield json.dumps({"event": "done", "message": f"Generated {len(generated_ids)} personalized workbooks"}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def fallback_workbook_content(title: str, description: str) -> Dict:
+    """Basic workbook structure used when AI content is missing or unusable"""
+    return {
+        "estimated_time": "15-20 minutes",
+        "lessons": [
+            {
+                "id": "lesson_1",
+                "title": f"Introduction to {title}",
+                "content": f"Welcome to this workbook on {description}. This content will help you build important skills for your journey to stability.",
+                "key_points": ["Understanding the basics", "Why this matters", "How to apply it"]
+            }
+        ],
+        "exercises": [
+            {
+                "id": "exercise_1",
+                "question": f"Why is {title.lower()} important?",
+                "type": "multiple_choice",
+                "options": ["It helps you save money", "It protects you from harm", "It builds independence", "All of the above"],
+                "correct_answer": "All of the above",
+                "explanation": "These skills contribute to your overall stability and independence."
+            }
+        ],
+        "action_items": [
+            f"Research more about {title.lower()}",
+            "Talk to BRICK AI about your specific questions",
+            "Practice what you learned this week"
+        ],
+        "resources": []
+    }
+
+def validate_workbook_item(section: str, item: Any, index: int) -> Optional[Any]:
+    """Validate one generated lesson/exercise/action/resource, repairing common defects.
+
+    `index` is the item's position among valid items in its section and is used for
+    missing IDs. Returns None when the item is unusable.
+    """
+    if section == "action_items":
+        if isinstance(item, dict):
+            item = item.get("task") or item.get("title") or item.get("description")
+        return item.strip() if isinstance(item, str) and item.strip() else None
+    
+    if not isinstance(item, dict):
+        return None
+    item = dict(item)
+    
+    try:
+        if section == "lessons":
+            item["id"] = str(item.get("id") or f"lesson_{index + 1}")
+            if isinstance(item.get("key_points"), str):
+                item["key_points"] = [item["key_points"]]
+            return WorkbookLesson(**item).model_dump()
+        
+        if section == "exercises":
+            item["id"] = str(item.get("id") or f"exercise_{index + 1}")
+            item["question"] = item.get("question") or item.get("prompt")
+            item["type"] = str(item.get("type") or "multiple_choice").lower().replace(" ", "_").replace("/", "_")
+            if not item.get("options") and item["type"] == "true_false":
+                item["options"] = ["True", "False"]
+            answer = item.get("correct_answer")
+            options = item.get("options") or []
+            if isinstance(answer, bool):
+                item["correct_answer"] = "True" if answer else "False"
+            elif isinstance(answer, int) and 0 <= answer < len(options):
+                # Some responses give the option index instead of the text
+                item["correct_answer"] = options[answer]
+            return WorkbookExercise(**item).model_dump()
+        
+        if section == "resources":
+            return WorkbookResource(**{k: v for k, v in item.items() if v is not None}).model_dump()
+    except ValidationError:
+        return None
+    
+    return None
+
+def normalize_workbook_content(raw: Any, title: str, description: str) -> Dict:
+    """Validate parsed AI content against the workbook schema, filling empty sections from the fallback"""
+    if not isinstance(raw, dict):
+        raw = {}
+    fallback = fallback_workbook_content(title, description)
+    
+    content = {"estimated_time": str(raw.get("estimated_time") or fallback["estimated_time"])}
+    for section in WORKBOOK_SECTIONS:
+        items = raw.get(section) if isinstance(raw.get(section), list) else []
+        valid = []
+        for item in items:
+            checked = validate_workbook_item(section, item, len(valid))
+            if checked is not None:
+                valid.append(checked)
+        content[section] = valid or fallback[section]
+    
+    return content
+
+async def stream_workbook_content(title: str, description: str, category: str, reason: str):
+    """Generate workbook content with AI, yielding (section, item) as each item parses.
+
+    The last event is always ("content", full_content) with the validated workbook body.
+    """
+    parser = IncrementalJSONParser(WORKBOOK_SECTIONS)
+    streamed = {section: [] for section in WORKBOOK_SECTIONS}
+    raw = {}
     try:
         chat = LlmChat(
             api_key=os.environ.get('EMERGENT_LLM_KEY', ''),
@@ -1922,47 +3988,30 @@ Return ONLY the JSON, no other text."""
         
         response = await chat.send_message(UserMessage(text=f"Create a workbook on: {title}\nDescription: {description}\nCategory: {category}"))
         
-        # Parse response
-        import json
-        clean_response = response.strip()
-        if clean_response.startswith("```"):
-            clean_response = clean_response.split("```")[1]
-            if clean_response.startswith("json"):
-                clean_response = clean_response[4:]
-        clean_response = clean_response.strip()
+        # LlmChat hands back the whole completion; the parser takes arbitrary
+        # chunks, so a token stream can be fed through the same loop.
+        for section, item in parser.feed(response):
+            checked = validate_workbook_item(section, item, len(streamed[section]))
+            if checked is not None:
+                streamed[section].append(checked)
+                yield section, checked
         
-        return json.loads(clean_response)
+        raw = parser.result()
         
     except Exception as e:
         logging.error(f"Workbook content generation error: {e}")
-        # Return basic structure
-        return {
-            "estimated_time": "15-20 minutes",
-            "lessons": [
-                {
-                    "id": "lesson_1",
-                    "title": f"Introduction to {title}",
-                    "content": f"Welcome to this workbook on {description}. This content will help you build important skills for your journey to stability.",
-                    "key_points": ["Understanding the basics", "Why this matters", "How to apply it"]
-                }
-            ],
-            "exercises": [
-                {
-                    "id": "exercise_1",
-                    "question": f"Why is {title.lower()} important?",
-                    "type": "multiple_choice",
-                    "options": ["It helps you save money", "It protects you from harm", "It builds independence", "All of the above"],
-                    "correct_answer": "All of the above",
-                    "explanation": "These skills contribute to your overall stability and independence."
-                }
-            ],
-            "action_items": [
-                f"Research more about {title.lower()}",
-                "Talk to BRICK AI about your specific questions",
-                "Practice what you learned this week"
-            ],
-            "resources": []
-        }
+        # Keep whatever already parsed rather than discarding the generation
+        raw = streamed
+    
+    yield "content", normalize_workbook_content(raw, title, description)
+
+async def generate_workbook_content(topic_id: str, title: str, description: str, category: str, user_context: str, reason: str) -> Dict:
+    """Generate detailed workbook content using AI"""
+    content = None
+    async for section, payload in stream_workbook_content(title, description, category, reason):
+        if section == "content":
+            content = payload
+    return content
 
 @api_router.patch("/workbooks/{workbook_id}/progress")
 async def update_workbook_progress(workbook_id: str, data: dict, current_user: User = Depends(get_current_user)):
@@ -1996,11 +4045,11 @@ async def update_workbook_progress(workbook_id: str, data: dict, current_user: U
             completed.append(data["completed_action"])
         update_fields["completed_actions"] = completed
     
-    # Calculate progress percentage
+    # Calculate progress percentage (section counts live on the document once the body is shared)
     total_items = (
-        len(workbook.get("lessons", [])) + 
-        len(workbook.get("exercises", [])) + 
-        len(workbook.get("action_items", []))
+        workbook.get("lesson_count", len(workbook.get("lessons", []))) + 
+        workbook.get("exercise_count", len(workbook.get("exercises", []))) + 
+        workbook.get("action_count", len(workbook.get("action_items", [])))
     )
     completed_items = (
         len(update_fields.get("completed_lessons", workbook.get("completed_lessons", []))) +
@@ -2022,31 +4071,866 @@ async def update_workbook_progress(workbook_id: str, data: dict, current_user: U
     
     return {"progress": progress, "completed": progress >= 100}
 
-@api_router.get("/workbooks/topics")
-async def get_available_topics():
-    """Get all available workbook topics organized by category"""
-    return WORKBOOK_TOPICS
+# ==================== WORKBOOK PRE-GENERATION ====================
+
+# Workbooks are generated ahead of time, off-peak, for users whose flashcard answers
+# or dossier changed since their last recommendation run. Dirty users are queued in
+# workbook_pregen_queue and drained at a fixed rate inside the off-peak window.
+WORKBOOK_PREGEN_ENABLED = os.environ.get('WORKBOOK_PREGEN_ENABLED', 'true').lower() == 'true'
+WORKBOOK_PREGEN_TIMEZONE = os.environ.get('WORKBOOK_PREGEN_TIMEZONE', 'America/Los_Angeles')
+WORKBOOK_PREGEN_START_HOUR = int(os.environ.get('WORKBOOK_PREGEN_START_HOUR', '1'))
+WORKBOOK_PREGEN_END_HOUR = int(os.environ.get('WORKBOOK_PREGEN_END_HOUR', '6'))
+WORKBOOK_PREGEN_PER_HOUR = int(os.environ.get('WORKBOOK_PREGEN_PER_HOUR', '60'))
+WORKBOOK_PREGEN_LEASE_MINUTES = 30
+WORKBOOK_PREGEN_IDLE_SECONDS = 300
+
+def in_pregen_window(now: Optional[datetime] = None) -> bool:
+    """True when the local hour falls inside the configured off-peak window (may wrap midnight)"""
+    from zoneinfo import ZoneInfo
+    now = now or datetime.now(timezone.utc)
+    hour = now.astimezone(ZoneInfo(WORKBOOK_PREGEN_TIMEZONE)).hour
+    if WORKBOOK_PREGEN_START_HOUR <= WORKBOOK_PREGEN_END_HOUR:
+        return WORKBOOK_PREGEN_START_HOUR <= hour < WORKBOOK_PREGEN_END_HOUR
+    return hour >= WORKBOOK_PREGEN_START_HOUR or hour < WORKBOOK_PREGEN_END_HOUR
+
+async def record_recommendation_run(user_id: str, started_at: str, workbook_ids: List[str], source: str):
+    """Remember when a user's recommendations were last generated and clear them from the queue"""
+    await db.workbook_recommendation_runs.update_one(
+        {"user_id": user_id},
+        {"$set": {
+            "user_id": user_id,
+            "last_run_at": started_at,
+            "workbook_ids": workbook_ids,
+            "source": source,
+            "delivered_at": None if source == "scheduled" else started_at
+        }},
+        upsert=True
+    )
+    # Only drop the queue entry if nothing changed after this run started
+    await db.workbook_pregen_queue.delete_one({"user_id": user_id, "dirty_since": {"$lte": started_at}})
+
+async def latest_profile_change(user_id: str) -> Optional[str]:
+    """Timestamp of the user's most recent flashcard answer or dossier entry"""
+    card = await db.flashcards.find_one(
+        {"user_id": user_id, "answered_at": {"$ne": None}},
+        {"_id": 0, "answered_at": 1},
+        sort=[("answered_at", -1)]
+    )
+    entry = await db.dossier.find_one({"user_id": user_id}, {"_id": 0, "created_at": 1}, sort=[("created_at", -1)])
+    changes = [c for c in [card and card.get("answered_at"), entry and entry.get("created_at")] if c]
+    return max(changes) if changes else None
+
+async def take_pregenerated_workbooks(user_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Hand over workbooks from an undelivered scheduled run if the user's answers haven't changed since"""
+    run = await db.workbook_recommendation_runs.find_one(
+        {"user_id": user_id, "source": "scheduled", "delivered_at": None},
+        {"_id": 0}
+    )
+    if not run or not run.get("workbook_ids"):
+        return None
+    
+    changed_at = await latest_profile_change(user_id)
+    if changed_at and changed_at > run["last_run_at"]:
+        return None
+    
+    await db.workbook_recommendation_runs.update_one(
+        {"user_id": user_id},
+        {"$set": {"delivered_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return await db.workbooks.find(
+        {"id": {"$in": run["workbook_ids"]}, "user_id": user_id},
+        {"_id": 0, "id": 1, "title": 1, "category": 1, "why_recommended": 1}
+    ).to_list(len(run["workbook_ids"]))
+
+async def queue_changed_users() -> int:
+    """Queue users whose flashcard answers or dossier changed since their last recommendation run.
+
+    Only changes newer than the previous scan are examined, so each pass is incremental.
+    """
+    from pymongo import UpdateOne
+    
+    scan_started_at = datetime.now(timezone.utc).isoformat()
+    state = await db.workbook_pregen_state.find_one({"id": "scan"}, {"_id": 0})
+    since = ""
+    if state:
+        # Overlap the previous scan slightly to catch writes that landed while it ran
+        since = (datetime.fromisoformat(state["scanned_until"]) - timedelta(minutes=1)).isoformat()
+    
+    changed = {}
+    for collection, field in ((db.flashcards, "answered_at"), (db.dossier, "created_at")):
+        rows = await collection.aggregate([
+            {"$match": {field: {"$gt": since, "$lte": scan_started_at}}},
+            {"$group": {"_id": "$user_id", "changed_at": {"$max": f"${field}"}}}
+        ]).to_list(None)
+        for row in rows:
+            if row["changed_at"] > changed.get(row["_id"], ""):
+                changed[row["_id"]] = row["changed_at"]
+    
+    queued = 0
+    if changed:
+        runs = await db.workbook_recommendation_runs.find(
+            {"user_id": {"$in": list(changed)}},
+            {"_id": 0, "user_id": 1, "last_run_at": 1}
+        ).to_list(None)
+        last_runs = {r["user_id"]: r["last_run_at"] for r in runs}
+        
+        ops = [
+            UpdateOne(
+                {"user_id": user_id},
+                {"$min": {"dirty_since": changed_at}, "$setOnInsert": {"claimed_until": None}},
+                upsert=True
+            )
+            for user_id, changed_at in changed.items()
+            if changed_at > last_runs.get(user_id, "")
+        ]
+        if ops:
+            await db.workbook_pregen_queue.bulk_write(ops, ordered=False)
+            queued = len(ops)
+    
+    await db.workbook_pregen_state.update_one(
+        {"id": "scan"},
+        {"$set": {"id": "scan", "scanned_until": scan_started_at}},
+        upsert=True
+    )
+    return queued
+
+async def claim_pregen_user() -> Optional[Dict[str, Any]]:
+    """Lease the longest-waiting queued user so concurrent workers don't generate twice"""
+    from pymongo import ReturnDocument
+    
+    now = datetime.now(timezone.utc)
+    return await db.workbook_pregen_queue.find_one_and_update(
+        {"$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now.isoformat()}}]},
+        {"$set": {"claimed_until": (now + timedelta(minutes=WORKBOOK_PREGEN_LEASE_MINUTES)).isoformat()}},
+        sort=[("dirty_since", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def pregenerate_for_user(user_id: str) -> int:
+    """Generate workbooks for one queued user; returns how many were created"""
+    user_doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+    if not user_doc:
+        await db.workbook_pregen_queue.delete_one({"user_id": user_id})
+        return 0
+    
+    if isinstance(user_doc.get('created_at'), str):
+        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+    
+    generated = await generate_workbooks_for_user(User(**user_doc), source="scheduled")
+    return len(generated)
+
+async def run_pregen_batch(limit: int) -> Dict[str, int]:
+    """Scan for changed users, then pre-generate workbooks for up to `limit` of them"""
+    queued = await queue_changed_users()
+    processed = 0
+    generated = 0
+    
+    for _ in range(limit):
+        entry = await claim_pregen_user()
+        if not entry:
+            break
+        try:
+            generated += await pregenerate_for_user(entry["user_id"])
+            processed += 1
+        except Exception as e:
+            # Lease expiry returns the user to the queue for a later attempt
+            logging.error(f"Workbook pre-generation failed for {entry['user_id']}: {e}")
+    
+    return {"queued": queued, "processed": processed, "workbooks_generated": generated}
+
+async def workbook_pregen_loop():
+    """Background worker: drain the pre-generation queue at the configured rate during off-peak hours"""
+    interval = 3600 / max(WORKBOOK_PREGEN_PER_HOUR, 1)
+    while True:
+        try:
+            if in_pregen_window():
+                result = await run_pregen_batch(1)
+                await asyncio.sleep(interval if result["processed"] else WORKBOOK_PREGEN_IDLE_SECONDS)
+            else:
+                await asyncio.sleep(WORKBOOK_PREGEN_IDLE_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Workbook pre-generation loop error: {e}")
+            await asyncio.sleep(WORKBOOK_PREGEN_IDLE_SECONDS)
+
+@api_router.post("/admin/workbooks/pregenerate")
+async def trigger_workbook_pregeneration(limit: int = 10, current_user: User = Depends(get_current_user)):
+    """Run a pre-generation batch now, ignoring the off-peak window"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can run workbook pre-generation")
+    return await run_pregen_batch(min(max(limit, 0), 100))
+
+@api_router.get("/admin/workbooks/pregenerate")
+async def get_workbook_pregeneration_status(current_user: User = Depends(get_current_user)):
+    """Queue depth and schedule of the off-peak workbook pre-generation"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can view workbook pre-generation")
+    
+    state = await db.workbook_pregen_state.find_one({"id": "scan"}, {"_id": 0})
+    return {
+        "enabled": WORKBOOK_PREGEN_ENABLED,
+        "in_window": in_pregen_window(),
+        "window": f"{WORKBOOK_PREGEN_START_HOUR:02d}:00-{WORKBOOK_PREGEN_END_HOUR:02d}:00 {WORKBOOK_PREGEN_TIMEZONE}",
+        "rate_per_hour": WORKBOOK_PREGEN_PER_HOUR,
+        "queued_users": await db.workbook_pregen_queue.count_documents({}),
+        "last_scan": state.get("scanned_until") if state else None
+    }
 
 # ==================== RESOURCES ====================
 
+# Resources keep `coordinates` as {lat, lng} for clients, plus a GeoJSON `location`
+# Point derived from it for 2dsphere queries. Confidential and mobile services have
+# no coordinates and therefore no location.
+DIRECTORY_TIMEZONE = os.environ.get('DIRECTORY_TIMEZONE', 'America/Los_Angeles')
+NEARBY_MAX_RESULTS = 50
+
+def with_resource_location(doc: Dict[str, Any]) -> Dict[str, Any]:
+    coordinates = doc.get("coordinates") or {}
+    try:
+        doc["location"] = point(*parse_lng_lat(coordinates.get("lng"), coordinates.get("lat")))
+    except ValueError:
+        doc.pop("location", None)
+    return doc
+
+# Directory reads are served from an in-memory DirectorySnapshot. Writes through the
+# API refresh it directly; a change stream on `resources` refreshes it for writes from
+# other instances or scripts. Without a replica set (no change streams) the snapshot
+# falls back to following the resources catalog version.
+DIRECTORY_WATCH_RETRY_SECONDS = 5
+_directory_snapshot: Optional[DirectorySnapshot] = None
+_directory_refresh_lock = asyncio.Lock()
+_directory_watch_active = False
+
+async def refresh_directory_snapshot() -> DirectorySnapshot:
+    """Load resources into a new snapshot and swap it in"""
+    global _directory_snapshot
+    async with _directory_refresh_lock:
+        _catalog_versions.pop("resources", None)
+        version = await catalog_version("resources")
+        resources = await db.resources.find({}, {"_id": 0, "location": 0}).to_list(None)
+        _directory_snapshot = DirectorySnapshot(version, resources)
+    return _directory_snapshot
+
+async def directory_snapshot() -> DirectorySnapshot:
+    snapshot = _directory_snapshot
+    if snapshot is None:
+        return await refresh_directory_snapshot()
+    if not _directory_watch_active and await catalog_version("resources") != snapshot.version:
+        return await refresh_directory_snapshot()
+    return snapshot
+
+async def directory_watch_loop():
+    """Background worker: refresh the directory snapshot whenever `resources` changes"""
+    global _directory_watch_active
+    from pymongo.errors import OperationFailure
+    
+    while True:
+        try:
+            async with db.resources.watch(max_await_time_ms=500) as stream:
+                _directory_watch_active = True
+                # Changes may have landed while no stream was open
+                await refresh_directory_snapshot()
+                while True:
+                    await stream.next()
+                    # Coalesce bursts such as seeding, which inserts one document at a time
+                    while await stream.try_next() is not None:
+                        pass
+                    catalog_cache.invalidate("resources")
+                    await refresh_directory_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            _directory_watch_active = False
+            if e.code in (40573, 40324):  # Standalone server or unsupported stage: no change streams
+                logging.info("Change streams unavailable; directory snapshot follows the catalog version")
+                return
+            logging.error(f"Directory watch error: {e}")
+        except Exception as e:
+            _directory_watch_active = False
+            logging.error(f"Directory watch error: {e}")
+        await asyncio.sleep(DIRECTORY_WATCH_RETRY_SECONDS)
+
+async def migrate_resource_locations() -> int:
+    """Add the GeoJSON location to resources stored before it existed"""
+    from pymongo import UpdateOne
+    
+    docs = await db.resources.find(
+        {"location": {"$exists": False}, "coordinates.lat": {"$ne": None}},
+        {"_id": 0, "id": 1, "coordinates": 1}
+    ).to_list(None)
+    ops = []
+    for doc in docs:
+        location = with_resource_location(doc).get("location")
+        if location:
+            ops.append(UpdateOne({"id": doc["id"]}, {"$set": {"location": location}}))
+    if ops:
+        await db.resources.bulk_write(ops, ordered=False)
+    return len(ops)
+
+# Optional transit ranking reads a static RTC GTFS zip. The compact index built from it
+# is cached beside the feed and rebuilt when the feed file changes.
+GTFS_FEED_PATH = os.environ.get('GTFS_FEED_PATH', str(ROOT_DIR / 'data' / 'rtc_gtfs.zip'))
+TRANSIT_CANDIDATES = 40  # Nearest resources by distance that are then timed by transit
+_transit_router: Optional[TransitRouter] = None
+_transit_router_lock = asyncio.Lock()
+
+async def transit_router() -> Optional[TransitRouter]:
+    """The router for the local GTFS feed, or None when no feed is installed"""
+    global _transit_router
+    if _transit_router is None and os.path.exists(GTFS_FEED_PATH):
+        async with _transit_router_lock:
+            if _transit_router is None:
+                index = await asyncio.to_thread(load_transit_index, GTFS_FEED_PATH, GTFS_FEED_PATH + ".index.json.gz")
+                _transit_router = await asyncio.to_thread(TransitRouter, index)
+    return _transit_router
+
+def directory_minute_now() -> int:
+    from zoneinfo import ZoneInfo
+    return minute_of_week(datetime.now(ZoneInfo(DIRECTORY_TIMEZONE)))
+
+def directory_minute_at(at: str) -> int:
+    """Minute of the week in directory time for an ISO timestamp; naive times are directory-local"""
+    from zoneinfo import ZoneInfo
+    moment = datetime.fromisoformat(at)
+    zone = ZoneInfo(DIRECTORY_TIMEZONE)
+    moment = moment.replace(tzinfo=zone) if moment.tzinfo is None else moment.astimezone(zone)
+    return minute_of_week(moment)
+
+@api_router.get("/resources/nearby")
+async def get_nearby_resources(
+    lat: float,
+    lng: float,
+    limit: int = 10,
+    radius_meters: Optional[float] = None,
+    category: Optional[str] = None,
+    open_now: bool = False,
+    accepts_pets: Optional[bool] = None,
+    rank: str = "distance"
+):
+    """Nearest resources to a point, closest first, with distance_meters.
+
+    `limit` is k for k-nearest; `radius_meters` additionally caps the distance.
+    `open_now` is null when a resource's hours can't be read; `open_now=true`
+    leaves those out. `rank=transit` reorders the nearest TRANSIT_CANDIDATES by estimated travel time
+    on foot and by bus, adding travel_minutes, travel_mode and transit_routes.
+    """
+    try:
+        parse_lng_lat(lng, lat)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rank not in ("distance", "transit"):
+        raise HTTPException(status_code=400, detail="rank must be distance or transit")
+    limit = min(max(limit, 1), NEARBY_MAX_RESULTS)
+    router = None
+    if rank == "transit":
+        router = await transit_router()
+        if router is None:
+            raise HTTPException(status_code=503, detail="Transit data is not installed on this server")
+    now_minute = directory_minute_now()
+    
+    def accept(resource):
+        if category and category != "all" and resource.get("category") != category:
+            return False
+        if accepts_pets is not None and resource.get("accepts_pets") != accepts_pets:
+            return False
+        if open_now and snapshot.hours.is_open(resource["id"], now_minute) is not True:
+            return False
+        return True
+    
+    snapshot = await directory_snapshot()
+    candidates = snapshot.nearest(
+        lng, lat, max(limit, TRANSIT_CANDIDATES) if router else limit,
+        max_distance=radius_meters or None, accept=accept
+    )
+    results = []
+    for distance, resource in candidates:
+        results.append({
+            **resource,
+            "distance_meters": round(distance),
+            "open_now": snapshot.hours.is_open(resource["id"], now_minute)
+        })
+    
+    if router:
+        destinations = [(r["id"], *snapshot.positions[r["id"]]) for r in results]
+        estimates = await asyncio.to_thread(router.travel_times, lng, lat, destinations)
+        for resource in results:
+            estimate = estimates[resource["id"]]
+            resource["travel_minutes"] = round(estimate["seconds"] / 60)
+            resource["travel_mode"] = estimate["mode"]
+            resource["transit_routes"] = estimate["routes"]
+        results.sort(key=lambda r: (r["travel_minutes"], r["distance_meters"]))
+        results = results[:limit]
+    
+    return {"origin": {"lat": lat, "lng": lng}, "resources": results}
+
+@api_router.get("/resources/open")
+async def get_open_resources(at: Optional[str] = None, category: Optional[str] = None, limit: int = 100):
+    """Resources open now, or at `at` (ISO time), with minutes until each closes.
+
+    Resources whose hours could not be parsed are never listed; see
+    /admin/resources/hours-issues.
+    """
+    try:
+        minute = directory_minute_at(at) if at else directory_minute_now()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="at must be an ISO date-time")
+    snapshot = await directory_snapshot()
+    open_ids = snapshot.hours.open_at(minute, category)
+    resources = sorted((snapshot.by_id[rid] for rid in open_ids), key=lambda r: r.get("name", ""))
+    return {
+        "total": len(resources),
+        "resources": [
+            {**resource, "closes_in_minutes": snapshot.hours.closes_in(resource["id"], minute)}
+            for resource in resources[:min(max(limit, 1), 500)]
+        ]
+    }
+
+@api_router.get("/admin/resources/hours-issues")
+async def get_resource_hours_issues(current_user: User = Depends(get_current_user)):
+    """Resources whose hours text could not be fully parsed, for staff to correct"""
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can review resource hours")
+    snapshot = await directory_snapshot()
+    issues = [
+        {"id": rid, "name": snapshot.by_id[rid].get("name"), "hours": snapshot.by_id[rid].get("hours"),
+         "unparsed": segments, "has_parsed_hours": rid in snapshot.hours.intervals}
+        for rid, segments in snapshot.hours.unparsed.items()
+    ]
+    issues.sort(key=lambda issue: issue["name"] or "")
+    return {"count": len(issues), "issues": issues}
+
 @api_router.get("/resources", response_model=List[Resource])
-async def get_resources(category: Optional[str] = None):
-    query = {"category": category} if category else {}
-    resources = await db.resources.find(query, {"_id": 0}).to_list(1000)
-    for r in resources:
-        if isinstance(r.get('created_at'), str):
-            r['created_at'] = datetime.fromisoformat(r['created_at'])
-    return resources
+async def get_resources(request: Request, category: Optional[str] = None):
+    snapshot = await directory_snapshot()
+    
+    async def build():
+        valid = []
+        for r in snapshot.in_category(category):
+            r = dict(r)
+            if isinstance(r.get('created_at'), str):
+                r['created_at'] = datetime.fromisoformat(r['created_at'])
+            try:
+                valid.append(Resource(**r).model_dump(mode="json"))
+            except ValidationError:
+                # Confidential and mobile services have no fixed coordinates to map
+                continue
+        return valid
+    
+    return await serve_catalog(request, "resources", f"resources:{category or ''}", build, version=snapshot.version)
 
 @api_router.post("/resources", response_model=Resource)
 async def create_resource(resource: Resource, current_user: User = Depends(get_current_user)):
     if current_user.role != "caseworker":
         raise HTTPException(status_code=403, detail="Only caseworkers can create resources")
-    doc = resource.model_dump()
+    doc = with_resource_location(resource.model_dump())
     doc['created_at'] = doc['created_at'].isoformat()
     await db.resources.insert_one(doc)
+    await bump_catalog_version("resources")
+    await refresh_directory_snapshot()
     return resource
 
+# ==================== BED AVAILABILITY ====================
+
+# Bed counts live in resource_availability, one document per resource with a version
+# that every update increments. They are kept out of `resources` so frequent updates
+# don't rebuild the directory snapshot. Each instance caches the collection in an
+# AvailabilityTable and pulls changes written elsewhere every AVAILABILITY_SYNC_SECONDS.
+AVAILABILITY_SYNC_SECONDS = 2
+AVAILABILITY_SYNC_OVERLAP_SECONDS = 2
+AVAILABILITY_HEARTBEAT_SECONDS = 15
+AVAILABILITY_AUDIENCE = "availability"
+availability_table = AvailabilityTable()
+availability_hub = NotificationHub()
+
+def publish_availability(doc: Dict[str, Any]):
+    entry = availability_table.apply(doc)
+    if entry:
+        availability_hub.publish_audience(AVAILABILITY_AUDIENCE, {"type": "availability", "availability": entry})
+
+async def sync_availability():
+    """Load the table on first use, then apply changes written since the newest one seen"""
+    if not availability_table.loaded:
+        for doc in await db.resource_availability.find({}, {"_id": 0}).to_list(None):
+            availability_table.apply(doc)
+        availability_table.loaded = True
+        return
+    query: Dict[str, Any] = {}
+    if availability_table.cursor:
+        # Overlap covers writes that committed out of order; versions drop repeats
+        since = datetime.fromisoformat(availability_table.cursor) - timedelta(seconds=AVAILABILITY_SYNC_OVERLAP_SECONDS)
+        query["updated_at"] = {"$gte": since.isoformat()}
+    docs = await db.resource_availability.find(query, {"_id": 0}).sort("updated_at", 1).to_list(None)
+    for doc in docs:
+        publish_availability(doc)
+
+async def availability_sync_loop():
+    """Background worker: pick up availability changes made through other instances"""
+    while True:
+        try:
+            await sync_availability()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Availability sync error: {e}")
+        await asyncio.sleep(AVAILABILITY_SYNC_SECONDS)
+
+@api_router.get("/resources/availability")
+async def get_resource_availability(request: Request):
+    """Live bed counts and status for every resource that reports them, from the in-memory table"""
+    if not availability_table.loaded:
+        await sync_availability()
+    etag = f'"{availability_table.etag()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, availability_table.etag()):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({"availability": list(availability_table.entries.values())}, headers=headers)
+
+@api_router.get("/resources/availability/stream")
+async def stream_resource_availability(request: Request):
+    """Server-Sent Events feed: a snapshot of the table, then each availability change"""
+    if not availability_table.loaded:
+        await sync_availability()
+    connection_id = str(uuid.uuid4())
+
+    async def events():
+        queue = availability_hub.subscribe(connection_id, [AVAILABILITY_AUDIENCE])
+        try:
+            yield "retry: 5000\n\n"
+            yield format_sse({"type": "snapshot", "availability": list(availability_table.entries.values())})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=AVAILABILITY_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event["type"] == "resync":
+                    event = {"type": "snapshot", "availability": list(availability_table.entries.values())}
+                yield format_sse(event)
+        finally:
+            availability_hub.unsubscribe(connection_id, [AVAILABILITY_AUDIENCE], queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.patch("/resources/{resource_id}/availability")
+async def update_resource_availability(resource_id: str, update: AvailabilityUpdate,
+                                       current_user: User = Depends(get_current_user)):
+    """Set or adjust a resource's bed count atomically.
+
+    `beds_available` sets the count; `delta` adds to it without reading it first and
+    never takes it below zero or above `beds_total`. Every write is checked against the
+    stored total in the same query, so a count can never exceed it. With
+    `expected_version` the update only applies if the entry is still at that version.
+    Conflicts return 409 with the current entry.
+    """
+    from pymongo import ReturnDocument
+    from pymongo.errors import DuplicateKeyError
+
+    if current_user.role not in ["caseworker", "agency_staff"]:
+        raise HTTPException(status_code=403, detail="Only agency staff can update availability")
+    if update.beds_available is not None and update.delta is not None:
+        raise HTTPException(status_code=400, detail="Send either beds_available or delta, not both")
+    if update.beds_available is None and not update.delta and update.beds_total is None and update.closed is None:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    if (update.beds_available is not None and update.beds_total is not None
+            and update.beds_available > update.beds_total):
+        raise HTTPException(status_code=400, detail="beds_available cannot exceed beds_total")
+    snapshot = await directory_snapshot()
+    if resource_id not in snapshot.by_id:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
+    query: Dict[str, Any] = {"resource_id": resource_id}
+    if update.expected_version is not None:
+        query["version"] = update.expected_version
+    fields: Dict[str, Any] = {"updated_at": datetime.now(timezone.utc).isoformat(), "updated_by": current_user.id}
+    for name in ("beds_available", "beds_total", "closed"):
+        value = getattr(update, name)
+        if value is not None:
+            fields[name] = value
+    changes: Dict[str, Any] = {"$set": fields, "$inc": {"version": 1}}
+
+    # Bounds checked by the write itself; `None` also matches a missing field
+    bounds: List[Dict[str, Any]] = []
+    if update.delta:
+        changes["$inc"]["beds_available"] = update.delta
+        bounds.append({"beds_available": {"$gte": max(0, -update.delta)}})
+        if update.beds_total is not None:
+            bounds.append({"beds_available": {"$lte": update.beds_total - update.delta}})
+        elif update.delta > 0:
+            bounds.append({"$or": [
+                {"beds_total": None},
+                {"$expr": {"$lte": [{"$add": ["$beds_available", update.delta]}, "$beds_total"]}}
+            ]})
+    elif update.beds_available is not None and update.beds_total is None:
+        bounds.append({"$or": [{"beds_total": None}, {"beds_total": {"$gte": update.beds_available}}]})
+    elif update.beds_total is not None and update.beds_available is None:
+        bounds.append({"$or": [{"beds_available": None}, {"beds_available": {"$lte": update.beds_total}}]})
+    if bounds:
+        query["$and"] = bounds
+
+    if update.delta:
+        doc = await db.resource_availability.find_one_and_update(
+            query, changes, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    else:
+        try:
+            doc = await db.resource_availability.find_one_and_update(
+                query, changes, projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            doc = None  # The entry exists at another version
+
+    if doc is None:
+        current = await db.resource_availability.find_one({"resource_id": resource_id}, {"_id": 0})
+        if current is None:
+            detail = "No bed count recorded yet; set beds_available first"
+        elif update.expected_version is not None and current.get("version") != update.expected_version:
+            detail = "Availability was changed by someone else"
+        elif update.delta is not None and update.delta < 0:
+            detail = "Not enough beds available"
+        else:
+            detail = "beds_available cannot exceed beds_total"
+        if current is not None:
+            publish_availability(current)
+        return JSONResponse(
+            status_code=409,
+            content={"detail": detail, "current": availability_table.entries.get(resource_id)}
+        )
+
+    publish_availability(doc)
+    return availability_table.entries[resource_id]
+
+# ==================== MAP ====================
+
+# The map's markers come from /map/viewport: resources, active pop-up events and
+# upcoming sweeps, clustered per zoom level by a ClusterIndex. An index is built per
+# (layers, category) and rebuilt when any source version changes, or after
+# MAP_CLUSTER_MAX_AGE_SECONDS since events end and sweeps pass without a write.
+MAP_LAYERS = ("resource", "popup_event", "sweep")
+MAP_CLUSTER_MAX_AGE_SECONDS = 300
+_map_clusters: Dict[tuple, tuple] = {}  # (layers, category) -> (versions, built_at, index)
+
+def sweep_lng_lat(sweep: Dict[str, Any]) -> Optional[List[float]]:
+    """A sweep's map position: its coordinates, its target circle's centre, or its polygon's centroid"""
+    coordinates = sweep.get("coordinates") or {}
+    if coordinates.get("lat") is not None or coordinates.get("lng") is not None:
+        try:
+            return parse_lng_lat(coordinates.get("lng"), coordinates.get("lat"))
+        except ValueError:
+            pass  # Half-filled or bad coordinates; fall back to the target area
+    area = sweep.get("area") or {}
+    if area.get("type") == "circle":
+        return area["center"]
+    if area.get("type") == "Polygon":
+        ring = area["coordinates"][0][:-1]
+        return [sum(p[0] for p in ring) / len(ring), sum(p[1] for p in ring) / len(ring)]
+    return None
+
+async def map_points(layers: tuple, category: Optional[str]) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    points = []
+    if "resource" in layers:
+        snapshot = await directory_snapshot()
+        for resource in snapshot.in_category(category):
+            lng_lat = snapshot.positions.get(resource["id"])
+            if lng_lat is None:
+                continue
+            points.append({
+                "kind": "resource", "id": resource["id"], "lng": lng_lat[0], "lat": lng_lat[1],
+                "name": resource.get("name"), "category": resource.get("category"),
+                "address": resource.get("address"), "phone": resource.get("phone"), "hours": resource.get("hours")
+            })
+    if "popup_event" in layers:
+        events = (await popup_event_index()).overlapping(now, datetime.max.replace(tzinfo=timezone.utc))
+        for event in events:
+            coordinates = event.get("coordinates") or {}
+            points.append({
+                "kind": "popup_event", "lng": coordinates.get("lng"), "lat": coordinates.get("lat"),
+                **{k: event.get(k) for k in ("id", "title", "event_type", "location", "start_time", "end_time")}
+            })
+    if "sweep" in layers:
+        sweeps = await db.cleanup_sweeps.find(
+            {"scheduled_at": {"$gte": now - timedelta(days=1)}},
+            {"_id": 0, "id": 1, "location": 1, "coordinates": 1, "area": 1, "scheduled_date": 1, "date": 1, "time": 1}
+        ).to_list(None)
+        for sweep in sweeps:
+            lng_lat = sweep_lng_lat(sweep)
+            if lng_lat is None:
+                continue
+            points.append({
+                "kind": "sweep", "id": sweep["id"], "lng": lng_lat[0], "lat": lng_lat[1],
+                "location": sweep.get("location"), "scheduled_date": sweep.get("scheduled_date"),
+                "date": sweep.get("date"), "time": sweep.get("time")
+            })
+    return points
+
+async def map_cluster_index(layers: tuple, category: Optional[str]) -> ClusterIndex:
+    versions = (
+        (await directory_snapshot()).version,
+        await catalog_version("popup_events"),
+        await catalog_version("cleanup_sweeps")
+    )
+    key = (layers, category or "all")
+    cached = _map_clusters.get(key)
+    if cached and cached[0] == versions and time.monotonic() - cached[1] < MAP_CLUSTER_MAX_AGE_SECONDS:
+        return cached[2]
+    index = ClusterIndex(await map_points(layers, category))
+    _map_clusters[key] = (versions, time.monotonic(), index)
+    return index
+
+@api_router.get("/map/viewport")
+async def get_map_viewport(bbox: str, zoom: float, layers: Optional[str] = None, category: Optional[str] = None):
+    """Clustered markers inside `bbox` ("west,south,east,north") at a map zoom level.
+
+    Each item is either a point (`kind` is resource, popup_event or sweep) or a cluster
+    with a count per kind and the `expansion_zoom` at which it splits. `layers` is a
+    comma-separated subset of the kinds; `category` filters resources.
+    """
+    try:
+        west, south, east, north = parse_bbox(bbox, wrap=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not math.isfinite(zoom):
+        raise HTTPException(status_code=400, detail="zoom must be a number")
+    zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+    selected = tuple(layer for layer in MAP_LAYERS if not layers or layer in layers.split(","))
+    if not selected:
+        raise HTTPException(status_code=400, detail=f"layers must be among {', '.join(MAP_LAYERS)}")
+    if category == "all":
+        category = None
+
+    index = await map_cluster_index(selected, category)
+    south, north = max(south, -85), min(north, 85)
+    if west <= east:
+        return index.query(west, south, east, north, zoom)
+    # Box crosses the antimeridian
+    left = index.query(west, south, 180, north, zoom)
+    right = index.query(-180, south, east, north, zoom)
+    return {"zoom": left["zoom"], "items": left["items"] + right["items"],
+            "truncated": left["truncated"] or right["truncated"]}
+
+# ==================== OFFLINE DIRECTORY BUNDLE ====================
+
+# Phones with patchy data cache the directory: resources (with parsed hours and
+# coordinates) and active pop-up events. Each distinct bundle content gets a version
+# number; directory_bundle_versions keeps a manifest of item hashes per version so
+# /directory/bundle/delta can send only what changed since the client's version.
+# Manifests older than the last DIRECTORY_BUNDLE_HISTORY versions are dropped and
+# those clients fetch the full bundle again.
+DIRECTORY_BUNDLE_HISTORY = 50
+DIRECTORY_BUNDLE_MAX_AGE_SECONDS = 300
+_directory_bundle: Dict[str, Any] = {"sources": None, "built_at": 0.0, "version": None, "items": {}, "manifest": {}}
+_directory_bundle_lock = asyncio.Lock()
+
+def bundle_item_hash(item: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(item, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+async def directory_bundle_items() -> Dict[str, Dict[str, Any]]:
+    """Current bundle contents, keyed resource:<id> and event:<id>"""
+    snapshot = await directory_snapshot()
+    items = {}
+    for resource in snapshot.resources:
+        items[f"resource:{resource['id']}"] = {**resource, "open_intervals": snapshot.hours.intervals.get(resource["id"], [])}
+    events = (await popup_event_index()).overlapping(datetime.now(timezone.utc), datetime.max.replace(tzinfo=timezone.utc))
+    for event in events:
+        items[f"event:{event['id']}"] = event
+    return items
+
+async def assign_bundle_version(manifest: Dict[str, str]) -> int:
+    """Version for a manifest: the latest one if unchanged, else the next number"""
+    from pymongo.errors import DuplicateKeyError
+
+    digest = hashlib.sha256(json.dumps(sorted(manifest.items())).encode()).hexdigest()
+    while True:
+        latest = await db.directory_bundle_versions.find_one(
+            {}, {"_id": 0, "version": 1, "digest": 1}, sort=[("version", -1)]
+        )
+        if latest and latest["digest"] == digest:
+            return latest["version"]
+        version = (latest["version"] if latest else 0) + 1
+        try:
+            await db.directory_bundle_versions.insert_one({
+                # Stored as pairs: ids may contain characters that field names can't
+                "version": version, "digest": digest, "manifest": sorted(manifest.items()),
+                "created_at": datetime.now(timezone.utc).isoformat()
+            })
+        except DuplicateKeyError:
+            continue  # Another instance took that number; compare against its manifest
+        await db.directory_bundle_versions.delete_many({"version": {"$lte": version - DIRECTORY_BUNDLE_HISTORY}})
+        return version
+
+async def current_directory_bundle() -> Dict[str, Any]:
+    sources = ((await directory_snapshot()).version, await catalog_version("popup_events"))
+    bundle = _directory_bundle
+    if bundle["sources"] == sources and time.monotonic() - bundle["built_at"] < DIRECTORY_BUNDLE_MAX_AGE_SECONDS:
+        return bundle
+    async with _directory_bundle_lock:
+        if _directory_bundle["sources"] == sources and time.monotonic() - _directory_bundle["built_at"] < DIRECTORY_BUNDLE_MAX_AGE_SECONDS:
+            return _directory_bundle
+        items = await directory_bundle_items()
+        manifest = {key: bundle_item_hash(item) for key, item in items.items()}
+        version = await assign_bundle_version(manifest)
+        _directory_bundle.update(sources=sources, built_at=time.monotonic(), version=version, items=items, manifest=manifest)
+    return _directory_bundle
+
+def split_bundle_items(items) -> Dict[str, list]:
+    resources, events = [], []
+    for key, item in items:
+        (resources if key.startswith("resource:") else events).append(item)
+    return {"resources": resources, "events": events}
+
+@api_router.get("/directory/bundle")
+async def get_directory_bundle(request: Request):
+    """The whole offline directory at its current version, gzip-compressed with an ETag"""
+    bundle = await current_directory_bundle()
+    key = ("resources", "bundle")
+    entry = catalog_cache.get(key, bundle["version"])
+    if entry is None:
+        entry = catalog_cache.put(key, bundle["version"], {
+            "version": bundle["version"],
+            "timezone": DIRECTORY_TIMEZONE,
+            **split_bundle_items(sorted(bundle["items"].items()))
+        })
+    return CatalogCache.respond(entry, request)
+
+@api_router.get("/directory/bundle/delta")
+async def get_directory_bundle_delta(request: Request, since: int):
+    """Items added or changed since bundle version `since`, and the ids removed.
+
+    Returns 410 when that version is too old to diff against; fetch /directory/bundle instead.
+    """
+    bundle = await current_directory_bundle()
+    key = ("resources", f"bundle-delta:{since}")
+    entry = catalog_cache.get(key, bundle["version"])
+    if entry is None:
+        if since == bundle["version"]:
+            old_manifest = bundle["manifest"]
+        else:
+            old = await db.directory_bundle_versions.find_one({"version": since}, {"_id": 0, "manifest": 1})
+            if old is None or since > bundle["version"]:
+                raise HTTPException(status_code=410, detail="Bundle version no longer available; download the full bundle")
+            old_manifest = dict(old["manifest"])
+        changed = [(k, item) for k, item in sorted(bundle["items"].items()) if old_manifest.get(k) != bundle["manifest"][k]]
+        removed = [k for k in old_manifest if k not in bundle["manifest"]]
+        entry = catalog_cache.put(key, bundle["version"], {
+            "version": bundle["version"],
+            "since": since,
+            **split_bundle_items(changed),
+            "deleted": {
+                "resources": sorted(k.split(":", 1)[1] for k in removed if k.startswith("resource:")),
+                "events": sorted(k.split(":", 1)[1] for k in removed if k.startswith("event:"))
+            }
+        })
+    return CatalogCache.respond(entry, request)
+
 # ==================== VAULT ====================
 
 @api_router.get("/vault/documents")
@@ -2077,12 +4961,15 @@ async def get_vault_document(doc_id: str, current_user: User = Depends(get_curre
 # ==================== LEGAL FORMS ====================
 
 @api_router.get("/legal/forms", response_model=List[LegalForm])
-async def get_legal_forms():
-    forms = await db.legal_forms.find({}, {"_id": 0}).to_list(1000)
-    for form in forms:
-        if isinstance(form.get('created_at'), str):
-            form['created_at'] = datetime.fromisoformat(form['created_at'])
-    return forms
+async def get_legal_forms(request: Request):
+    async def build():
+        forms = await db.legal_forms.find({}, {"_id": 0}).to_list(1000)
+        for form in forms:
+            if isinstance(form.get('created_at'), str):
+                form['created_at'] = datetime.fromisoformat(form['created_at'])
+        return [LegalForm(**form).model_dump(mode="json") for form in forms]
+    
+    return await serve_catalog(request, "legal_forms", "all", build)
 
 @api_router.get("/caseworker/client/{client_id}/progress")
 async def get_client_progress(client_id: str, current_user: User = Depends(get_current_user)):
@@ -2214,7 +5101,7 @@ async def get_unified_client_list(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=403, detail="Only agency staff can access unified client list")
     
     # Get all users (clients)
-    users = await db.users.find({"role": "user"}, {"_id": 0, "password_hash": 0}).to_list(10000)
+    users = await db.users.find({"role": "user"}, {"_id": 0, "password_hash": 0, "last_location": 0, "location_updated_at": 0}).to_list(10000)
     
     unified_clients = []
     for user_data in users:
@@ -2277,7 +5164,10 @@ async def get_client_complete_history(client_id: str, current_user: User = Depen
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Get client basic info
-    client = await db.users.find_one({"id": client_id, "role": "user"}, {"_id": 0, "password_hash": 0})
+    client = await db.users.find_one(
+        {"id": client_id, "role": "user"},
+        {"_id": 0, "password_hash": 0, "last_location": 0, "location_updated_at": 0}
+    )
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -2400,7 +5290,7 @@ async def get_clients(current_user: User = Depends(get_current_user)):
     if current_user.role != "caseworker":
         raise HTTPException(status_code=403, detail="Only caseworkers can access this")
     
-    clients = await db.users.find({"role": "user"}, {"_id": 0, "password_hash": 0}).to_list(1000)
+    clients = await db.users.find({"role": "user"}, {"_id": 0, "password_hash": 0, "last_location": 0, "location_updated_at": 0}).to_list(1000)
     return clients
 
 @api_router.get("/caseworker/client/{client_id}/progress")
@@ -2430,123 +5320,45 @@ async def get_client_progress(client_id: str, current_user: User = Depends(get_c
 
 # ==================== SEED DATA ====================
 
+SEED_LEGAL_FORMS = [
+    {
+        "id": "fee-waiver",
+        "title": "Fee Waiver Application",
+        "category": "court",
+        "description": "Application to waive court fees if you cannot afford them",
+        "instructions": "Complete all sections. Provide proof of income or public benefits. File at the court clerk's office."
+    },
+    {
+        "id": "eviction-answer",
+        "title": "Eviction Answer Form",
+        "category": "housing",
+        "description": "Response to an eviction notice or summons",
+        "instructions": "File within 5 days of receiving eviction notice. List all defenses. Attach evidence."
+    },
+    {
+        "id": "restraining-order",
+        "title": "Restraining Order Application",
+        "category": "safety",
+        "description": "Petition for protection from domestic violence or stalking",
+        "instructions": "Detail all incidents with dates. Can file 24/7 at Family Court. Free process."
+    },
+    {
+        "id": "name-change",
+        "title": "Name Change Petition",
+        "category": "personal",
+        "description": "Legal petition to change your name",
+        "instructions": "Must publish notice in newspaper. Background check required. File in District Court."
+    }
+]
+
 @api_router.post("/admin/seed-data")
 async def seed_initial_data():
     """Seed Las Vegas resources and legal forms"""
     
-    # Check if already seeded
-    existing = await db.resources.count_documents({})
-    if existing > 0:
-        return {"message": "Data already seeded"}
-    
-    # Las Vegas Resources
-    resources = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "HELP of Southern Nevada",
-            "category": "shelter",
-            "address": "1640 E Flamingo Rd, Las Vegas, NV 89119",
-            "phone": "(702) 369-4357",
-            "coordinates": {"lat": 36.1147, "lng": -115.1260},
-            "hours": "24/7",
-            "services": ["Emergency shelter", "Case management", "Job training"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "The Shade Tree",
-            "category": "shelter",
-            "address": "1 W Owens Ave, Las Vegas, NV 89030",
-            "phone": "(702) 385-0072",
-            "coordinates": {"lat": 36.1887, "lng": -115.1432},
-            "hours": "24/7",
-            "services": ["Women and children shelter", "Medical care", "Childcare"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Three Square Food Bank",
-            "category": "food",
-            "address": "4190 N Pecos Rd, Las Vegas, NV 89115",
-            "phone": "(702) 644-3663",
-            "coordinates": {"lat": 36.2203, "lng": -115.1181},
-            "hours": "Mon-Fri 8am-5pm",
-            "services": ["Food distribution", "Mobile pantries"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "VA Southern Nevada Healthcare",
-            "category": "medical",
-            "address": "6900 N Pecos Rd, North Las Vegas, NV 89086",
-            "phone": "(702) 791-9000",
-            "coordinates": {"lat": 36.2824, "lng": -115.1181},
-            "hours": "Mon-Fri 7:30am-4pm",
-            "services": ["Veterans healthcare", "Mental health", "Housing assistance"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Catholic Charities of Southern Nevada",
-            "category": "housing",
-            "address": "1501 Las Vegas Blvd N, Las Vegas, NV 89101",
-            "phone": "(702) 385-2662",
-            "coordinates": {"lat": 36.1810, "lng": -115.1372},
-            "hours": "Mon-Fri 8am-4:30pm",
-            "services": ["Housing assistance", "Immigration services", "Food pantry"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Legal Aid Center of Southern Nevada",
-            "category": "legal",
-            "address": "725 E Charleston Blvd, Las Vegas, NV 89104",
-            "phone": "(702) 386-1070",
-            "coordinates": {"lat": 36.1599, "lng": -115.1347},
-            "hours": "Mon-Fri 8:30am-5pm",
-            "services": ["Free legal aid", "Eviction defense", "Family law"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-    ]
-    
-    # Legal Forms
-    legal_forms = [
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Fee Waiver Application",
-            "category": "court",
-            "description": "Application to waive court fees if you cannot afford them",
-            "instructions": "Complete all sections. Provide proof of income or public benefits. File at the court clerk's office.",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Eviction Answer Form",
-            "category": "housing",
-            "description": "Response to an eviction notice or summons",
-            "instructions": "File within 5 days of receiving eviction notice. List all defenses. Attach evidence.",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Restraining Order Application",
-            "category": "safety",
-            "description": "Petition for protection from domestic violence or stalking",
-            "instructions": "Detail all incidents with dates. Can file 24/7 at Family Court. Free process.",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "title": "Name Change Petition",
-            "category": "personal",
-            "description": "Legal petition to change your name",
-            "instructions": "Must publish notice in newspaper. Background check required. File in District Court.",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-    ]
-    
-    await db.resources.insert_many(resources)
-    await db.legal_forms.insert_many(legal_forms)
+    resource_counts = await seed_directory_resources()
+    form_counts = await upsert_seed_records(db.legal_forms, SEED_LEGAL_FORMS)
+    if form_counts["inserted"] or form_counts["updated"]:
+        await bump_catalog_version("legal_forms")
     
     # Create sample flashcards (will be assigned to users when they register)
     sample_flashcards = [
@@ -2564,8 +5376,8 @@ async def seed_initial_data():
     
     return {
         "message": "Data seeded successfully",
-        "resources": len(resources),
-        "forms": len(legal_forms),
+        "resources": resource_counts,
+        "forms": form_counts,
         "sample_flashcards": len(sample_flashcards)
     }
 
@@ -2587,6 +5399,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def ensure_indexes():
+    await migrate_resource_locations()
+    await db.resources.create_index([("location", "2dsphere")])
+    await db.resource_availability.create_index([("resource_id", 1)], unique=True)
+    await db.resource_availability.create_index([("updated_at", 1)])
+    await db.directory_bundle_versions.create_index([("version", 1)], unique=True)
+    for collection_name, records, match_field in (
+        ("resources", ALL_RESOURCES, "name"), ("legal_forms", SEED_LEGAL_FORMS, "title")
+    ):
+        adopted = await adopt_legacy_records(db[collection_name], records, match_field)
+        if adopted:
+            logging.info(f"Mapped {adopted} legacy {collection_name} rows onto seed ids")
+            await bump_catalog_version(collection_name)
+        removed = await ensure_unique_ids(db[collection_name])
+        if removed:
+            logging.warning(f"Removed {removed} duplicate {collection_name} documents")
+            await bump_catalog_version(collection_name)
+    await migrate_popup_event_times()
+    await db.popup_events.create_index([("end_at", 1), ("start_at", 1)])
+    await migrate_sweep_schedules()
+    await db.cleanup_sweeps.create_index([("scheduled_at", 1), ("id", 1)])
+    await db.cleanup_sweeps.create_index([("organization", 1), ("scheduled_at", 1), ("id", 1)])
+    await db.cleanup_sweeps.create_index([("position", "2dsphere"), ("scheduled_at", 1)])
+    await db.notifications.create_index([("user_id", 1), ("created_at", -1)])
+    await db.notifications.create_index([("user_id", 1), ("updated_at", -1)])
+    await db.notification_tombstones.create_index([("user_id", 1), ("deleted_at", 1)])
+    await db.notification_tombstones.create_index([("expire_at", 1)], expireAfterSeconds=0)
+    await db.notification_receipts.create_index([("user_id", 1), ("updated_at", 1)])
+    await db.broadcast_notifications.create_index([("audience_roles", 1), ("created_at", -1)])
+    await db.notification_receipts.create_index([("user_id", 1), ("notification_id", 1)], unique=True)
+    await db.notification_cursors.create_index([("user_id", 1)], unique=True)
+    await db.notification_counters.create_index([("user_id", 1)], unique=True)
+    await migrate_broadcast_counters()
+    await db.broadcast_counters.create_index([("audience", 1)], unique=True)
+    await db.users.create_index([("last_location", "2dsphere")])
+    await db.notifications.create_index([("expires_at", 1)])
+    await db.notification_outbox.create_index([("dedupe_key", 1)], unique=True)
+    await db.notification_outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+    await db.broadcast_notifications.create_index([("id", 1)], unique=True)
+    await db.scheduled_reminders.create_index([("dedupe_key", 1)], unique=True)
+    await db.scheduled_reminders.create_index([("status", 1), ("next_at", 1)])
+    await db.scheduled_reminders.create_index([("kind", 1), ("source_id", 1)])
+    await db.notifications.create_index([("metadata.sweep_id", 1)], sparse=True)
+    await db.broadcast_notifications.create_index([("expires_at", 1)])
+    await db.notifications_archive.create_index([("user_ids", 1)])
+    await db.workbooks.create_index([("user_id", 1)])
+    await db.workbook_bodies.create_index([("hash", 1)], unique=True)
+
+@app.on_event("startup")
+async def start_background_workers():
+    if WORKBOOK_PREGEN_ENABLED:
+        app.state.workbook_pregen_task = asyncio.create_task(workbook_pregen_loop())
+    if NOTIFICATION_COUNTER_REPAIR_HOURS > 0:
+        app.state.notification_counter_repair_task = asyncio.create_task(notification_counter_repair_loop())
+    if NOTIFICATION_ARCHIVE_HOURS > 0:
+        app.state.notification_archive_task = asyncio.create_task(notification_archive_loop())
+    app.state.notification_outbox_task = asyncio.create_task(notification_outbox_loop())
+    app.state.directory_watch_task = asyncio.create_task(directory_watch_loop())
+    app.state.availability_sync_task = asyncio.create_task(availability_sync_loop())
+    app.state.reminder_scheduler_task = asyncio.create_task(reminder_scheduler_loop())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for name in ("workbook_pregen_task", "notification_counter_repair_task", "notification_archive_task",
+                 "notification_outbox_task", "directory_watch_task", "availability_sync_task",
+                 "reminder_scheduler_task"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
     client.close()
\ No newline at end of file
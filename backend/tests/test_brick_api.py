@@ -6,6 +6,7 @@ import pytest
 import requests
 import os
 import uuid
+import datetime
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -246,6 +247,48 @@ class TestCleanupSweeps:
         assert latest_notif["notification_type"] == "sweep_alert"
         assert "Cleanup" in latest_notif["title"] or "cleanup" in latest_notif["title"].lower() or "Sweep" in latest_notif["title"]
         print(f"✓ Sweep notification created for user: {latest_notif['title']}")
+    
+    def test_undated_sweep_is_listed(self, cleanup_token):
+        """A sweep posted without a date is accepted and listed with past sweeps"""
+        response = requests.post(f"{BASE_URL}/api/cleanup/sweeps", json={
+            "location": "TEST_Undated sweep", "description": "No date given"
+        }, headers={"Authorization": f"Bearer {cleanup_token}"})
+        assert response.status_code == 200, f"Post sweep failed: {response.text}"
+        sweep_id = response.json()["sweep_id"]
+        
+        response = requests.get(f"{BASE_URL}/api/cleanup/sweeps",
+                                headers={"Authorization": f"Bearer {cleanup_token}"})
+        assert sweep_id in [sweep["id"] for sweep in response.json()]
+        print("✓ Undated sweep accepted and listed")
+    
+    def test_sweep_calendar_pages_with_cursor(self, cleanup_token):
+        """Calendar pages follow next_cursor without gaps or repeats"""
+        day = (datetime.date(2031, 1, 1) + datetime.timedelta(days=uuid.uuid4().int % 3000)).isoformat()
+        posted = set()
+        for hour in ("08:00", "09:00", "10:00"):
+            response = requests.post(f"{BASE_URL}/api/cleanup/sweeps", json={
+                "location": f"TEST_Calendar {hour}", "date": day, "time": hour, "description": "Calendar test"
+            }, headers={"Authorization": f"Bearer {cleanup_token}"})
+            assert response.status_code == 200
+            posted.add(response.json()["sweep_id"])
+        
+        seen, cursor = [], None
+        while True:
+            params = {"start": day, "end": f"{day}T23:59", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/api/sweeps/calendar", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            seen += page["sweeps"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        ids = [sweep["id"] for sweep in seen]
+        assert len(ids) == len(set(ids))
+        assert posted <= set(ids)
+        assert [s["scheduled_at"] for s in seen] == sorted(s["scheduled_at"] for s in seen)
+        print(f"✓ Sweep calendar paged {len(ids)} sweeps on {day}")
 
 
 class TestVault:
@@ -312,6 +355,94 @@ class TestResources:
             assert resource["category"] == "shelter"
         print(f"✓ Resource filtering working: {len(data)} shelters")
 
+    def test_get_nearby_resources(self, user_token):
+        """Test nearest-resource search from downtown Las Vegas"""
+        response = requests.get(f"{BASE_URL}/api/resources/nearby?lat=36.1699&lng=-115.1398&limit=5",
+                               headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 200
+        data = response.json()
+        distances = [r["distance_meters"] for r in data["resources"]]
+        assert len(distances) <= 5
+        assert distances == sorted(distances)
+        print(f"✓ Nearby resources working: {len(distances)} within {distances[-1] if distances else 0}m")
+
+    def test_seed_resources_twice_is_unchanged(self):
+        """Re-running the resource seed writes nothing new"""
+        requests.post(f"{BASE_URL}/api/admin/seed-resources")
+        response = requests.post(f"{BASE_URL}/api/admin/seed-resources")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["inserted"] == 0
+        assert data["updated"] == 0
+        assert data["unchanged"] == data["count"] > 0
+        print(f"✓ Resource seed idempotent: {data['unchanged']} unchanged")
+
+    def test_directory_bundle_delta(self):
+        """Delta from the current version is empty; an unknown old version is 410"""
+        bundle = requests.get(f"{BASE_URL}/api/directory/bundle").json()
+        response = requests.get(f"{BASE_URL}/api/directory/bundle/delta", params={"since": bundle["version"]})
+        assert response.status_code == 200
+        assert response.json()["resources"] == []
+        response = requests.get(f"{BASE_URL}/api/directory/bundle/delta", params={"since": 0})
+        assert response.status_code == 410
+        print(f"✓ Directory bundle delta working at version {bundle['version']}")
+
+    def test_map_viewport_rejects_bad_bbox_and_zoom(self):
+        """Non-finite or out-of-range viewport values are a 400, not a 500"""
+        for params in ({"bbox": "nan,35,-114,37", "zoom": 12}, {"bbox": "-116,35,-114,95", "zoom": 12},
+                       {"bbox": "-116,35,-114,37", "zoom": "nan"}, {"bbox": "-116,35,-114,37", "zoom": "inf"}):
+            response = requests.get(f"{BASE_URL}/api/map/viewport", params=params)
+            assert response.status_code == 400, f"{params} gave {response.status_code}"
+        response = requests.get(f"{BASE_URL}/api/map/viewport", params={"bbox": "-500,-80,500,80", "zoom": 40})
+        assert response.status_code == 200
+        print("✓ Map viewport validates bbox and zoom")
+
+
+class TestPopupEvents:
+    """Test pop-up event time-window queries"""
+    
+    @pytest.fixture
+    def agency_token(self):
+        """Get agency staff token"""
+        creds = TEST_CREDENTIALS["agency_help"]
+        res = requests.post(f"{BASE_URL}/api/auth/login", json=creds)
+        return res.json()["access_token"]
+    
+    @pytest.fixture
+    def running_event(self, agency_token):
+        """An event running now in downtown Las Vegas, deleted afterwards"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        response = requests.post(f"{BASE_URL}/api/events/popup", json={
+            "title": "TEST_Mobile clinic", "description": "Test event", "event_type": "mobile_clinic",
+            "organization": "HELP", "location": "Downtown", "coordinates": {"lat": 36.1699, "lng": -115.1398},
+            "start_time": (now - datetime.timedelta(hours=1)).isoformat(),
+            "end_time": (now + datetime.timedelta(hours=1)).isoformat(), "services": ["medical"]
+        }, headers={"Authorization": f"Bearer {agency_token}"})
+        assert response.status_code == 200, f"Create event failed: {response.text}"
+        event = response.json()
+        yield event
+        requests.delete(f"{BASE_URL}/api/events/popup/{event['id']}",
+                        headers={"Authorization": f"Bearer {agency_token}"})
+    
+    def test_events_happening_now_near_me(self, running_event):
+        """Running event is found near its location with a distance"""
+        response = requests.get(f"{BASE_URL}/api/events/popup/now",
+                                params={"lat": 36.17, "lng": -115.14, "radius_meters": 2000})
+        assert response.status_code == 200
+        data = response.json()
+        match = [e for e in data["events"] if e["id"] == running_event["id"]]
+        assert match and match[0]["distance_meters"] < 2000
+        print(f"✓ Events happening now: {data['total']} nearby")
+    
+    def test_upcoming_events(self, running_event):
+        """Upcoming window includes running events and rejects windows over a week"""
+        response = requests.get(f"{BASE_URL}/api/events/popup/upcoming", params={"hours": 6, "limit": 200})
+        assert response.status_code == 200
+        assert running_event["id"] in [e["id"] for e in response.json()["events"]]
+        response = requests.get(f"{BASE_URL}/api/events/popup/upcoming", params={"hours": 500})
+        assert response.status_code == 400
+        print("✓ Upcoming events window working")
+
 
 class TestAgencyDashboard:
     """Test agency dashboard functionality"""
@@ -333,6 +464,27 @@ class TestAgencyDashboard:
         assert "total_clients" in data
         print(f"✓ Unified clients endpoint working: {data['total_clients']} clients")
     
+    def test_client_history_hides_location(self, agency_token):
+        """Client history must not expose a client's last-known location"""
+        creds = TEST_CREDENTIALS["regular_user"]
+        login = requests.post(f"{BASE_URL}/api/auth/login", json=creds).json()
+        requests.put(f"{BASE_URL}/api/auth/me/location", json={"latitude": 36.17, "longitude": -115.14},
+                     headers={"Authorization": f"Bearer {login['access_token']}"})
+        response = requests.get(f"{BASE_URL}/api/agency/client/{login['user']['id']}/complete-history",
+                               headers={"Authorization": f"Bearer {agency_token}"})
+        assert response.status_code == 200
+        client = response.json()["client"]
+        assert "last_location" not in client
+        assert "location_updated_at" not in client
+        
+        response = requests.get(f"{BASE_URL}/api/agency/clients/unified",
+                               headers={"Authorization": f"Bearer {agency_token}"})
+        assert response.status_code == 200
+        for entry in response.json()["clients"]:
+            assert "last_location" not in entry["client_info"]
+            assert "location_updated_at" not in entry["client_info"]
+        print("✓ Client history and unified list omit last-known location")
+    
     def test_get_hud_report(self, agency_token):
         """Test getting HUD report"""
         response = requests.get(f"{BASE_URL}/api/caseworker/hud-report",
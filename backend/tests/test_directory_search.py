@@ -0,0 +1,18 @@
+"""Unit tests for directory full-text search"""
+from directory_search import DirectorySearchIndex
+from seed_resources import ALL_RESOURCES
+
+
+def test_category_name_matches_every_resource_in_it():
+    medical = {r["id"] for r in ALL_RESOURCES if r.get("category") == "medical"}
+    result = DirectorySearchIndex(ALL_RESOURCES).search("medical", limit=50)
+    assert medical <= {r["id"] for r in result["results"]}
+
+
+def test_category_hit_ranks_below_name_hit():
+    resources = [
+        {"id": "a", "name": "Downtown Clinic", "category": "medical"},
+        {"id": "b", "name": "Medical Outreach Van", "category": "outreach"},
+    ]
+    result = DirectorySearchIndex(resources).search("medical")
+    assert [r["id"] for r in result["results"]] == ["b", "a"]
@@ -0,0 +1,53 @@
+"""Unit tests for the pop-up event interval index"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from event_index import EventIntervalIndex
+
+
+def brute_force(intervals, start, end):
+    return sorted((i for i in intervals if i[0] < end and i[1] > start), key=lambda i: i[0])
+
+
+def test_matches_brute_force_on_random_windows():
+    rng = random.Random(7)
+    intervals = []
+    for n in range(500):
+        start = rng.randrange(0, 10_000)
+        intervals.append((start, start + rng.randrange(1, 600), n))
+    index = EventIntervalIndex(intervals)
+    assert index.size == 500
+    for _ in range(200):
+        start = rng.randrange(-500, 10_500)
+        end = start + rng.randrange(1, 2_000)
+        expected = brute_force(intervals, start, end)
+        found = index.overlapping(start, end)
+        assert sorted(found) == sorted(n for _, _, n in expected)
+        assert [intervals[n][0] for n in found] == [i[0] for i in expected]
+
+
+def test_windows_are_half_open():
+    index = EventIntervalIndex([(10, 20, "a")])
+    assert index.overlapping(20, 30) == []
+    assert index.overlapping(0, 10) == []
+    assert index.overlapping(19, 21) == ["a"]
+
+
+def test_identical_starts_do_not_recurse_forever():
+    index = EventIntervalIndex([(5, 5 + n, n) for n in range(1, 2_000)])
+    assert len(index.overlapping(0, 6)) == 1_999
+
+
+def test_accepts_datetimes_and_drops_empty_windows():
+    now = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+    index = EventIntervalIndex([
+        (now, now + timedelta(hours=2), "clinic"),
+        (now, now, "empty"),
+    ], version=3)
+    assert index.version == 3
+    assert index.size == 1
+    assert index.overlapping(now + timedelta(hours=1), now + timedelta(hours=5)) == ["clinic"]
+
+
+def test_empty_index():
+    assert EventIntervalIndex([]).overlapping(0, 100) == []
@@ -0,0 +1,102 @@
+"""Unit tests for free-text opening hours"""
+import pytest
+
+from hours import MINUTES_PER_DAY, MINUTES_PER_WEEK, HoursIndex, parse_hours
+
+MON, SAT, SUN = 0, 5, 6
+
+
+def at(day, hour, minute=0):
+    return day * MINUTES_PER_DAY + hour * 60 + minute
+
+
+def test_always_open():
+    assert parse_hours("24/7") == {"intervals": [[0, MINUTES_PER_WEEK]], "unparsed": []}
+
+
+def test_weekday_range_with_inferred_meridiem():
+    parsed = parse_hours("Mon-Fri: 9-5pm")
+    assert parsed["intervals"][0] == [at(MON, 9), at(MON, 17)]
+    assert len(parsed["intervals"]) == 5
+
+
+def test_overnight_wraps_into_monday():
+    parsed = parse_hours("Sun 10pm-2am")
+    assert parsed["intervals"] == [[0, at(MON, 2)], [at(SUN, 22), MINUTES_PER_WEEK]]
+
+
+def test_unreadable_segment_is_reported():
+    assert parse_hours("Check website for schedule") == {"intervals": [], "unparsed": ["Check website for schedule"]}
+
+
+def test_phone_line_does_not_open_the_site():
+    parsed = parse_hours("24/7 Crisis Line | Drop-In: Mon-Fri 9am-5pm")
+    index = HoursIndex([{"id": "r", "category": "medical", "hours": "24/7 Crisis Line | Drop-In: Mon-Fri 9am-5pm"}])
+    assert parsed["unparsed"] == []
+    assert index.is_open("r", at(SUN, 3)) is False
+    assert index.is_open("r", at(MON, 10)) is True
+
+
+@pytest.mark.parametrize("hours", ["24/7 Hotline", "Crisis Line: 24/7"])
+def test_phone_line_alone_is_left_for_staff(hours):
+    assert parse_hours(hours) == {"intervals": [], "unparsed": [hours]}
+
+
+def test_site_hours_labelled_24_7_still_count():
+    assert parse_hours("Shelter: 24/7 | Office: 9am-3pm")["intervals"] == [[0, MINUTES_PER_WEEK]]
+
+
+def test_unknown_hours_are_not_closed():
+    index = HoursIndex([{"id": "r", "category": "legal", "hours": "Check website"}, {"id": "s", "category": "legal"}])
+    assert index.is_open("r", at(MON, 10)) is None
+    assert index.is_open("s", at(MON, 10)) is None
+    assert index.open_at(at(MON, 10)) == []
+
+
+def test_open_at_and_closes_in():
+    index = HoursIndex([
+        {"id": "a", "category": "food", "hours": "Daily 8am-10am"},
+        {"id": "b", "category": "shelter", "hours": "24/7"},
+    ])
+    assert sorted(index.open_at(at(SAT, 9))) == ["a", "b"]
+    assert index.open_at(at(SAT, 9), "food") == ["a"]
+    assert index.closes_in("a", at(SAT, 9)) == 60
+    assert index.closes_in("b", at(SAT, 9)) is None
+
+
+def test_open_during_window():
+    index = HoursIndex([
+        {"id": "a", "category": "shelter", "hours": "Daily 7pm-7am"},
+        {"id": "b", "category": "shelter", "hours": "Sun 10pm-2am"},
+        {"id": "c", "category": "shelter"},
+    ])
+    assert index.open_during("a", at(MON, 16), at(MON, 20)) is True    # opens mid-window
+    assert index.open_during("a", at(MON, 8), at(MON, 12)) is False
+    assert index.open_during("a", at(MON, 6), at(MON, 10)) is True     # closes mid-window
+    assert index.open_during("b", at(SUN, 20), at(SUN, 20) + 240) is True
+    assert index.open_during("b", at(SUN, 23) + 60, at(SUN, 23) + 120) is True  # past Sunday midnight
+    assert index.open_during("b", at(MON, 2), at(MON, 6)) is False
+    assert index.open_during("c", at(MON, 8), at(MON, 12)) is None
+
+
+@pytest.mark.parametrize("hours, start, end", [
+    ("Mon 9-5", at(MON, 9), at(MON, 17)),
+    ("Mon 8-4:30", at(MON, 8), at(MON, 16, 30)),
+    ("Mon 9am-5", at(MON, 9), at(MON, 17)),
+])
+def test_bare_end_before_start_closes_in_the_afternoon(hours, start, end):
+    assert parse_hours(hours)["intervals"] == [[start, end]]
+
+
+def test_weekday_bare_range_is_not_overnight():
+    index = HoursIndex([{"id": "r", "category": "legal", "hours": "Mon-Fri 9-5"}])
+    assert index.is_open("r", at(MON, 16)) is True
+    assert index.is_open("r", at(MON, 23)) is False
+
+
+@pytest.mark.parametrize("hours, start, end", [
+    ("Mon 22-6", at(MON, 22), at(MON, 30)),
+    ("Mon 9pm-5", at(MON, 21), at(MON, 29)),
+])
+def test_evening_start_still_runs_overnight(hours, start, end):
+    assert parse_hours(hours)["intervals"] == [[start, end]]
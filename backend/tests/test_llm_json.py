@@ -0,0 +1,68 @@
+"""Unit tests for tolerant LLM JSON parsing"""
+import json
+
+import pytest
+
+from llm_json import IncrementalJSONParser, extract_json, repair_json
+
+WORKBOOK = '{"lessons":[{"id":"l1","title":"Budget","content":"Try the “50/30/20” rule"}]}'
+
+
+def test_valid_json_with_smart_quotes_in_values():
+    assert extract_json(WORKBOOK) == json.loads(WORKBOOK)
+
+
+def test_fenced_payload_with_prose():
+    text = 'Here is your plan:\n```json\n{"steps": ["a", "b"]}\n```\nGood luck!'
+    assert extract_json(text) == {"steps": ["a", "b"]}
+
+
+def test_trailing_commas_and_comments():
+    text = '{"a": [1, 2,], // note\n "b": {"c": 3,},}'
+    assert extract_json(text) == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_smart_quote_delimiters():
+    assert extract_json('{“title”: “Budget”, “tags”: [“money”]}') == {"title": "Budget", "tags": ["money"]}
+
+
+def test_plain_quote_inside_smart_quoted_value():
+    assert extract_json('{“quote”: “say "hi" first”}') == {"quote": 'say "hi" first'}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"lessons":[{"id":"y","ti', {"lessons": [{"id": "y"}]}),  # Inside a key
+    ('{"lessons":[{"id":"y","title"', {"lessons": [{"id": "y"}]}),  # After a bare key
+    ('{"lessons":[{"id":"y","title":', {"lessons": [{"id": "y"}]}),  # After the colon
+    ('{"lessons":[{"id":"y","title": ', {"lessons": [{"id": "y"}]}),
+    ('{"lessons":[{"id":"y","title":"Bud', {"lessons": [{"id": "y", "title": "Bud"}]}),  # Inside a value
+    ('{"lessons":[{"id":"y","title":"a\\', {"lessons": [{"id": "y", "title": "a"}]}),  # Mid escape
+    ('{"lessons":[{"id":"y",', {"lessons": [{"id": "y"}]}),  # After a comma
+    ('{"lessons":[{"id":"y"},', {"lessons": [{"id": "y"}]}),
+    ('{"lessons":[', {"lessons": []}),
+    ('{"done": tr', {"done": True}),  # Inside a literal
+    ('{"items": ["a", "b', {"items": ["a", "b"]}),  # Inside an array string
+])
+def test_truncation_points(text, expected):
+    assert json.loads(repair_json(text)) == expected
+    assert extract_json(text) == expected
+
+
+def test_unrecoverable_payload():
+    with pytest.raises(ValueError):
+        extract_json("no json here")
+
+
+def test_incremental_parser_keeps_smart_quotes_in_values():
+    parser = IncrementalJSONParser(("lessons",))
+    items = []
+    for i in range(0, len(WORKBOOK), 7):
+        items += parser.feed(WORKBOOK[i:i + 7])
+    assert items == [("lessons", json.loads(WORKBOOK)["lessons"][0])]
+    assert parser.result() == json.loads(WORKBOOK)
+
+
+def test_incremental_parser_smart_quote_delimiters():
+    parser = IncrementalJSONParser(("steps",))
+    items = parser.feed('{“steps”: [“one”, {“id”: “two”}]}')
+    assert items == [("steps", "one"), ("steps", {"id": "two"})]
@@ -0,0 +1,36 @@
+"""Unit tests for reminder stage times"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from reminders import reminder_stages
+
+ZONE = "America/Los_Angeles"
+
+
+def local(hour, minute=0):
+    return datetime(2026, 11, 10, hour, minute, tzinfo=ZoneInfo(ZONE))
+
+
+def stages(starts_at, advance_notice_days=None):
+    return dict(reminder_stages(starts_at, ZONE, advance_notice_days))
+
+
+def test_morning_of_at_seven_for_a_later_start():
+    due = stages(local(10))
+    assert due["morning_of"] == local(7).astimezone(timezone.utc)
+    assert due["day_before"] == local(10).astimezone(timezone.utc) - timedelta(days=1)
+
+
+@pytest.mark.parametrize("hour, minute", [(6, 0), (7, 0), (7, 30), (8, 0)])
+def test_early_start_still_gets_a_same_day_reminder(hour, minute):
+    starts_at = local(hour, minute)
+    due = stages(starts_at)["morning_of"]
+    assert due < starts_at
+    assert due > starts_at - timedelta(hours=3)
+
+
+def test_advance_notice_only_when_longer_than_a_day():
+    assert "advance_notice" not in stages(local(10), advance_notice_days=1)
+    assert stages(local(10), advance_notice_days=3)["advance_notice"] == local(10).astimezone(timezone.utc) - timedelta(days=3)
@@ -0,0 +1,59 @@
+"""Unit tests for idempotent seeding (run against mongomock when it is installed)"""
+import asyncio
+
+import pytest
+
+from seeding import adopt_legacy_records, ensure_unique_ids, upsert_seed_records
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+SEED = [
+    {"id": "shade-tree", "name": "The Shade Tree", "category": "shelter"},
+    {"id": "three-square", "name": "Three Square Food Bank", "category": "food"},
+]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def collection():
+    return mongomock_motor.AsyncMongoMockClient()["test"]["resources"]
+
+
+def test_reseeding_is_unchanged():
+    resources = collection()
+    assert run(upsert_seed_records(resources, SEED))["inserted"] == 2
+    assert run(upsert_seed_records(resources, SEED)) == {"inserted": 0, "updated": 0, "unchanged": 2}
+
+
+def test_seeding_over_legacy_rows_adds_no_copies():
+    async def scenario():
+        resources = collection()
+        await resources.insert_many([
+            {"id": "0b1c-legacy", "name": "The Shade Tree", "category": "shelter"},
+            {"id": "9f2e-legacy", "name": "The Shade Tree", "category": "shelter"},
+            {"id": "staff-entry", "name": "Neighborhood Pantry", "category": "food"},
+        ])
+        adopted = await adopt_legacy_records(resources, SEED, "name")
+        await ensure_unique_ids(resources)
+        counts = await upsert_seed_records(resources, SEED)
+        await upsert_seed_records(resources, SEED)
+        docs = await resources.find({}, {"_id": 0, "id": 1}).to_list(None)
+        return adopted, counts, sorted(doc["id"] for doc in docs)
+
+    adopted, counts, ids = run(scenario())
+    assert adopted == 2
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 0}
+    assert ids == ["shade-tree", "staff-entry", "three-square"]
+
+
+def test_legacy_copy_of_an_already_seeded_row_is_removed():
+    async def scenario():
+        resources = collection()
+        await upsert_seed_records(resources, SEED)
+        await resources.insert_one({"id": "legacy", "name": "Three Square Food Bank"})
+        await adopt_legacy_records(resources, SEED, "name")
+        return await resources.count_documents({})
+
+    assert run(scenario()) == 2
@@ -0,0 +1,51 @@
+"""Unit tests for the GTFS transit index"""
+import zipfile
+
+from transit import TransitRouter, build_index
+
+STOPS = "stop_id,stop_name,stop_lat,stop_lon\nA,A,36.1700,-115.1400\nB,B,36.1700,-115.1000\n"
+ROUTES = "route_id,route_short_name,route_long_name,route_type\nR1,113,Main,3\n"
+CALENDAR = (
+    "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+    "WKDY,1,1,1,1,1,0,0,20260101,20261231\n"
+    "SAT,0,0,0,0,0,1,0,20260101,20261231\n"
+)
+TRIPS = "route_id,service_id,trip_id\nR1,WKDY,t1\nR1,WKDY,t2\nR1,SAT,t3\n"
+STOP_TIMES = (
+    "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+    "t1,08:00:00,08:00:00,A,1\nt1,08:10:00,08:10:00,B,2\n"
+    "t2,09:00:00,09:00:00,A,1\nt2,09:10:00,09:10:00,B,2\n"
+    "t3,08:30:00,08:30:00,A,1\nt3,08:40:00,08:40:00,B,2\n"
+)
+
+
+def write_feed(directory, **extra):
+    files = {"stops.txt": STOPS, "routes.txt": ROUTES, "calendar.txt": CALENDAR,
+             "trips.txt": TRIPS, "stop_times.txt": STOP_TIMES, **extra}
+    path = directory / "feed.zip"
+    with zipfile.ZipFile(path, "w") as feed:
+        for name, content in files.items():
+            feed.writestr(name, content)
+    return str(path)
+
+
+def test_headway_uses_one_weekday(tmp_path):
+    index = build_index(write_feed(tmp_path))
+    assert index["service_date"] == "2026-01-01"
+    [pattern] = index["patterns"]
+    assert pattern["headway"] == 3600
+    assert pattern["times"] == [600]
+
+
+def test_holiday_exception_moves_the_representative_day(tmp_path):
+    dates = "service_id,date,exception_type\nWKDY,20260101,2\n"
+    index = build_index(write_feed(tmp_path, **{"calendar_dates.txt": dates}))
+    assert index["service_date"] == "2026-01-02"
+    assert index["patterns"][0]["headway"] == 3600
+
+
+def test_router_prefers_the_bus_over_a_long_walk(tmp_path):
+    router = TransitRouter(build_index(write_feed(tmp_path)))
+    [estimate] = router.travel_times(-115.1400, 36.1700, [("dest", -115.1000, 36.1700)]).values()
+    assert estimate["mode"] == "transit"
+    assert estimate["routes"] == ["113"]
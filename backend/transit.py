@@ -0,0 +1,275 @@
+# Transit travel-time estimates from a static GTFS feed
+# Straight-line distance says little about how long a trip takes by bus. The RTC GTFS
+# feed (a zip of CSV files) is reduced once to a compact index: stops, and for each
+# route pattern (a route's distinct stop sequence) its typical stop-to-stop ride times
+# and average headway. Headways come from the trips of one representative weekday
+# (resolved from calendar.txt and calendar_dates.txt), since pooling weekday and
+# weekend service would make buses look several times more frequent than they are.
+# Estimates assume you arrive at a stop at a random time, so boarding costs half a
+# headway. Everything runs from the local file; no network.
+
+import csv
+import gzip
+import heapq
+import io
+import json
+import math
+import os
+import statistics
+import zipfile
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from geo import haversine_meters
+
+INDEX_FORMAT = 2
+WALK_SPEED_MPS = 1.25
+WALK_DETOUR = 1.3  # Street grid vs straight line
+MAX_ACCESS_WALK_METERS = 1000  # To the first stop and from the last
+MAX_TRANSFER_WALK_METERS = 250
+MAX_TRIP_SECONDS = 3 * 3600
+DEFAULT_HEADWAY_SECONDS = 3600
+MIN_HEADWAY_SECONDS, MAX_HEADWAY_SECONDS = 300, 2 * 3600
+GRID_CELL_DEGREES = 0.01
+WEEKDAY_COLUMNS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def walk_seconds(meters: float) -> float:
+    return meters * WALK_DETOUR / WALK_SPEED_MPS
+
+
+def _gtfs_seconds(value: str):
+    """GTFS times may pass 24:00:00 for trips running after midnight"""
+    if not value:
+        return None
+    hours, minutes, seconds = (int(part) for part in value.strip().split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@contextmanager
+def _open_table(path: str, name: str):
+    """A csv.DictReader over one GTFS file from a zip or an unpacked directory; None if the feed lacks it"""
+    if os.path.isdir(path):
+        filename = os.path.join(path, name)
+        if not os.path.exists(filename):
+            yield None
+            return
+        with open(filename, newline="", encoding="utf-8-sig") as handle:
+            yield csv.DictReader(handle)
+        return
+    with zipfile.ZipFile(path) as feed:
+        members = {os.path.basename(member): member for member in feed.namelist()}
+        if name not in members:
+            yield None
+            return
+        with feed.open(members[name]) as handle:
+            yield csv.DictReader(io.TextIOWrapper(handle, encoding="utf-8-sig"))
+
+
+def _read_table(path: str, name: str) -> list:
+    """All rows of a small GTFS file; stop_times.txt is streamed instead"""
+    with _open_table(path, name) as rows:
+        return list(rows) if rows is not None else []
+
+
+def _gtfs_date(value: str) -> date:
+    return datetime.strptime(value.strip(), "%Y%m%d").date()
+
+
+def representative_services(trips, calendar, calendar_dates):
+    """Service ids running on the busiest weekday date the calendars describe.
+
+    Returns (date, service ids), or (None, None) when the feed has no calendars and
+    every trip is kept.
+    """
+    exceptions = defaultdict(list)
+    for row in calendar_dates:
+        exceptions[_gtfs_date(row["date"])].append((row["service_id"], row["exception_type"].strip()))
+
+    def running(day: date) -> set:
+        column = WEEKDAY_COLUMNS[day.weekday()]
+        services = {row["service_id"] for row in calendar
+                    if row.get(column, "").strip() == "1"
+                    and _gtfs_date(row["start_date"]) <= day <= _gtfs_date(row["end_date"])}
+        for service_id, exception_type in exceptions.get(day, ()):
+            if exception_type == "1":
+                services.add(service_id)
+            else:
+                services.discard(service_id)
+        return services
+
+    # Each calendar period's first weekday of each kind, plus every weekday with exceptions
+    candidates = {day for day in exceptions if day.weekday() < 5}
+    for row in calendar:
+        first, last = _gtfs_date(row["start_date"]), _gtfs_date(row["end_date"])
+        for offset in range(7):
+            day = first + timedelta(days=offset)
+            if day <= last and day.weekday() < 5:
+                candidates.add(day)
+    if not candidates:
+        return None, None
+    trip_counts = Counter(row.get("service_id") for row in trips)
+    best = max(sorted(candidates), key=lambda day: sum(trip_counts[s] for s in running(day)))
+    return best, running(best)
+
+
+def build_index(path: str) -> dict:
+    """Reduce a GTFS feed to {"stops": [[id, lat, lng]], "patterns": [...]}"""
+    stops = [[row["stop_id"], float(row["stop_lat"]), float(row["stop_lon"])]
+             for row in _read_table(path, "stops.txt") if row.get("stop_lat") and row.get("stop_lon")]
+    stop_index = {stop[0]: i for i, stop in enumerate(stops)}
+    route_names = {row["route_id"]: row.get("route_short_name") or row.get("route_long_name") or row["route_id"]
+                   for row in _read_table(path, "routes.txt")}
+    trip_rows = _read_table(path, "trips.txt")
+    service_date, services = representative_services(
+        trip_rows, _read_table(path, "calendar.txt"), _read_table(path, "calendar_dates.txt")
+    )
+    trip_routes = {row["trip_id"]: row["route_id"] for row in trip_rows
+                   if services is None or row.get("service_id") in services}
+
+    # About a million rows for RTC; read them one at a time and keep only that day's trips
+    trips = defaultdict(list)
+    with _open_table(path, "stop_times.txt") as stop_times:
+        for row in stop_times:
+            if row["stop_id"] in stop_index and row["trip_id"] in trip_routes:
+                trips[row["trip_id"]].append((
+                    int(row["stop_sequence"]), stop_index[row["stop_id"]],
+                    _gtfs_seconds(row.get("arrival_time")), _gtfs_seconds(row.get("departure_time"))
+                ))
+
+    # Group trips that serve the same stops in the same order
+    patterns = defaultdict(lambda: {"starts": [], "legs": None})
+    for trip_id, rows in trips.items():
+        rows.sort()
+        if len(rows) < 2 or rows[0][3] is None:
+            continue
+        key = (trip_routes[trip_id], tuple(row[1] for row in rows))
+        pattern = patterns[key]
+        pattern["starts"].append(rows[0][3])
+        if pattern["legs"] is None:
+            pattern["legs"] = [[] for _ in range(len(rows) - 1)]
+        for leg, (current, following) in enumerate(zip(rows, rows[1:])):
+            depart = current[3] if current[3] is not None else current[2]
+            arrive = following[2] if following[2] is not None else following[3]
+            if depart is not None and arrive is not None and arrive >= depart:
+                pattern["legs"][leg].append(arrive - depart)
+
+    compact = []
+    for (route_id, sequence), pattern in patterns.items():
+        starts = sorted(pattern["starts"])
+        if len(starts) > 1:
+            headway = (starts[-1] - starts[0]) / (len(starts) - 1)
+            headway = min(max(headway, MIN_HEADWAY_SECONDS), MAX_HEADWAY_SECONDS)
+        else:
+            headway = DEFAULT_HEADWAY_SECONDS
+        times = []
+        for samples in pattern["legs"]:
+            times.append(int(statistics.median(samples)) if samples else 60)  # Untimed stops: a minute
+        compact.append({"route": route_names.get(route_id, route_id), "headway": int(headway),
+                        "stops": list(sequence), "times": times})
+    return {"format": INDEX_FORMAT, "service_date": service_date.isoformat() if service_date else None,
+            "stops": stops, "patterns": compact}
+
+
+def load_index(feed_path: str, cache_path: str) -> dict:
+    """The compact index for a feed, rebuilt only when the feed file changes"""
+    stat = os.stat(feed_path)
+    source = {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+    if os.path.exists(cache_path):
+        try:
+            with gzip.open(cache_path, "rt", encoding="utf-8") as handle:
+                cached = json.load(handle)
+            if cached.get("format") == INDEX_FORMAT and cached.get("source") == source:
+                return cached
+        except (OSError, ValueError):
+            pass
+    index = build_index(feed_path)
+    index["source"] = source
+    try:
+        with gzip.open(cache_path, "wt", encoding="utf-8") as handle:
+            json.dump(index, handle, separators=(",", ":"))
+    except OSError:
+        pass  # Read-only deploy; rebuild next start
+    return index
+
+
+class TransitRouter:
+    """Earliest-arrival search over a compact GTFS index"""
+
+    def __init__(self, index: dict):
+        self.stops = index["stops"]
+        self.patterns = index["patterns"]
+        self.stop_patterns = defaultdict(list)  # stop -> [(pattern, position)]
+        for p, pattern in enumerate(self.patterns):
+            for position, stop in enumerate(pattern["stops"][:-1]):
+                self.stop_patterns[stop].append((p, position))
+        self.grid = defaultdict(list)
+        for i, (_, lat, lng) in enumerate(self.stops):
+            self.grid[self._cell(lng, lat)].append(i)
+        self.transfers = {}
+        for i, (_, lat, lng) in enumerate(self.stops):
+            self.transfers[i] = [(j, walk_seconds(d)) for j, d in self.stops_near(lng, lat, MAX_TRANSFER_WALK_METERS) if j != i]
+
+    @staticmethod
+    def _cell(lng: float, lat: float) -> tuple:
+        return (math.floor(lng / GRID_CELL_DEGREES), math.floor(lat / GRID_CELL_DEGREES))
+
+    def stops_near(self, lng: float, lat: float, meters: float):
+        """(stop, distance) pairs within `meters` of a point"""
+        reach = int(math.ceil(meters / (GRID_CELL_DEGREES * 111_320 * max(math.cos(math.radians(lat)), 0.01))))
+        cx, cy = self._cell(lng, lat)
+        found = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                for i in self.grid.get((x, y), ()):
+                    distance = haversine_meters(lng, lat, self.stops[i][2], self.stops[i][1])
+                    if distance <= meters:
+                        found.append((i, distance))
+        return found
+
+    def _search(self, lng: float, lat: float) -> dict:
+        """Seconds to reach each stop from a point, with the routes ridden"""
+        best = {}
+        heap = []
+        for stop, distance in self.stops_near(lng, lat, MAX_ACCESS_WALK_METERS):
+            heapq.heappush(heap, (walk_seconds(distance), stop, ()))
+        while heap:
+            seconds, stop, routes = heapq.heappop(heap)
+            if stop in best or seconds > MAX_TRIP_SECONDS:
+                continue
+            best[stop] = (seconds, routes)
+            for other, walk in self.transfers[stop]:
+                if other not in best:
+                    heapq.heappush(heap, (seconds + walk, other, routes))
+            for p, position in self.stop_patterns.get(stop, ()):
+                pattern = self.patterns[p]
+                ride = seconds + pattern["headway"] / 2
+                ridden = routes + (pattern["route"],)
+                for leg in range(position, len(pattern["times"])):
+                    ride += pattern["times"][leg]
+                    following = pattern["stops"][leg + 1]
+                    if ride > MAX_TRIP_SECONDS:
+                        break
+                    if following not in best:
+                        heapq.heappush(heap, (ride, following, ridden))
+        return best
+
+    def travel_times(self, lng: float, lat: float, destinations) -> dict:
+        """Estimated door-to-door seconds from a point to each (key, lng, lat) destination.
+
+        Returns {key: {"seconds", "mode", "routes"}}; walking wins when it is faster.
+        """
+        reached = self._search(lng, lat)
+        results = {}
+        for key, dest_lng, dest_lat in destinations:
+            walk = walk_seconds(haversine_meters(lng, lat, dest_lng, dest_lat))
+            estimate = {"seconds": walk, "mode": "walk", "routes": []}
+            for stop, distance in self.stops_near(dest_lng, dest_lat, MAX_ACCESS_WALK_METERS):
+                if stop in reached:
+                    seconds, routes = reached[stop]
+                    total = seconds + walk_seconds(distance)
+                    if routes and total < estimate["seconds"]:
+                        estimate = {"seconds": total, "mode": "transit", "routes": list(dict.fromkeys(routes))}
+            results[key] = estimate
+        return results
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useContext } from "react";
+import React, { useState, useEffect, useContext, useRef } from "react";
 import { AuthContext } from "../App";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
@@ -11,40 +11,151 @@ import { toast } from "sonner";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// The server sends a heartbeat every 15s; treat 45s of silence as a dead connection
+const STREAM_STALE_MS = 45000;
+const MAX_RECONNECT_DELAY_MS = 30000;
+
 export default function NotificationBell() {
   const { token } = useContext(AuthContext);
   const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
   const [open, setOpen] = useState(false);
   const [loading, setLoading] = useState(false);
+  // created_at of the newest notification received, sent back on reconnect
+  const cursorRef = useRef(null);
 
   useEffect(() => {
-    if (token) {
-      loadNotifications();
-      // Poll for new notifications every 30 seconds
-      const interval = setInterval(loadNotifications, 30000);
-      return () => clearInterval(interval);
-    }
+    if (!token) return;
+    let stopped = false;
+    let controller = null;
+    let retryTimer = null;
+    let attempt = 0;
+
+    const scheduleReconnect = () => {
+      if (stopped) return;
+      const delay = Math.min(1000 * 2 ** attempt, MAX_RECONNECT_DELAY_MS);
+      attempt += 1;
+      retryTimer = setTimeout(connect, delay);
+    };
+
+    const connect = async () => {
+      controller = new AbortController();
+      let staleTimer = null;
+      const resetStaleTimer = () => {
+        clearTimeout(staleTimer);
+        staleTimer = setTimeout(() => controller.abort(), STREAM_STALE_MS);
+      };
+
+      try {
+        const params = cursorRef.current ? `?cursor=${encodeURIComponent(cursorRef.current)}` : "";
+        const res = await fetch(`${API}/notifications/stream${params}`, {
+          headers: { Authorization: `Bearer ${token}` },
+          signal: controller.signal
+        });
+        if (!res.ok || !res.body) throw new Error("Notification stream unavailable");
+
+        resetStaleTimer();
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          attempt = 0;
+          resetStaleTimer();
+          buffer += decoder.decode(value, { stream: true });
+          const frames = buffer.split("\n\n");
+          buffer = frames.pop();
+          frames.forEach(handleFrame);
+        }
+      } catch (error) {
+        // Aborted or network error; reconnect below
+      } finally {
+        clearTimeout(staleTimer);
+      }
+      scheduleReconnect();
+    };
+
+    loadNotifications();
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (controller) controller.abort();
+    };
   }, [token]);
 
+  const handleFrame = (frame) => {
+    const data = frame
+      .split("\n")
+      .filter((line) => line.startsWith("data: "))
+      .map((line) => line.slice(6))
+      .join("\n");
+    if (!data) return; // heartbeat or retry hint
+    const event = JSON.parse(data);
+
+    switch (event.type) {
+      case "snapshot":
+        setUnreadCount(event.unread_count);
+        break;
+      case "notification": {
+        const notif = event.notification;
+        if (!cursorRef.current || notif.created_at > cursorRef.current) {
+          cursorRef.current = notif.created_at;
+        }
+        setNotifications((prev) =>
+          prev.some((n) => n.id === notif.id) ? prev : [notif, ...prev].slice(0, 100)
+        );
+        setUnreadCount((count) => Math.max(0, count + event.unread_delta));
+        if (event.unread_delta > 0 && notif.priority === "urgent") {
+          toast.warning(notif.title, { description: notif.message });
+        }
+        break;
+      }
+      case "read":
+        setNotifications((prev) => prev.map((n) => (n.id === event.id ? { ...n, read: true } : n)));
+        setUnreadCount((count) => Math.max(0, count + event.unread_delta));
+        break;
+      case "read_all":
+        setNotifications((prev) => prev.map((n) => ({ ...n, read: true })));
+        setUnreadCount((count) => Math.max(0, count + event.unread_delta));
+        break;
+      case "deleted":
+        setNotifications((prev) => prev.filter((n) => n.id !== event.id));
+        setUnreadCount((count) => Math.max(0, count + event.unread_delta));
+        break;
+      case "resync":
+        loadNotifications();
+        break;
+      default:
+        break;
+    }
+  };
+
   const loadNotifications = async () => {
     try {
       const res = await axios.get(`${API}/notifications`, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      setNotifications(res.data.notifications || []);
+      const items = res.data.notifications || [];
+      setNotifications(items);
       setUnreadCount(res.data.unread_count || 0);
+      if (items.length > 0 && (!cursorRef.current || items[0].created_at > cursorRef.current)) {
+        cursorRef.current = items[0].created_at;
+      }
     } catch (error) {
       console.log("Failed to load notifications");
     }
   };
 
+  // The stream echoes read/delete events back with the unread-count change,
+  // so these only update the list locally
   const markAsRead = async (notificationId) => {
     try {
       await axios.patch(`${API}/notifications/${notificationId}/read`, {}, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      loadNotifications();
+      setNotifications((prev) => prev.map((n) => (n.id === notificationId ? { ...n, read: true } : n)));
     } catch (error) {
       toast.error("Failed to mark as read");
     }
@@ -55,7 +166,7 @@ export default function NotificationBell() {
       await axios.patch(`${API}/notifications/read-all`, {}, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      loadNotifications();
+      setNotifications((prev) => prev.map((n) => ({ ...n, read: true })));
       toast.success("All notifications marked as read");
     } catch (error) {
       toast.error("Failed to mark all as read");
@@ -67,7 +178,7 @@ export default function NotificationBell() {
       await axios.delete(`${API}/notifications/${notificationId}`, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      loadNotifications();
+      setNotifications((prev) => prev.filter((n) => n.id !== notificationId));
     } catch (error) {
       toast.error("Failed to delete notification");
     }
@@ -0,0 +1,51 @@
+import { useEffect, useState } from "react";
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+// Live bed availability keyed by resource id, kept current by the server's SSE stream.
+// EventSource reconnects on its own; each (re)connect starts with a full snapshot.
+export function useAvailability() {
+  const [availability, setAvailability] = useState({});
+
+  useEffect(() => {
+    const source = new EventSource(`${API}/resources/availability/stream`);
+
+    source.addEventListener("snapshot", (event) => {
+      const data = JSON.parse(event.data);
+      const table = {};
+      data.availability.forEach((entry) => {
+        table[entry.resource_id] = entry;
+      });
+      setAvailability(table);
+    });
+
+    source.addEventListener("availability", (event) => {
+      const entry = JSON.parse(event.data).availability;
+      setAvailability((prev) => {
+        const current = prev[entry.resource_id];
+        if (current && current.version >= entry.version) return prev;
+        return { ...prev, [entry.resource_id]: entry };
+      });
+    });
+
+    return () => source.close();
+  }, []);
+
+  return availability;
+}
+
+export function availabilityLabel(entry) {
+  if (!entry) return null;
+  if (entry.live_status === "closed") return "Closed";
+  if (entry.live_status === "full") return "Full";
+  if (entry.beds_available == null) return "Open";
+  return `${entry.beds_available} bed${entry.beds_available === 1 ? "" : "s"} open`;
+}
+
+export function availabilityColor(entry) {
+  if (!entry) return "";
+  if (entry.live_status === "closed") return "bg-gray-500";
+  if (entry.live_status === "full") return "bg-red-500";
+  return "bg-emerald-600";
+}
@@ -0,0 +1,62 @@
+import axios from "axios";
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+const STORAGE_KEY = "brick_directory_bundle";
+
+// Offline copy of the directory (resources and active pop-up events). The first sync
+// downloads the full bundle; later syncs ask only for changes since the cached version.
+export function readCachedDirectory() {
+  try {
+    const raw = localStorage.getItem(STORAGE_KEY);
+    return raw ? JSON.parse(raw) : null;
+  } catch (error) {
+    return null;
+  }
+}
+
+function writeCachedDirectory(bundle) {
+  try {
+    localStorage.setItem(STORAGE_KEY, JSON.stringify(bundle));
+  } catch (error) {
+    // Storage full or disabled; the app still works online
+  }
+}
+
+function mergeById(items, changed, deleted) {
+  const byId = new Map(items.map((item) => [item.id, item]));
+  deleted.forEach((id) => byId.delete(id));
+  changed.forEach((item) => byId.set(item.id, item));
+  return Array.from(byId.values()).sort((a, b) => (a.name || a.title || "").localeCompare(b.name || b.title || ""));
+}
+
+async function downloadBundle() {
+  const res = await axios.get(`${API}/directory/bundle`);
+  return res.data;
+}
+
+// Bring the cached bundle up to date. Resolves to the current bundle, or rejects when
+// offline (callers keep showing the cached copy).
+export async function syncDirectory() {
+  const cached = readCachedDirectory();
+  let bundle;
+  if (!cached) {
+    bundle = await downloadBundle();
+  } else {
+    try {
+      const res = await axios.get(`${API}/directory/bundle/delta`, { params: { since: cached.version } });
+      const delta = res.data;
+      bundle = {
+        ...cached,
+        version: delta.version,
+        resources: mergeById(cached.resources, delta.resources, delta.deleted.resources),
+        events: mergeById(cached.events, delta.events, delta.deleted.events)
+      };
+    } catch (error) {
+      if (error.response?.status !== 410) throw error;
+      bundle = await downloadBundle();
+    }
+  }
+  writeCachedDirectory(bundle);
+  return bundle;
+}
@@ -16,6 +16,7 @@ const API = `${BACKEND_URL}/api`;
 export default function CleanupDashboard() {
   const { user, token, logout } = useContext(AuthContext);
   const [sweeps, setSweeps] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [showForm, setShowForm] = useState(false);
   const [loading, setLoading] = useState(true);
   const [formData, setFormData] = useState({
@@ -24,17 +25,25 @@ export default function CleanupDashboard() {
     time: "",
     description: ""
   });
+  // Optional alert area: only people whose last location is inside it (plus anyone
+  // who hasn't shared a location) are notified
+  const [targetArea, setTargetArea] = useState(null);
+  const [radiusMeters, setRadiusMeters] = useState("800");
 
   useEffect(() => {
     loadSweeps();
   }, []);
 
-  const loadSweeps = async () => {
+  // Same calendar the alert fan-out writes to: upcoming sweeps in time order, a page at a time
+  const loadSweeps = async (cursor = null) => {
+    const today = new Date().toLocaleDateString("en-CA");  // YYYY-MM-DD, local
     try {
-      const res = await axios.get(`${API}/cleanup/sweeps`, {
+      const res = await axios.get(`${API}/sweeps/calendar`, {
+        params: cursor ? { start: today, cursor } : { start: today },
         headers: { Authorization: `Bearer ${token}` }
       });
-      setSweeps(res.data || []);
+      setSweeps((prev) => (cursor ? [...prev, ...res.data.sweeps] : res.data.sweeps));
+      setNextCursor(res.data.next_cursor);
     } catch (error) {
       console.log("No sweeps endpoint yet");
     } finally {
@@ -44,19 +53,35 @@ export default function CleanupDashboard() {
 
   const handleSubmit = async (e) => {
     e.preventDefault();
+    const payload = targetArea
+      ? { ...formData, ...targetArea, radius_meters: Number(radiusMeters) }
+      : formData;
     try {
-      await axios.post(`${API}/cleanup/sweeps`, formData, {
+      const res = await axios.post(`${API}/cleanup/sweeps`, payload, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      toast.success("Sweep schedule posted! Individuals will be notified.");
+      toast.success(`Sweep schedule posted! ${res.data.notifications_sent} individuals will be notified.`);
+      (res.data.conflicts || []).forEach((conflict) => toast.warning(conflict.message));
       setShowForm(false);
       setFormData({ location: "", date: "", time: "", description: "" });
+      setTargetArea(null);
       loadSweeps();
     } catch (error) {
       toast.error("Failed to post sweep schedule");
     }
   };
 
+  const pickCurrentLocation = () => {
+    if (!navigator.geolocation) {
+      toast.error("Location is not available on this device");
+      return;
+    }
+    navigator.geolocation.getCurrentPosition(
+      (pos) => setTargetArea({ latitude: pos.coords.latitude, longitude: pos.coords.longitude }),
+      () => toast.error("Could not get your location")
+    );
+  };
+
   return (
     <div className="min-h-screen yellow-brick-road" data-testid="cleanup-dashboard">
       <div className="min-h-screen" style={{background: 'rgba(255, 255, 255, 0.92)'}}>
@@ -168,6 +193,43 @@ export default function CleanupDashboard() {
                         />
                       </div>
                     </div>
+                    <div>
+                      <Label className="text-gray-700 font-semibold flex items-center gap-2">
+                        <MapPin className="h-4 w-4 text-amber-600" />
+                        Alert Area (optional)
+                      </Label>
+                      {targetArea ? (
+                        <div className="mt-2 flex items-center gap-3">
+                          <select
+                            value={radiusMeters}
+                            onChange={(e) => setRadiusMeters(e.target.value)}
+                            className="border-2 border-amber-200 rounded-md px-2 py-2 text-sm"
+                            data-testid="sweep-radius-select"
+                          >
+                            <option value="400">Within 400 m</option>
+                            <option value="800">Within 800 m</option>
+                            <option value="1600">Within 1.6 km</option>
+                            <option value="3200">Within 3.2 km</option>
+                          </select>
+                          <span className="text-xs text-gray-500">
+                            of {targetArea.latitude.toFixed(4)}, {targetArea.longitude.toFixed(4)}
+                          </span>
+                          <Button type="button" variant="ghost" size="sm" onClick={() => setTargetArea(null)}>
+                            Clear
+                          </Button>
+                        </div>
+                      ) : (
+                        <Button
+                          type="button"
+                          variant="outline"
+                          onClick={pickCurrentLocation}
+                          className="mt-2 w-full border-2 border-amber-200"
+                          data-testid="sweep-use-location-btn"
+                        >
+                          Only alert people near my current location
+                        </Button>
+                      )}
+                    </div>
                     <div>
                       <Label className="text-gray-700 font-semibold">Additional Details</Label>
                       <Textarea
@@ -229,7 +291,7 @@ export default function CleanupDashboard() {
                   <div className="space-y-4 max-h-96 overflow-y-auto">
                     {sweeps.map((sweep, idx) => (
                       <div 
-                        key={idx} 
+                        key={sweep.id || idx} 
                         className="p-4 bg-gradient-to-r from-amber-50 to-orange-50 border-2 border-amber-200 rounded-xl"
                         data-testid={`sweep-item-${idx}`}
                       >
@@ -257,6 +319,11 @@ export default function CleanupDashboard() {
                         </div>
                       </div>
                     ))}
+                    {nextCursor && (
+                      <Button variant="outline" className="w-full" onClick={() => loadSweeps(nextCursor)} data-testid="load-more-sweeps">
+                        Load more
+                      </Button>
+                    )}
                   </div>
                 )}
               </CardContent>
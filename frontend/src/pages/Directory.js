@@ -18,6 +18,8 @@ import { useNavigate } from "react-router-dom";
 import axios from "axios";
 import { toast } from "sonner";
 import NotificationBell from "../components/NotificationBell";
+import { useAvailability, availabilityLabel, availabilityColor } from "../hooks/use-availability";
+import { readCachedDirectory, syncDirectory } from "../lib/directory-cache";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -53,18 +55,24 @@ export default function Directory() {
   const [sending, setSending] = useState(false);
   const [organizations, setOrganizations] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [searchResults, setSearchResults] = useState(null);
+  const availability = useAvailability();
   const navigate = useNavigate();
 
-  // Fetch organizations from API
+  // Show the offline copy straight away, then sync it with the server
   useEffect(() => {
     const fetchOrganizations = async () => {
+      const cached = readCachedDirectory();
+      if (cached) {
+        setOrganizations(cached.resources);
+        setLoading(false);
+      }
       try {
-        setLoading(true);
-        const response = await axios.get(`${API}/directory/organizations`);
-        setOrganizations(response.data);
+        const bundle = await syncDirectory();
+        setOrganizations(bundle.resources);
       } catch (error) {
-        console.error("Failed to fetch organizations:", error);
-        toast.error("Failed to load organizations");
+        console.error("Failed to sync organizations:", error);
+        if (!cached) toast.error("Failed to load organizations");
       } finally {
         setLoading(false);
       }
@@ -72,13 +80,48 @@ export default function Directory() {
     fetchOrganizations();
   }, []);
 
-  const filteredOrgs = organizations.filter(org => {
-    const matchesSearch = org.name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         org.services?.some(s => s.toLowerCase().includes(searchTerm.toLowerCase())) ||
-                         org.description?.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesCategory = selectedCategory === "all" || org.category === selectedCategory;
-    return matchesSearch && matchesCategory;
-  });
+  // Ranked server-side search (typo and prefix tolerant) once the user types
+  useEffect(() => {
+    const query = searchTerm.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/directory/search`, {
+          params: { q: query, category: selectedCategory, limit: 50 }
+        });
+        if (!cancelled) setSearchResults(response.data);
+      } catch (error) {
+        console.error("Directory search failed:", error);
+        // Offline: plain substring match over the cached directory
+        const needle = query.toLowerCase();
+        const results = organizations.filter(org =>
+          (selectedCategory === "all" || org.category === selectedCategory) &&
+          (org.name?.toLowerCase().includes(needle) ||
+           org.services?.some(s => s.toLowerCase().includes(needle)) ||
+           org.description?.toLowerCase().includes(needle)));
+        if (!cancelled) setSearchResults({ total: results.length, results, facets: null });
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm, selectedCategory, organizations]);
+
+  const filteredOrgs = searchResults
+    ? searchResults.results
+    : organizations.filter(org => selectedCategory === "all" || org.category === selectedCategory);
+
+  const categoryCounts = searchResults?.facets?.category;
+  const facetCount = (categoryId) => {
+    if (!categoryCounts) return null;
+    if (categoryId === "all") return Object.values(categoryCounts).reduce((sum, n) => sum + n, 0);
+    return categoryCounts[categoryId] || 0;
+  };
 
   const getColorClasses = (color) => {
     const colors = {
@@ -193,6 +236,9 @@ export default function Directory() {
                 >
                   <Icon className="h-4 w-4 mr-2" />
                   {cat.label}
+                  {facetCount(cat.id) !== null && (
+                    <span className="ml-2 text-xs opacity-75">{facetCount(cat.id)}</span>
+                  )}
                 </Button>
               );
             })}
@@ -209,7 +255,7 @@ export default function Directory() {
           </div>
         ) : (
           <>
-            <p className="text-white mb-4 font-medium">{filteredOrgs.length} organizations found</p>
+            <p className="text-white mb-4 font-medium">{searchResults ? searchResults.total : filteredOrgs.length} organizations found</p>
             
             <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
               {filteredOrgs.map(org => {
@@ -233,6 +279,11 @@ export default function Directory() {
                             <Badge variant="secondary" className="mt-1 capitalize">
                               {org.category?.replace(/_/g, " ")}
                             </Badge>
+                            {availability[org.id] && (
+                              <Badge className={`mt-1 ml-1 ${availabilityColor(availability[org.id])} text-white`}>
+                                {availabilityLabel(availability[org.id])}
+                              </Badge>
+                            )}
                           </div>
                         </div>
                         <ChevronRight className={`h-5 w-5 ${colors.text}`} />
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useContext } from "react";
 import { AuthContext } from "../App";
-import { MapContainer, TileLayer, Marker, Popup } from "react-leaflet";
+import { MapContainer, TileLayer, Marker, Popup, useMap, useMapEvents } from "react-leaflet";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Sheet, SheetContent, SheetTrigger, SheetTitle } from "@/components/ui/sheet";
@@ -11,6 +11,8 @@ import axios from "axios";
 import { toast } from "sonner";
 import L from "leaflet";
 import "leaflet/dist/leaflet.css";
+import { useAvailability, availabilityLabel, availabilityColor } from "../hooks/use-availability";
+import { readCachedDirectory } from "../lib/directory-cache";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -23,11 +25,151 @@ L.Icon.Default.mergeOptions({
   shadowUrl: require('leaflet/dist/images/marker-shadow.png'),
 });
 
+const KIND_COLORS = { resource: "#10b981", popup_event: "#3b82f6", sweep: "#f97316" };
+
+const clusterIcon = (cluster) => {
+  const size = cluster.count < 10 ? 32 : cluster.count < 100 ? 40 : 48;
+  // Colour by whichever kind dominates the cluster
+  const kind = Object.keys(cluster.kinds).reduce((a, b) => (cluster.kinds[a] >= cluster.kinds[b] ? a : b));
+  return L.divIcon({
+    html: `<div style="background:${KIND_COLORS[kind]};width:${size}px;height:${size}px;line-height:${size}px;border-radius:50%;color:white;font-weight:700;text-align:center;border:3px solid white;box-shadow:0 1px 4px rgba(0,0,0,.4)">${cluster.count}</div>`,
+    className: "",
+    iconSize: [size, size]
+  });
+};
+
+const pointIcon = (kind) => L.divIcon({
+  html: `<div style="background:${KIND_COLORS[kind]};width:18px;height:18px;border-radius:50%;border:3px solid white;box-shadow:0 1px 4px rgba(0,0,0,.4)"></div>`,
+  className: "",
+  iconSize: [18, 18]
+});
+
+// Markers for the visible part of the map, clustered by the server for the current zoom
+function ViewportMarkers({ category, availability, getCategoryColor }) {
+  const map = useMap();
+  const [items, setItems] = useState([]);
+
+  const loadViewport = async () => {
+    const bounds = map.getBounds();
+    try {
+      const res = await axios.get(`${API}/map/viewport`, {
+        params: {
+          bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(","),
+          zoom: map.getZoom(),
+          category: category || undefined
+        }
+      });
+      setItems(res.data.items);
+    } catch (error) {
+      // Offline: plot the cached directory unclustered
+      const cached = readCachedDirectory();
+      if (!cached) {
+        toast.error("Failed to load map");
+        return;
+      }
+      setItems(cached.resources
+        .filter(r => r.coordinates?.lat != null && (!category || r.category === category))
+        .filter(r => bounds.contains([r.coordinates.lat, r.coordinates.lng]))
+        .map(r => ({ ...r, type: "point", kind: "resource", lat: r.coordinates.lat, lng: r.coordinates.lng })));
+    }
+  };
+
+  useMapEvents({ moveend: loadViewport });
+
+  useEffect(() => {
+    loadViewport();
+  }, [category]);
+
+  return items.map(item => {
+    if (item.type === "cluster") {
+      return (
+        <Marker
+          key={item.id}
+          position={[item.lat, item.lng]}
+          icon={clusterIcon(item)}
+          eventHandlers={{ click: () => map.setView([item.lat, item.lng], item.expansion_zoom) }}
+        />
+      );
+    }
+    if (item.kind === "popup_event") {
+      return (
+        <Marker key={`event-${item.id}`} position={[item.lat, item.lng]} icon={pointIcon(item.kind)}>
+          <Popup>
+            <div className="p-2">
+              <h3 className="font-bold text-base mb-1">{item.title}</h3>
+              <Badge className="bg-blue-500 text-white mb-2">{item.event_type?.replace(/_/g, " ")}</Badge>
+              <p className="text-sm text-gray-600 mb-1 flex items-center gap-1">
+                <MapPin className="h-3 w-3" />
+                {item.location}
+              </p>
+              <p className="text-sm text-gray-600 flex items-center gap-1">
+                <Clock className="h-3 w-3" />
+                {new Date(item.start_time).toLocaleString()} – {new Date(item.end_time).toLocaleTimeString()}
+              </p>
+            </div>
+          </Popup>
+        </Marker>
+      );
+    }
+    if (item.kind === "sweep") {
+      return (
+        <Marker key={`sweep-${item.id}`} position={[item.lat, item.lng]} icon={pointIcon(item.kind)}>
+          <Popup>
+            <div className="p-2">
+              <h3 className="font-bold text-base mb-1">Scheduled Cleanup</h3>
+              <p className="text-sm text-gray-600 mb-1 flex items-center gap-1">
+                <MapPin className="h-3 w-3" />
+                {item.location}
+              </p>
+              <p className="text-sm text-gray-600 flex items-center gap-1">
+                <Clock className="h-3 w-3" />
+                {item.scheduled_date ? new Date(item.scheduled_date).toLocaleString() : `${item.date} ${item.time || ""}`}
+              </p>
+            </div>
+          </Popup>
+        </Marker>
+      );
+    }
+    return (
+      <Marker key={item.id} position={[item.lat, item.lng]}>
+        <Popup>
+          <div className="p-2">
+            <h3 className="font-bold text-base mb-1">{item.name}</h3>
+            <Badge className={`${getCategoryColor(item.category)} text-white mb-2`}>
+              {item.category}
+            </Badge>
+            {availability[item.id] && (
+              <Badge className={`${availabilityColor(availability[item.id])} text-white mb-2 ml-1`}>
+                {availabilityLabel(availability[item.id])}
+              </Badge>
+            )}
+            <p className="text-sm text-gray-600 mb-1 flex items-center gap-1">
+              <MapPin className="h-3 w-3" />
+              {item.address}
+            </p>
+            <p className="text-sm text-gray-600 mb-1 flex items-center gap-1">
+              <Phone className="h-3 w-3" />
+              {item.phone}
+            </p>
+            {item.hours && (
+              <p className="text-sm text-gray-600 flex items-center gap-1">
+                <Clock className="h-3 w-3" />
+                {item.hours}
+              </p>
+            )}
+          </div>
+        </Popup>
+      </Marker>
+    );
+  });
+}
+
 export default function ResourceMap() {
   const { user, token, logout } = useContext(AuthContext);
   const [resources, setResources] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState(null);
   const [loading, setLoading] = useState(true);
+  const availability = useAvailability();
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -44,7 +186,12 @@ export default function ResourceMap() {
       });
       setResources(res.data);
     } catch (error) {
-      toast.error("Failed to load resources");
+      const cached = readCachedDirectory();
+      if (cached) {
+        setResources(cached.resources.filter(r => r.coordinates?.lat != null && (!selectedCategory || r.category === selectedCategory)));
+      } else {
+        toast.error("Failed to load resources");
+      }
     } finally {
       setLoading(false);
     }
@@ -134,35 +281,11 @@ export default function ResourceMap() {
               url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
               attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'
             />
-            {resources.map(resource => (
-              <Marker
-                key={resource.id}
-                position={[resource.coordinates.lat, resource.coordinates.lng]}
-              >
-                <Popup>
-                  <div className="p-2">
-                    <h3 className="font-bold text-base mb-1">{resource.name}</h3>
-                    <Badge className={`${getCategoryColor(resource.category)} text-white mb-2`}>
-                      {resource.category}
-                    </Badge>
-                    <p className="text-sm text-gray-600 mb-1 flex items-center gap-1">
-                      <MapPin className="h-3 w-3" />
-                      {resource.address}
-                    </p>
-                    <p className="text-sm text-gray-600 mb-1 flex items-center gap-1">
-                      <Phone className="h-3 w-3" />
-                      {resource.phone}
-                    </p>
-                    {resource.hours && (
-                      <p className="text-sm text-gray-600 flex items-center gap-1">
-                        <Clock className="h-3 w-3" />
-                        {resource.hours}
-                      </p>
-                    )}
-                  </div>
-                </Popup>
-              </Marker>
-            ))}
+            <ViewportMarkers
+              category={selectedCategory}
+              availability={availability}
+              getCategoryColor={getCategoryColor}
+            />
           </MapContainer>
         </div>
 
@@ -182,6 +305,11 @@ export default function ResourceMap() {
                         {resource.category}
                       </Badge>
                     </div>
+                    {availability[resource.id] && (
+                      <Badge className={`${availabilityColor(availability[resource.id])} text-white text-xs w-fit`}>
+                        {availabilityLabel(availability[resource.id])}
+                      </Badge>
+                    )}
                   </CardHeader>
                   <CardContent className="space-y-2 text-sm">
                     <div className="flex items-start gap-2">
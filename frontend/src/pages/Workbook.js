@@ -76,10 +76,46 @@ export default function Workbook() {
   const generateWorkbooks = async () => {
     setGenerating(true);
     try {
-      const response = await axios.post(`${API}/workbooks/generate`, {}, {
+      // Stream newline-delimited events so workbooks appear as each one is generated
+      const response = await fetch(`${API}/workbooks/generate/stream`, {
+        method: "POST",
         headers: { Authorization: `Bearer ${token}` }
       });
-      toast.success(response.data.message);
+      if (!response.ok || !response.body) throw new Error("Generation failed");
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let doneMessage = null;
+
+      const handleEvent = (evt) => {
+        if (evt.event === "workbook_started") {
+          setWorkbooks(prev => [...prev, {
+            id: evt.workbook_id, title: evt.title, category: evt.category,
+            why_recommended: evt.why_recommended, progress: 0,
+            lessons: [], exercises: [], action_items: [], generating: true
+          }]);
+        } else if (evt.event === "section") {
+          setWorkbooks(prev => prev.map(wb => wb.id === evt.workbook_id
+            ? { ...wb, [evt.section]: [...(wb[evt.section] || []), evt.item] }
+            : wb));
+        } else if (evt.event === "workbook") {
+          setWorkbooks(prev => prev.map(wb => wb.id === evt.workbook.id ? evt.workbook : wb));
+        } else if (evt.event === "done") {
+          doneMessage = evt.message;
+        }
+      };
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+      }
+
+      toast.success(doneMessage || "Workbooks generated");
       loadData();
     } catch (error) {
       toast.error("Failed to generate workbooks. Try answering more flashcards first!");
@@ -147,6 +183,33 @@ export default function Workbook() {
     }
   };
 
+  // The list only carries summaries; section content loads when a workbook is opened
+  const openWorkbook = async (workbook) => {
+    setSelectedWorkbook(workbook);
+    if (workbook.generating) return;
+    try {
+      const headers = { Authorization: `Bearer ${token}` };
+      const [lessonsRes, exercisesRes, actionsRes, resourcesRes] = await Promise.all([
+        axios.get(`${API}/workbooks/${workbook.id}/lessons`, { headers }),
+        axios.get(`${API}/workbooks/${workbook.id}/exercises`, { headers }),
+        axios.get(`${API}/workbooks/${workbook.id}/action-items`, { headers }),
+        axios.get(`${API}/workbooks/${workbook.id}/resources`, { headers })
+      ]);
+      setSelectedWorkbook(prev => prev && prev.id === workbook.id ? {
+        ...prev,
+        lessons: lessonsRes.data.items,
+        completed_lessons: lessonsRes.data.completed,
+        exercises: exercisesRes.data.items,
+        completed_exercises: exercisesRes.data.completed,
+        action_items: actionsRes.data.items,
+        completed_actions: actionsRes.data.completed,
+        resources: resourcesRes.data.items
+      } : prev);
+    } catch (error) {
+      toast.error("Failed to load workbook");
+    }
+  };
+
   const answeredCount = flashcards.filter(fc => fc.user_answer).length;
   const getCategoryConfig = (category) => CATEGORY_CONFIG[category] || { icon: BookOpen, color: "gray", label: category };
 
@@ -303,7 +366,7 @@ export default function Workbook() {
                           className={`bg-white/95 border-2 cursor-pointer transition-all hover:shadow-xl ${
                             isComplete ? 'border-green-300 bg-green-50/50' : 'border-gray-200 hover:border-emerald-300'
                           }`}
-                          onClick={() => setSelectedWorkbook(workbook)}
+                          onClick={() => openWorkbook(workbook)}
                           data-testid={`workbook-card-${workbook.id}`}
                         >
                           <CardHeader>
@@ -315,6 +378,7 @@ export default function Workbook() {
                                 <div className="flex items-center gap-2 mb-1">
                                   <CardTitle className="text-lg">{workbook.title}</CardTitle>
                                   {isComplete && <CheckCircle className="h-5 w-5 text-green-500" />}
+                                  {workbook.generating && <Loader2 className="h-4 w-4 animate-spin text-emerald-600" />}
                                 </div>
                                 <Badge variant="secondary" className="capitalize">{config.label}</Badge>
                               </div>
@@ -331,9 +395,9 @@ export default function Workbook() {
                               <Progress value={workbook.progress} className="h-2" />
                             </div>
                             <div className="flex gap-4 mt-4 text-xs text-gray-500">
-                              <span>{workbook.lessons?.length || 0} lessons</span>
-                              <span>{workbook.exercises?.length || 0} exercises</span>
-                              <span>{workbook.action_items?.length || 0} actions</span>
+                              <span>{workbook.lesson_count ?? workbook.lessons?.length ?? 0} lessons</span>
+                              <span>{workbook.exercise_count ?? workbook.exercises?.length ?? 0} exercises</span>
+                              <span>{workbook.action_count ?? workbook.action_items?.length ?? 0} actions</span>
                             </div>
                           </CardContent>
                         </Card>